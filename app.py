@@ -12,15 +12,28 @@ import os
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database.connection import get_db_session
+from database.connection import (
+    get_db_session, get_bulk_db_session, get_read_db_session, track_queries, pool_status
+)
+from database.queries import (
+    scenario_page, count_active_scenarios, comparison_page, comparison_summary,
+    comparison_ids, scenario_options, scenario_id_at, search_scenarios, composition_stats
+)
+from database.composition import capex_bits, capex_mask_of, decode_capex_mask
+from database.async_access import load_scenario_page
+from database.audit import audit_writer, AUDIT_MODE
+from database.maintenance import delete_scenarios, delete_import_batch, import_batches, PURGE_AFTER_DAYS
 from database.models import (
     Scenario, CapexCategory, CapexItem, CapexSubcategory, ScenarioCapex,
     FiscalTerms, PricingAssumptions, ProductionProfile, ProductionData, ProductionEnhancement,
-    ScenarioOpex, CalculationResult, ScenarioMetrics
+    ScenarioMetrics
 )
 from engine.calculator import FinancialCalculator
 from engine.opex_generator import OpexGenerator
-from engine.comparator import ScenarioComparator
+from engine.comparator import ScenarioComparator, SCORING_PROFILES, SCORE_METRICS, get_similarity_index
+from engine.leaderboard import LeaderboardStore
+from engine.pareto import PARETO_LABELS, DEFAULT_OBJECTIVES, objective_matrix, pareto_fronts
+from engine.recalculator import StaleRecalculator
 from utils.export import ExcelExporter, ensure_export_directory, generate_filename
 
 # Page config
@@ -99,32 +112,68 @@ def get_items_for_category_cached(category_id):
                  item.subcategory.name if item.subcategory else "General")
                 for item in items]
 
+@st.cache_data(ttl=300)
+def get_capex_bits_cached():
+    """Cached (bit_mask, code, name) of CAPEX items used by composition filters"""
+    with get_read_db_session() as session:
+        return capex_bits(session)
+
 @st.cache_data(ttl=60)
-def get_scenarios_list_cached(page: int = 0, per_page: int = 50):
-    """Cached paginated query for scenarios - optimized for hundreds of scenarios"""
+def get_scenario_count_cached():
+    """Cached (count, is_exact) of active scenarios - estimated on large PostgreSQL tables"""
     with get_db_session() as session:
-        total = session.query(Scenario).filter_by(is_active=True).count()
-        scenarios = session.query(Scenario).filter_by(is_active=True)\
-            .order_by(Scenario.created_at.desc())\
-            .offset(page * per_page).limit(per_page).all()
-        return {
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page,
-            'scenarios': [(s.id, s.name, s.description, s.created_at) for s in scenarios]
-        }
+        return count_active_scenarios(session)
+
+def get_keyset_page(session, key: str, per_page: int, newest_first: bool = True):
+    """
+    Fetch the current page of a keyset-paginated scenario list
+    
+    Navigation state lives in st.session_state[f"{key}_nav"] as
+    (page number, mode, cursor) where mode is 'after', 'before' or 'last'.
+    """
+    page_num, mode, cursor = st.session_state.get(f"{key}_nav", (1, None, None))
+    page_data = scenario_page(
+        session,
+        after=cursor if mode == 'after' else None,
+        before=cursor if mode == 'before' else None,
+        last_page=(mode == 'last'),
+        per_page=per_page,
+        newest_first=newest_first
+    )
+    if not page_data['rows'] and page_num > 1:
+        # Page emptied (e.g. last row deleted) - start over
+        st.session_state[f"{key}_nav"] = (1, None, None)
+        return get_keyset_page(session, key, per_page, newest_first)
+    return page_data, page_num
+
+def render_keyset_navigation(key: str, page_data, page_num: int, total_pages: int, total_label: str):
+    """First/Prev/Next/Last buttons for a keyset-paginated list"""
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        if st.button("⏮️ First", disabled=not page_data['has_prev'], key=f"{key}_first"):
+            st.session_state[f"{key}_nav"] = (1, None, None)
+            st.rerun()
+    with col2:
+        if st.button("◀️ Prev", disabled=not page_data['has_prev'], key=f"{key}_prev"):
+            st.session_state[f"{key}_nav"] = (max(1, page_num - 1), 'before', page_data['first_key'])
+            st.rerun()
+    with col3:
+        st.markdown(f"<center>Page {page_num} of {total_label}{total_pages}</center>", unsafe_allow_html=True)
+    with col4:
+        if st.button("Next ▶️", disabled=not page_data['has_next'], key=f"{key}_next"):
+            st.session_state[f"{key}_nav"] = (page_num + 1, 'after', page_data['last_key'])
+            st.rerun()
+    with col5:
+        if st.button("Last ⏭️", disabled=not page_data['has_next'], key=f"{key}_last"):
+            st.session_state[f"{key}_nav"] = (total_pages, 'last', None)
+            st.rerun()
 
 @st.cache_data(ttl=60)
 def get_scenario_metrics_cached(scenario_id: int):
     """Cached query for scenario metrics"""
     with get_db_session() as session:
-        from sqlalchemy import text
         metrics = session.query(ScenarioMetrics).filter_by(scenario_id=scenario_id).first()
         if metrics:
-            ptcf = session.execute(text(
-                'SELECT SUM(contractor_tax) FROM calculation_results WHERE scenario_id = :sid'
-            ), {'sid': scenario_id}).fetchone()[0] or 0
             return {
                 'npv': float(metrics.npv) if metrics.npv else 0,
                 'irr': float(metrics.irr) if metrics.irr else 0,
@@ -135,7 +184,9 @@ def get_scenario_metrics_cached(scenario_id: int):
                 'contractor_share': float(metrics.total_contractor_share) if metrics.total_contractor_share else 0,
                 'government_take': float(metrics.total_government_take) if metrics.total_government_take else 0,
                 'asr': float(metrics.asr_amount) if metrics.asr_amount else 0,
-                'contractor_ptcf': float(ptcf)
+                'contractor_ptcf': float(metrics.contractor_ptcf) if metrics.contractor_ptcf else 0,
+                'peak_cash_exposure': float(metrics.peak_cash_exposure) if metrics.peak_cash_exposure else 0,
+                'max_annual_revenue': float(metrics.max_annual_revenue) if metrics.max_annual_revenue else 0
             }
         return None
 
@@ -338,6 +389,8 @@ def create_scenario_from_selection(session, scenario_name, description, selected
     # Get default parameters
     fiscal, pricing, enhancement, profile = initialize_default_data(session)
     
+    capex_items = {item.id: item for item in session.query(CapexItem).filter(CapexItem.id.in_(list(selected_items))).all()}
+    
     # Create scenario
     scenario = Scenario(
         name=scenario_name,
@@ -347,14 +400,15 @@ def create_scenario_from_selection(session, scenario_name, description, selected
         pricing_assumptions_id=pricing.id,
         production_enhancement_id=enhancement.id,
         created_by='User',
-        is_active=True
+        is_active=True,
+        capex_mask=capex_mask_of(capex_items.values())
     )
     session.add(scenario)
     session.flush()
     
     # Add CAPEX items
     for item_id, quantity in selected_items.items():
-        capex_item = session.query(CapexItem).filter_by(id=item_id).first()
+        capex_item = capex_items.get(item_id)
         if capex_item:
             total_cost = capex_item.unit_cost * quantity
             scenario_capex = ScenarioCapex(
@@ -380,228 +434,289 @@ def create_scenario_from_selection(session, scenario_name, description, selected
 
 def display_scenario_results(scenario_id):
     """Display scenario calculation results"""
-    with get_db_session() as session:
-        scenario = session.query(Scenario).filter_by(id=scenario_id).first()
+    # Scenario, metrics, annual results, CAPEX and OPEX load concurrently (database/async_access.py)
+    page_data = load_scenario_page(scenario_id)
+    scenario = page_data['scenario']
+    
+    if not scenario:
+        st.error("Scenario not found")
+        return
+    
+    st.subheader(f"Results: {scenario.name}")
+    
+    if scenario.description:
+        st.info(scenario.description)
+    
+    metrics = page_data['metrics']
+    
+    if not metrics:
+        st.warning("No calculation results available. Please calculate first.")
+        return
+    
+    if metrics.is_stale:
+        st.warning("⚠️ Reference data used by these results has changed. Recalculate stale scenarios in Manage Scenarios.")
+    
+    # Contractor PTCF (total tax paid) - stored with the metrics at calculation time
+    contractor_ptcf = metrics.contractor_ptcf or 0
+    
+    # Display key metrics - Row 1
+    st.markdown("### 📊 Key Financial Metrics")
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        npv_color = "normal" if metrics.npv > 0 else "inverse"
+        st.metric("NPV (13%)", f"${metrics.npv:,.0f}", delta_color=npv_color)
+    with col2:
+        irr_val = metrics.irr * 100 if metrics.irr else 0
+        irr_color = "normal" if irr_val > 0 else "inverse"
+        st.metric("IRR", f"{irr_val:.2f}%", delta_color=irr_color)
+    with col3:
+        payback = metrics.payback_period_years if metrics.payback_period_years else 0
+        st.metric("Payback Period", f"{payback:.3f} years")
+    with col4:
+        st.metric("Gross Revenue", f"${metrics.total_revenue:,.0f}")
+    
+    # Row 2 - Contractor & Government
+    col5, col6, col7, col8 = st.columns(4)
+    
+    with col5:
+        st.metric("Contractor Take", f"${metrics.total_contractor_share:,.0f}")
+    with col6:
+        st.metric("Government Take", f"${metrics.total_government_take:,.0f}")
+    with col7:
+        st.metric("Contractor PTCF (Tax)", f"${contractor_ptcf:,.0f}")
+    with col8:
+        roi = ((metrics.total_contractor_share - metrics.total_capex) / metrics.total_capex * 100) if metrics.total_capex > 0 else 0
+        st.metric("ROI", f"{roi:.2f}%")
+    
+    # Row 3 - Investment Details
+    col9, col10, col11, col12 = st.columns(4)
+    
+    with col9:
+        st.metric("Total CAPEX", f"${metrics.total_capex:,.0f}")
+    with col10:
+        st.metric("Total OPEX", f"${metrics.total_opex:,.0f}")
+    with col11:
+        st.metric("ASR (5%)", f"${metrics.asr_amount:,.0f}")
+    with col12:
+        # Profit margin
+        profit_margin = (metrics.total_contractor_share / metrics.total_revenue * 100) if metrics.total_revenue > 0 else 0
+        st.metric("Profit Margin", f"{profit_margin:.2f}%")
+    
+    # Tabs for detailed results
+    tab1, tab2, tab3, tab4 = st.tabs(["Annual Results", "CAPEX/OPEX", "Visualizations", "Summary"])
+    
+    with tab1:
+        st.subheader("Annual Financial Results")
+        results = page_data['results']
         
-        if not scenario:
-            st.error("Scenario not found")
-            return
+        results_data = []
+        for r in results:
+            results_data.append({
+                'Year': r.year,
+                'Oil (bbl)': f"{r.oil_production:,.0f}",
+                'Gas (MMBTU)': f"{r.gas_production_mmbtu:,.0f}",
+                'Revenue': f"${r.total_revenue:,.0f}",
+                'Depreciation': f"${r.depreciation:,.0f}",
+                'OPEX': f"${r.opex_total:,.0f}",
+                'Operating Profit': f"${r.operating_profit:,.0f}",
+                'Contractor (After-tax)': f"${r.contractor_share_aftertax:,.0f}",
+                'Government Take': f"${r.government_total_take:,.0f}",
+                'Cumulative CF': f"${r.cumulative_cash_flow:,.0f}"
+            })
         
-        st.subheader(f"Results: {scenario.name}")
+        st.dataframe(pd.DataFrame(results_data), width='stretch', height=400)
+    
+    with tab2:
+        col1, col2 = st.columns(2)
         
-        if scenario.description:
-            st.info(scenario.description)
+        with col1:
+            st.subheader("CAPEX Breakdown")
+            capex_data = []
+            for capex in page_data['capex']:
+                capex_data.append({
+                    'Item': capex.name,
+                    'Quantity': capex.quantity,
+                    'Unit Cost': f"${capex.unit_cost:,.2f}",
+                    'Total': f"${capex.total_cost:,.0f}"
+                })
+            
+            st.dataframe(pd.DataFrame(capex_data), width='stretch')
         
-        # Get metrics
-        from database.models import ScenarioMetrics, CalculationResult
-        metrics = session.query(ScenarioMetrics).filter_by(scenario_id=scenario_id).first()
+        with col2:
+            st.subheader("OPEX Summary by Year")
+            opex_summary = page_data['opex_summary']
+            
+            opex_data = [{'Year': year, 'Total OPEX': f"${amount:,.0f}"} 
+                        for year, amount in sorted(opex_summary.items())]
+            
+            st.dataframe(pd.DataFrame(opex_data), width='stretch', height=400)
+    
+    with tab3:
+        st.subheader("Financial Visualizations")
         
-        if not metrics:
-            st.warning("No calculation results available. Please calculate first.")
-            return
+        # Revenue vs Costs
+        fig1 = go.Figure()
+        years = [r.year for r in results]
+        fig1.add_trace(go.Bar(name='Revenue', x=years, y=[r.total_revenue for r in results]))
+        fig1.add_trace(go.Bar(name='OPEX', x=years, y=[r.opex_total for r in results]))
+        fig1.add_trace(go.Bar(name='Depreciation', x=years, y=[r.depreciation for r in results]))
+        fig1.update_layout(
+            title='Revenue vs Costs',
+            xaxis_title='Year',
+            yaxis_title='USD',
+            barmode='group',
+            height=400
+        )
+        st.plotly_chart(fig1, width="stretch")
         
-        # Get Contractor PTCF (total tax paid)
-        from sqlalchemy import text
-        ptcf_result = session.execute(text(
-            'SELECT SUM(contractor_tax) FROM calculation_results WHERE scenario_id = :sid'
-        ), {'sid': scenario_id}).fetchone()
-        contractor_ptcf = float(ptcf_result[0]) if ptcf_result[0] else 0
+        # Cumulative Cash Flow
+        fig2 = go.Figure()
+        fig2.add_trace(go.Scatter(
+            x=years,
+            y=[r.cumulative_cash_flow for r in results],
+            mode='lines+markers',
+            name='Cumulative Cash Flow',
+            line=dict(color='green', width=3)
+        ))
+        fig2.update_layout(
+            title='Cumulative Cash Flow',
+            xaxis_title='Year',
+            yaxis_title='USD',
+            height=400
+        )
+        st.plotly_chart(fig2, width="stretch")
         
-        # Display key metrics - Row 1
-        st.markdown("### 📊 Key Financial Metrics")
-        col1, col2, col3, col4 = st.columns(4)
+        # PSC Split
+        total_contractor = sum(r.contractor_share_aftertax for r in results)
+        total_government = sum(r.government_total_take for r in results)
         
-        with col1:
-            npv_color = "normal" if metrics.npv > 0 else "inverse"
-            st.metric("NPV (13%)", f"${metrics.npv:,.0f}", delta_color=npv_color)
-        with col2:
-            irr_val = metrics.irr * 100 if metrics.irr else 0
-            irr_color = "normal" if irr_val > 0 else "inverse"
-            st.metric("IRR", f"{irr_val:.2f}%", delta_color=irr_color)
-        with col3:
-            payback = metrics.payback_period_years if metrics.payback_period_years else 0
-            st.metric("Payback Period", f"{payback:.3f} years")
-        with col4:
-            st.metric("Gross Revenue", f"${metrics.total_revenue:,.0f}")
+        fig3 = go.Figure(data=[go.Pie(
+            labels=['Contractor (After-tax)', 'Government Total Take'],
+            values=[total_contractor, total_government],
+            hole=.3
+        )])
+        fig3.update_layout(title='Production Sharing Split', height=400)
+        st.plotly_chart(fig3, width="stretch")
+    
+    with tab4:
+        st.subheader("Scenario Summary Report")
         
-        # Row 2 - Contractor & Government
-        col5, col6, col7, col8 = st.columns(4)
+        st.markdown(f"""
+        **Scenario:** {scenario.name}
         
-        with col5:
-            st.metric("Contractor Take", f"${metrics.total_contractor_share:,.0f}")
-        with col6:
-            st.metric("Government Take", f"${metrics.total_government_take:,.0f}")
-        with col7:
-            st.metric("Contractor PTCF (Tax)", f"${contractor_ptcf:,.0f}")
-        with col8:
-            roi = ((metrics.total_contractor_share - metrics.total_capex) / metrics.total_capex * 100) if metrics.total_capex > 0 else 0
-            st.metric("ROI", f"{roi:.2f}%")
+        **Description:** {scenario.description or 'N/A'}
         
-        # Row 3 - Investment Details
-        col9, col10, col11, col12 = st.columns(4)
+        **Created:** {scenario.created_at.strftime('%Y-%m-%d %H:%M') if scenario.created_at else 'N/A'}
         
-        with col9:
-            st.metric("Total CAPEX", f"${metrics.total_capex:,.0f}")
-        with col10:
-            st.metric("Total OPEX", f"${metrics.total_opex:,.0f}")
-        with col11:
-            st.metric("ASR (5%)", f"${metrics.asr_amount:,.0f}")
-        with col12:
-            # Profit margin
-            profit_margin = (metrics.total_contractor_share / metrics.total_revenue * 100) if metrics.total_revenue > 0 else 0
-            st.metric("Profit Margin", f"{profit_margin:.2f}%")
+        ---
         
-        # Tabs for detailed results
-        tab1, tab2, tab3, tab4 = st.tabs(["Annual Results", "CAPEX/OPEX", "Visualizations", "Summary"])
+        ### Financial Summary
         
-        with tab1:
-            st.subheader("Annual Financial Results")
-            results = session.query(CalculationResult).filter_by(
-                scenario_id=scenario_id
-            ).order_by(CalculationResult.year).all()
-            
-            results_data = []
-            for r in results:
-                results_data.append({
-                    'Year': r.year,
-                    'Oil (bbl)': f"{r.oil_production:,.0f}",
-                    'Gas (MMBTU)': f"{r.gas_production_mmbtu:,.0f}",
-                    'Revenue': f"${r.total_revenue:,.0f}",
-                    'Depreciation': f"${r.depreciation:,.0f}",
-                    'OPEX': f"${r.opex_total:,.0f}",
-                    'Operating Profit': f"${r.operating_profit:,.0f}",
-                    'Contractor (After-tax)': f"${r.contractor_share_aftertax:,.0f}",
-                    'Government Take': f"${r.government_total_take:,.0f}",
-                    'Cumulative CF': f"${r.cumulative_cash_flow:,.0f}"
-                })
-            
-            st.dataframe(pd.DataFrame(results_data), width='stretch', height=400)
+        - **Total CAPEX:** ${metrics.total_capex:,.2f}
+        - **Total OPEX:** ${metrics.total_opex:,.2f}
+        - **Total Revenue:** ${metrics.total_revenue:,.2f}
+        - **Net Present Value (NPV @ 13%):** ${metrics.npv:,.2f}
+        - **Abandonment Security Reserve (ASR):** ${metrics.asr_amount:,.2f}
         
-        with tab2:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.subheader("CAPEX Breakdown")
-                capex_items = session.query(ScenarioCapex, CapexItem).join(
-                    CapexItem
-                ).filter(
-                    ScenarioCapex.scenario_id == scenario_id
-                ).all()
-                
-                capex_data = []
-                for capex, item in capex_items:
-                    capex_data.append({
-                        'Item': item.name,
-                        'Quantity': capex.quantity,
-                        'Unit Cost': f"${capex.unit_cost:,.2f}",
-                        'Total': f"${capex.total_cost:,.0f}"
-                    })
-                
-                st.dataframe(pd.DataFrame(capex_data), width='stretch')
-            
-            with col2:
-                st.subheader("OPEX Summary by Year")
-                opex_gen = OpexGenerator(session)
-                opex_summary = opex_gen.get_opex_summary_by_year(scenario_id)
-                
-                opex_data = [{'Year': year, 'Total OPEX': f"${amount:,.0f}"} 
-                            for year, amount in sorted(opex_summary.items())]
-                
-                st.dataframe(pd.DataFrame(opex_data), width='stretch', height=400)
+        ### Stakeholder Distribution
         
-        with tab3:
-            st.subheader("Financial Visualizations")
-            
-            results = session.query(CalculationResult).filter_by(
-                scenario_id=scenario_id
-            ).order_by(CalculationResult.year).all()
-            
-            # Revenue vs Costs
-            fig1 = go.Figure()
-            years = [r.year for r in results]
-            fig1.add_trace(go.Bar(name='Revenue', x=years, y=[r.total_revenue for r in results]))
-            fig1.add_trace(go.Bar(name='OPEX', x=years, y=[r.opex_total for r in results]))
-            fig1.add_trace(go.Bar(name='Depreciation', x=years, y=[r.depreciation for r in results]))
-            fig1.update_layout(
-                title='Revenue vs Costs',
-                xaxis_title='Year',
-                yaxis_title='USD',
-                barmode='group',
-                height=400
-            )
-            st.plotly_chart(fig1, width="stretch")
-            
-            # Cumulative Cash Flow
-            fig2 = go.Figure()
-            fig2.add_trace(go.Scatter(
-                x=years,
-                y=[r.cumulative_cash_flow for r in results],
-                mode='lines+markers',
-                name='Cumulative Cash Flow',
-                line=dict(color='green', width=3)
-            ))
-            fig2.update_layout(
-                title='Cumulative Cash Flow',
-                xaxis_title='Year',
-                yaxis_title='USD',
-                height=400
-            )
-            st.plotly_chart(fig2, width="stretch")
-            
-            # PSC Split
-            total_contractor = sum(r.contractor_share_aftertax for r in results)
-            total_government = sum(r.government_total_take for r in results)
-            
-            fig3 = go.Figure(data=[go.Pie(
-                labels=['Contractor (After-tax)', 'Government Total Take'],
-                values=[total_contractor, total_government],
-                hole=.3
-            )])
-            fig3.update_layout(title='Production Sharing Split', height=400)
-            st.plotly_chart(fig3, width="stretch")
+        - **Total Contractor Share (After-tax):** ${metrics.total_contractor_share:,.2f}
+        - **Total Government Take:** ${metrics.total_government_take:,.2f}
         
-        with tab4:
-            st.subheader("Scenario Summary Report")
-            
-            st.markdown(f"""
-            **Scenario:** {scenario.name}
-            
-            **Description:** {scenario.description or 'N/A'}
-            
-            **Created:** {scenario.created_at.strftime('%Y-%m-%d %H:%M') if scenario.created_at else 'N/A'}
-            
-            ---
-            
-            ### Financial Summary
-            
-            - **Total CAPEX:** ${metrics.total_capex:,.2f}
-            - **Total OPEX:** ${metrics.total_opex:,.2f}
-            - **Total Revenue:** ${metrics.total_revenue:,.2f}
-            - **Net Present Value (NPV @ 13%):** ${metrics.npv:,.2f}
-            - **Abandonment Security Reserve (ASR):** ${metrics.asr_amount:,.2f}
-            
-            ### Stakeholder Distribution
-            
-            - **Total Contractor Share (After-tax):** ${metrics.total_contractor_share:,.2f}
-            - **Total Government Take:** ${metrics.total_government_take:,.2f}
-            
-            ### Performance Indicators
-            
-            - **Return on Investment (ROI):** {((metrics.total_contractor_share - metrics.total_capex) / metrics.total_capex * 100):.2f}%
-            - **CAPEX/OPEX Ratio:** {(metrics.total_capex / metrics.total_opex):.2f}x
-            - **Revenue/CAPEX Ratio:** {(metrics.total_revenue / metrics.total_capex):.2f}x
-            """)
+        ### Performance Indicators
+        
+        - **Return on Investment (ROI):** {((metrics.total_contractor_share - metrics.total_capex) / metrics.total_capex * 100):.2f}%
+        - **CAPEX/OPEX Ratio:** {(metrics.total_capex / metrics.total_opex):.2f}x
+        - **Revenue/CAPEX Ratio:** {(metrics.total_revenue / metrics.total_capex):.2f}x
+        """)
+    
+    # Similar scenarios from the in-memory index (rebuilt only when metrics change)
+    st.markdown("### 🔎 Similar Scenarios")
+    with get_read_db_session() as session:
+        similarity_index = get_similarity_index(session)
+    
+    def similar_df(records, value_column, value_label, value_format):
+        return pd.DataFrame([{
+            'Scenario': r['scenario_name'],
+            value_label: value_format.format(r[value_column]),
+            'NPV': f"${r['npv']:,.0f}" if pd.notna(r['npv']) else "N/A",
+            'IRR': f"{r['irr'] * 100:.2f}%" if pd.notna(r['irr']) else "N/A",
+            'CAPEX': f"${r['total_capex']:,.0f}" if pd.notna(r['total_capex']) else "N/A",
+        } for r in records])
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**By CAPEX composition** (Jaccard similarity)")
+        similar = similarity_index.similar_composition(scenario_id)
+        if similar:
+            st.dataframe(similar_df(similar, 'similarity', 'Similarity', '{:.0%}'),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.caption("No other scenarios with results")
+    with col2:
+        st.markdown("**By metric profile** (NPV, IRR, CAPEX)")
+        similar = similarity_index.similar_metrics(scenario_id)
+        if similar:
+            st.dataframe(similar_df(similar, 'distance', 'Distance (σ)', '{:.2f}'),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.caption("No other scenarios with results")
+
+# Selections up to this size load all rows for charts/exports automatically
+COMPARE_FULL_LOAD_LIMIT = 2000
+
+# Maximum ranked matches returned by scenario search boxes
+SEARCH_RESULT_LIMIT = 200
+
+# Sort option -> database.queries.COMPARISON_SORT_COLUMNS key
+COMPARISON_SORT_KEYS = {
+    'Score': 'score',
+    'NPV (13%)': 'npv',
+    'IRR (%)': 'irr',
+    'Payback (years)': 'payback_period',
+    'Contractor Take': 'total_contractor_share',
+}
+
+def comparison_rows_to_df(rows, score_dict=None, first_rank: int = 1) -> pd.DataFrame:
+    """
+    Build the Detailed Comparison table from comparison query rows
+    
+    Args:
+        rows: Row dicts from database.queries.comparison_page
+        score_dict: Subset scores by scenario ID (None = use leaderboard score)
+        first_rank: Rank of the first row
+    """
+    data = []
+    for i, r in enumerate(rows):
+        score = score_dict.get(r['scenario_id']) if score_dict is not None else r['score']
+        data.append({
+            'Rank': first_rank + i,
+            'Scenario': r['scenario_name'][:50] + "..." if len(r['scenario_name']) > 50 else r['scenario_name'],
+            'Score': score,
+            'NPV (13%)': r['npv'],
+            'IRR (%)': r['irr'] * 100 if r['irr'] else None,
+            'Payback (years)': r['payback_period'],
+            'Gross Revenue': r['total_revenue'],
+            'Contractor Take': r['total_contractor_share'],
+            'Gov Take': r['total_government_take'],
+            'Contractor PTCF': r['contractor_ptcf'] or 0,
+            'Total CAPEX': r['total_capex'],
+            'Total OPEX': r['total_opex']
+        })
+    return pd.DataFrame(data, columns=['Rank', 'Scenario', 'Score', 'NPV (13%)', 'IRR (%)', 'Payback (years)',
+                                       'Gross Revenue', 'Contractor Take', 'Gov Take', 'Contractor PTCF',
+                                       'Total CAPEX', 'Total OPEX'])
 
 def compare_scenarios_page():
     """Scenario comparison page with bulk compare support"""
     st.title("Compare Scenarios")
     
-    with get_db_session() as session:
-        from sqlalchemy import func
+    # Query-only page: reads go to the replica / read-only pool, away from imports and recalculation
+    with get_read_db_session() as session:
+        total_scenarios, _ = count_active_scenarios(session, exact_limit=None)
         
-        scenarios = session.query(Scenario).filter_by(is_active=True).order_by(Scenario.id).all()
-        
-        if len(scenarios) < 2:
+        if total_scenarios < 2:
             st.warning("You need at least 2 scenarios to compare. Please create more scenarios first.")
             return
         
@@ -616,11 +731,14 @@ def compare_scenarios_page():
                 horizontal=True
             )
         
-        selected_scenarios = []
+        # The selection is kept as SQL filters - no Scenario objects are loaded
+        selection = {}
+        selected_ids = None  # None = all active scenarios
+        selected_count = 0
         
         if select_mode == "Select All":
-            selected_scenarios = scenarios
-            st.success(f"All {len(scenarios)} scenarios selected")
+            selected_count = total_scenarios
+            st.success(f"All {total_scenarios} scenarios selected")
             
         elif select_mode == "Select Range":
             col_a, col_b = st.columns(2)
@@ -628,63 +746,72 @@ def compare_scenarios_page():
                 start_idx = st.number_input(
                     "From Scenario #", 
                     min_value=1, 
-                    max_value=len(scenarios),
+                    max_value=total_scenarios,
                     value=1
                 )
             with col_b:
                 end_idx = st.number_input(
                     "To Scenario #", 
                     min_value=1, 
-                    max_value=len(scenarios),
-                    value=min(10, len(scenarios))
+                    max_value=total_scenarios,
+                    value=min(10, total_scenarios)
                 )
             
             if start_idx <= end_idx:
-                selected_scenarios = scenarios[start_idx-1:end_idx]
-                st.success(f"{len(selected_scenarios)} scenarios selected (#{start_idx} to #{end_idx})")
+                selection = {'id_min': scenario_id_at(session, start_idx), 'id_max': scenario_id_at(session, end_idx)}
+                selected_ids = [r[0] for r in session.query(Scenario.id).filter(
+                    Scenario.is_active == True,
+                    Scenario.id.between(selection['id_min'], selection['id_max'])
+                ).order_by(Scenario.id).all()]
+                selected_count = len(selected_ids)
+                st.success(f"{selected_count} scenarios selected (#{start_idx} to #{end_idx})")
             else:
                 st.error("Start must be <= End")
                 
         else:  # Manual Select
-            # Quick filter
-            filter_text = st.text_input("Filter scenarios by name", "")
-            
-            filtered_scenarios = scenarios
-            if filter_text:
-                filtered_scenarios = [s for s in scenarios if filter_text.lower() in s.name.lower()]
+            # Quick filter - ranked, indexed search (trigram on PostgreSQL)
+            filter_text = st.text_input("Filter scenarios by name", "", help="Type a fragment such as CCPP or VLGC")
             
             # Pagination for large lists
             items_per_page = 50
-            total_pages = max(1, (len(filtered_scenarios) - 1) // items_per_page + 1)
+            if filter_text.strip():
+                matches = search_scenarios(session, filter_text, limit=SEARCH_RESULT_LIMIT)
+                options_page = {'rows': [(m.id, m.name) for m in matches], 'total': len(matches)}
+                total_pages = 1
+                if len(matches) == SEARCH_RESULT_LIMIT:
+                    st.caption(f"Showing the best {SEARCH_RESULT_LIMIT} matches - refine the filter to narrow down")
+            else:
+                page_num = st.session_state.get('compare_pick_page', 1)
+                options_page = scenario_options(session, limit=items_per_page, offset=(page_num - 1) * items_per_page)
+                total_pages = max(1, (options_page['total'] - 1) // items_per_page + 1)
             
             if total_pages > 1:
                 page_num = st.selectbox(
                     f"Page (showing {items_per_page} per page)",
                     range(1, total_pages + 1),
+                    index=min(page_num, total_pages) - 1,
                     format_func=lambda x: f"Page {x} of {total_pages}"
                 )
-                start = (page_num - 1) * items_per_page
-                end = start + items_per_page
-                display_scenarios = filtered_scenarios[start:end]
-            else:
-                display_scenarios = filtered_scenarios
+                if page_num != st.session_state.get('compare_pick_page', 1):
+                    st.session_state.compare_pick_page = page_num
+                    st.rerun()
             
-            scenario_options = {f"{s.name} (ID: {s.id})": s for s in display_scenarios}
+            scenario_option_ids = {f"{name} (ID: {sid})": sid for sid, name in options_page['rows']}
             
             selected_names = st.multiselect(
-                f"Select Scenarios ({len(filtered_scenarios)} available)",
-                list(scenario_options.keys()),
+                f"Select Scenarios ({options_page['total']} available)",
+                list(scenario_option_ids.keys()),
                 help="Hold Ctrl/Cmd to select multiple"
             )
-            selected_scenarios = [scenario_options[name] for name in selected_names]
+            selected_ids = [scenario_option_ids[name] for name in selected_names]
+            selection = {'scenario_ids': selected_ids}
+            selected_count = len(selected_ids)
         
         # Check if enough scenarios selected
-        if len(selected_scenarios) < 2:
+        if selected_count < 2:
             st.info("Please select at least 2 scenarios to compare.")
             return
         
-        selected_ids = [s.id for s in selected_scenarios]
-        
         st.divider()
         
         # Run comparison
@@ -692,120 +819,110 @@ def compare_scenarios_page():
             st.session_state.run_comparison = True
         
         if st.session_state.get('run_comparison', False) or select_mode in ["Select All", "Select Range"]:
-            st.subheader(f"Comparison Results ({len(selected_scenarios)} scenarios)")
-            
-            # OPTIMIZED: Batch query instead of N+1 queries
-            progress_bar = st.progress(0, text="Loading scenarios...")
-            
-            selected_ids = [s.id for s in selected_scenarios]
-            
-            # Single batch query for all metrics using JOIN
-            progress_bar.progress(20, text="Fetching metrics...")
-            metrics_results = session.query(
-                Scenario.id,
-                Scenario.name,
-                ScenarioMetrics.npv,
-                ScenarioMetrics.irr,
-                ScenarioMetrics.payback_period_years,
-                ScenarioMetrics.total_revenue,
-                ScenarioMetrics.total_contractor_share,
-                ScenarioMetrics.total_government_take,
-                ScenarioMetrics.total_capex,
-                ScenarioMetrics.total_opex
-            ).join(
-                ScenarioMetrics, Scenario.id == ScenarioMetrics.scenario_id
-            ).filter(
-                Scenario.id.in_(selected_ids)
-            ).all()
-            
-            progress_bar.progress(60, text="Calculating PTCF...")
-            
-            # Batch query for PTCF (sum of contractor_tax per scenario)
-            ptcf_results = session.query(
-                CalculationResult.scenario_id,
-                func.sum(CalculationResult.contractor_tax)
-            ).filter(
-                CalculationResult.scenario_id.in_(selected_ids),
-                CalculationResult.contractor_tax > 0
-            ).group_by(CalculationResult.scenario_id).all()
-            
-            ptcf_dict = {r[0]: r[1] for r in ptcf_results}
-            
-            progress_bar.progress(90, text="Building comparison table...")
+            st.subheader(f"Comparison Results ({selected_count} scenarios)")
             
-            # Build comparison data
-            comparison_data = []
-            for r in metrics_results:
-                scenario_id = r[0]
-                comparison_data.append({
-                    'ID': scenario_id,
-                    'Scenario': r[1][:50] + "..." if len(r[1]) > 50 else r[1],
-                    'NPV (13%)': r[2],
-                    'IRR (%)': r[3] * 100 if r[3] else None,
-                    'Payback (years)': r[4],
-                    'Gross Revenue': r[5],
-                    'Contractor Take': r[6],
-                    'Gov Take': r[7],
-                    'Contractor PTCF': ptcf_dict.get(scenario_id, 0),
-                    'Total CAPEX': r[8],
-                    'Total OPEX': r[9]
-                })
-            
-            progress_bar.progress(100, text="Done!")
-            progress_bar.empty()
+            # Summary statistics are aggregated in SQL
+            summary = comparison_summary(session, **selection)
             
-            if not comparison_data:
+            if not summary['count']:
                 st.warning("No metrics found for selected scenarios. Please recalculate them.")
                 return
-                
-            df = pd.DataFrame(comparison_data)
             
             # Summary stats
             st.markdown("### Summary Statistics")
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                best_npv = df.loc[df['NPV (13%)'].idxmax()]
-                scenario_name = best_npv['Scenario'][:20] + '...' if len(best_npv['Scenario']) > 20 else best_npv['Scenario']
-                st.metric("Best NPV", f"${best_npv['NPV (13%)']:,.0f}", scenario_name)
+                best_name, best_value = summary['best_npv']
+                scenario_name = best_name[:20] + '...' if len(best_name) > 20 else best_name
+                st.metric("Best NPV", f"${best_value:,.0f}", scenario_name)
             with col2:
-                if df['IRR (%)'].notna().any():
-                    best_irr = df.loc[df['IRR (%)'].idxmax()]
-                    scenario_name = best_irr['Scenario'][:20] + '...' if len(best_irr['Scenario']) > 20 else best_irr['Scenario']
-                    st.metric("Best IRR", f"{best_irr['IRR (%)']:.2f}%", scenario_name)
+                if summary['best_irr'] and summary['best_irr'][1]:
+                    best_name, best_value = summary['best_irr']
+                    scenario_name = best_name[:20] + '...' if len(best_name) > 20 else best_name
+                    st.metric("Best IRR", f"{best_value * 100:.2f}%", scenario_name)
                 else:
                     st.metric("Best IRR", "N/A")
             with col3:
-                positive_npv = len(df[df['NPV (13%)'] > 0])
-                st.metric("Positive NPV", f"{positive_npv}/{len(df)}", f"{positive_npv/len(df)*100:.1f}%")
+                positive_npv = summary['positive_npv']
+                st.metric("Positive NPV", f"{positive_npv}/{summary['count']}", f"{positive_npv/summary['count']*100:.1f}%")
             with col4:
-                avg_payback = df['Payback (years)'].mean()
-                st.metric("Avg Payback", f"{avg_payback:.2f} yrs" if pd.notna(avg_payback) else "N/A")
+                avg_payback = summary['avg_payback']
+                st.metric("Avg Payback", f"{avg_payback:.2f} yrs" if avg_payback is not None else "N/A")
             
             # Detailed Comparison - with Score and sorting
             st.markdown("### Detailed Comparison")
             
-            # Calculate scores using comparator
-            comparator = ScenarioComparator(session)
-            ranked = comparator.rank_scenarios(selected_ids)
-            
-            # Create score and rank dictionary
-            score_dict = {r['scenario_id']: r['total_score'] for r in ranked}
-            rank_dict = {r['scenario_id']: r['rank'] for r in ranked}
-            
-            # Add Score and Rank to dataframe
-            df['Score'] = df['ID'].map(score_dict)
-            df['Rank'] = df['ID'].map(rank_dict)
-            
-            # Reorder columns - Rank first, keep all columns
-            cols = ['Rank', 'Scenario', 'Score', 'NPV (13%)', 'IRR (%)', 'Payback (years)', 
-                    'Gross Revenue', 'Contractor Take', 'Gov Take', 'Contractor PTCF', 'Total CAPEX', 'Total OPEX']
-            df = df[[c for c in cols if c in df.columns]]
+            # Calculate scores: all active scenarios are read from the materialized
+            # leaderboard (refreshed only when metrics changed), subsets are ranked on the fly
+            leaderboard = None
+            ranked = None
+            if select_mode == "Select All":
+                # Refresh writes on the primary (a replica shows it after replication lag)
+                with get_db_session() as write_session:
+                    LeaderboardStore(write_session).refresh()
+                leaderboard = LeaderboardStore(session)
+                score_dict = None  # scores come with the comparison rows
+            else:
+                # Selected subsets can be scored with another profile or custom weights
+                with st.expander("⚖️ Scoring weights"):
+                    score_profile = st.selectbox("Profile", list(SCORING_PROFILES) + ['custom'], key="score_profile")
+                    custom_weights = None
+                    if score_profile == 'custom':
+                        weight_cols = st.columns(len(SCORE_METRICS))
+                        custom_weights = {
+                            score: weight_cols[i].slider(
+                                score.replace('_score', '').upper(), 0.0, 1.0,
+                                SCORING_PROFILES['default'][score], 0.05, key=f"weight_{score}"
+                            )
+                            for i, (score, _, _) in enumerate(SCORE_METRICS)
+                        }
+                
+                # Metrics are loaded once; the tabs below reuse this ranking
+                comparison = ScenarioComparator(session).context(selected_ids)
+                score_args = {'weights': custom_weights} if custom_weights is not None else {'profile': score_profile}
+                # Lazy view: record dicts are only built for the rows shown
+                ranked = comparison.top(None, **score_args)
+                
+                # Create score and rank dictionary
+                ranked_ids = ranked.column('scenario_id').tolist()
+                score_dict = dict(zip(ranked_ids, ranked.column('total_score').tolist()))
+                rank_dict = dict(zip(ranked_ids, ranked.column('rank').tolist()))
             
             # TABS FOR ALL vs REALISTIC IRR
             tab_all, tab_realistic = st.tabs(["All Scenarios", "Realistic IRR (15-30%)"])
             
             # ===== TAB 1: ALL SCENARIOS =====
             with tab_all:
+                # Filters (applied in SQL)
+                col1, col2, col3 = st.columns([2, 1, 1])
+                with col1:
+                    detail_search = st.text_input("Filter by name", "", key="detail_search")
+                with col2:
+                    only_positive_npv = st.checkbox("NPV > 0 only", key="detail_positive_npv")
+                with col3:
+                    only_realistic_irr = st.checkbox("IRR 15-30% only", key="detail_realistic_irr")
+                
+                # Composition filters are single predicates on scenarios.capex_mask
+                capex_names = {name: bit for bit, _, name in get_capex_bits_cached()}
+                col1, col2 = st.columns(2)
+                with col1:
+                    include_items = st.multiselect("Must include CAPEX", list(capex_names), key="detail_capex_include")
+                with col2:
+                    exclude_items = st.multiselect(
+                        "Must exclude CAPEX",
+                        [name for name in capex_names if name not in include_items],
+                        key="detail_capex_exclude"
+                    )
+                
+                table_filters = dict(selection)
+                table_filters['search'] = detail_search or None
+                if only_positive_npv:
+                    table_filters['npv_min'] = 0
+                if only_realistic_irr:
+                    table_filters['irr_min'], table_filters['irr_max'] = 0.15, 0.30
+                table_filters['capex_include'] = sum(capex_names[name] for name in include_items)
+                table_filters['capex_exclude'] = sum(capex_names[name] for name in exclude_items)
+                
                 # Sorting options
                 col1, col2 = st.columns([2, 1])
                 with col1:
@@ -823,23 +940,37 @@ def compare_scenarios_page():
                     ascending = (sort_order == "Descending")  # For payback, descending shows worst first
                 else:
                     ascending = (sort_order == "Ascending")
-                
-                df_sorted = df.sort_values(by=sort_by, ascending=ascending, na_position='last').reset_index(drop=True)
-                
-                # Re-number Rank based on current sort (1, 2, 3, ...)
-                df_sorted['Rank'] = range(1, len(df_sorted) + 1)
+                sort_key = COMPARISON_SORT_KEYS[sort_by]
                 
                 # Pagination - 10 per page
                 items_per_page = 10
-                total_items = len(df_sorted)
-                total_pages = max(1, (total_items - 1) // items_per_page + 1)
                 
                 # Page selector
                 if 'detail_page' not in st.session_state:
                     st.session_state.detail_page = 1
                 
+                # Only one page of rows is fetched: sorted, filtered and paged in SQL
+                offset = (st.session_state.detail_page - 1) * items_per_page
+                if score_dict is not None and sort_key == 'score':
+                    # Subset scores only exist in memory: order matching IDs by them, fetch the page
+                    matching_ids = sorted(comparison_ids(session, **table_filters),
+                                          key=lambda sid: rank_dict.get(sid, len(rank_dict) + 1),
+                                          reverse=ascending)  # rank 1 = highest score
+                    total_items = len(matching_ids)
+                    page_ids = matching_ids[offset:offset + items_per_page]
+                    page_rows = comparison_page(session, scenario_ids=page_ids, limit=None)['rows']
+                    page_rows.sort(key=lambda r: page_ids.index(r['scenario_id']))
+                else:
+                    page_result = comparison_page(session, sort_by=sort_key, descending=not ascending,
+                                                  limit=items_per_page, offset=offset, **table_filters)
+                    page_rows, total_items = page_result['rows'], page_result['total']
+                
+                total_pages = max(1, (total_items - 1) // items_per_page + 1)
+                
                 # Ensure page is within bounds
-                st.session_state.detail_page = max(1, min(st.session_state.detail_page, total_pages))
+                if st.session_state.detail_page > total_pages:
+                    st.session_state.detail_page = total_pages
+                    st.rerun()
                 
                 col1, col2, col3 = st.columns([1, 2, 1])
                 with col2:
@@ -853,12 +984,10 @@ def compare_scenarios_page():
                     # Sync selectbox value to session state
                     if page_num != st.session_state.detail_page:
                         st.session_state.detail_page = page_num
+                        st.rerun()
                 
-                # Get current page using session state
-                current_page = st.session_state.detail_page
-                start_idx = (current_page - 1) * items_per_page
-                end_idx = start_idx + items_per_page
-                df_page = df_sorted.iloc[start_idx:end_idx].copy()
+                # Rank follows the current sort (1, 2, 3, ...)
+                df_page = comparison_rows_to_df(page_rows, score_dict, first_rank=offset + 1)
                 
                 # Format for display
                 df_display = df_page.copy()
@@ -893,15 +1022,34 @@ def compare_scenarios_page():
                         st.session_state.detail_page = total_pages
                         st.rerun()
             
+                # Statistics per CAPEX composition (GROUP BY capex_mask) for the filtered scenarios
+                with st.expander("Statistics by CAPEX composition"):
+                    bits = get_capex_bits_cached()
+                    groups = composition_stats(session, **table_filters)
+                    if groups:
+                        df_groups = pd.DataFrame([{
+                            'CAPEX Composition': ', '.join(decode_capex_mask(g['capex_mask'], bits)) or '(none)',
+                            'Scenarios': g['count'],
+                            'Positive NPV': g['positive_npv'],
+                            'Avg NPV': f"${g['avg_npv']:,.0f}" if g['avg_npv'] is not None else "N/A",
+                            'Max NPV': f"${g['max_npv']:,.0f}" if g['max_npv'] is not None else "N/A",
+                            'Avg IRR (%)': f"{g['avg_irr'] * 100:.2f}%" if g['avg_irr'] is not None else "N/A",
+                            'Avg Payback (years)': f"{g['avg_payback']:.2f}" if g['avg_payback'] is not None else "N/A"
+                        } for g in groups])
+                        st.caption(f"{len(groups)} distinct compositions, best average NPV first")
+                        st.dataframe(df_groups, use_container_width=True, hide_index=True)
+                    else:
+                        st.info("No scenarios match the current filters.")
+            
             # ===== TAB 2: REALISTIC IRR 15-30% =====
             with tab_realistic:
                 st.caption("Scenarios with realistic Internal Rate of Return between 15% and 30%, ranked by overall score")
                 
                 # Filter for IRR between 15-30%
-                realistic_irr = [
-                    r for r in ranked 
-                    if r.get('irr') and 0.15 <= r['irr'] <= 0.30
-                ]
+                if leaderboard is not None:
+                    realistic_irr = leaderboard.top(limit=None, irr_min=0.15, irr_max=0.30)
+                else:
+                    realistic_irr = list(comparison.top(None, irr_min=0.15, irr_max=0.30, **score_args))
                 
                 if realistic_irr:
                     # Re-rank within filtered set
@@ -1001,90 +1149,128 @@ def compare_scenarios_page():
                 else:
                     st.warning("No scenarios found with IRR between 15% and 30%")
             
-            # Charts for bulk comparison
+            # Charts and full exports need every row of the selection - load it on demand for large selections
             st.markdown("### Visual Comparison")
-            
-            tab1, tab2, tab3 = st.tabs(["NPV Distribution", "Top/Bottom Performers", "Scatter Plot"])
-            
-            with tab1:
-                fig_npv = px.histogram(
-                    df, x='NPV (13%)', 
-                    nbins=min(30, len(df)),
-                    title="NPV Distribution",
-                    labels={'NPV (13%)': 'NPV ($)'}
-                )
-                fig_npv.add_vline(x=0, line_dash="dash", line_color="red", annotation_text="Break-even")
-                st.plotly_chart(fig_npv, use_container_width=True)
-            
-            with tab2:
-                # Top 10 and Bottom 10
-                top_10 = df.nlargest(min(10, len(df)), 'NPV (13%)')
-                bottom_10 = df.nsmallest(min(10, len(df)), 'NPV (13%)')
+            load_all = st.checkbox(
+                f"Load all {selected_count} scenarios for charts and export",
+                value=selected_count <= COMPARE_FULL_LOAD_LIMIT,
+                key="compare_load_all"
+            )
+            if not load_all:
+                st.info("Charts and exports are disabled for large selections. Tick the box above to load all rows.")
+            else:
+                all_rows = comparison_page(session, sort_by='scenario_id', descending=False, limit=None, **table_filters)['rows']
+                df = comparison_rows_to_df(all_rows, score_dict)
+                df_sorted = df.sort_values(by=sort_by, ascending=ascending, na_position='last').reset_index(drop=True)
+                df_sorted['Rank'] = range(1, len(df_sorted) + 1)
+                export_ids = [r['scenario_id'] for r in all_rows]
+                
+                tab1, tab2, tab3 = st.tabs(["NPV Distribution", "Top/Bottom Performers", "Scatter Plot"])
+                
+                with tab1:
+                    fig_npv = px.histogram(
+                        df, x='NPV (13%)', 
+                        nbins=min(30, len(df)),
+                        title="NPV Distribution",
+                        labels={'NPV (13%)': 'NPV ($)'}
+                    )
+                    fig_npv.add_vline(x=0, line_dash="dash", line_color="red", annotation_text="Break-even")
+                    st.plotly_chart(fig_npv, use_container_width=True)
+                
+                with tab2:
+                    # Top 10 and Bottom 10
+                    top_10 = df.nlargest(min(10, len(df)), 'NPV (13%)')
+                    bottom_10 = df.nsmallest(min(10, len(df)), 'NPV (13%)')
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown("**🏆 Top 10 by NPV**")
+                        fig_top = px.bar(
+                            top_10, x='Scenario', y='NPV (13%)',
+                            color='NPV (13%)',
+                            color_continuous_scale='Greens'
+                        )
+                        fig_top.update_layout(showlegend=False, xaxis_tickangle=-45)
+                        st.plotly_chart(fig_top, use_container_width=True)
+                    
+                    with col2:
+                        st.markdown("**📉 Bottom 10 by NPV**")
+                        fig_bottom = px.bar(
+                            bottom_10, x='Scenario', y='NPV (13%)',
+                            color='NPV (13%)',
+                            color_continuous_scale='Reds_r'
+                        )
+                        fig_bottom.update_layout(showlegend=False, xaxis_tickangle=-45)
+                        st.plotly_chart(fig_bottom, use_container_width=True)
+                
+                with tab3:
+                    # Pareto frontier: scenarios no other scenario beats on every chosen objective
+                    pareto_objectives = st.multiselect(
+                        "Pareto objectives",
+                        list(PARETO_LABELS),
+                        default=list(DEFAULT_OBJECTIVES),
+                        format_func=PARETO_LABELS.get,
+                        key="pareto_objectives"
+                    )
+                    
+                    fig_scatter = px.scatter(
+                        df, x='Total CAPEX', y='NPV (13%)',
+                        color='IRR (%)',
+                        size='Gross Revenue',
+                        hover_name='Scenario',
+                        title="CAPEX vs NPV (size = Revenue, color = IRR)"
+                    )
+                    fig_scatter.add_hline(y=0, line_dash="dash", line_color="red")
+                    
+                    if pareto_objectives:
+                        on_front = pareto_fronts(objective_matrix(pd.DataFrame(all_rows), pareto_objectives)) == 1
+                        frontier = df[on_front].sort_values('Total CAPEX')
+                        fig_scatter.add_trace(go.Scatter(
+                            x=frontier['Total CAPEX'], y=frontier['NPV (13%)'],
+                            mode='lines+markers' if set(pareto_objectives) == {'npv', 'capex'} else 'markers',
+                            marker=dict(symbol='star', size=12, color='gold', line=dict(width=1, color='black')),
+                            line=dict(dash='dot', color='black'),
+                            hovertext=frontier['Scenario'],
+                            name='Pareto frontier'
+                        ))
+                        fig_scatter.update_layout(legend=dict(orientation='h', y=-0.2))
+                        st.caption(f"{len(frontier)} of {len(df)} scenarios are on the Pareto frontier of "
+                                   f"{', '.join(PARETO_LABELS[key] for key in pareto_objectives)}")
+                    
+                    st.plotly_chart(fig_scatter, use_container_width=True)
+                
+                # Export
+                st.markdown("### Export Comparison")
                 
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.markdown("**🏆 Top 10 by NPV**")
-                    fig_top = px.bar(
-                        top_10, x='Scenario', y='NPV (13%)',
-                        color='NPV (13%)',
-                        color_continuous_scale='Greens'
+                    # CSV export
+                    csv_data = df_sorted.to_csv(index=False)
+                    st.download_button(
+                        "Download CSV",
+                        csv_data,
+                        f"comparison_{len(df_sorted)}_scenarios.csv",
+                        "text/csv",
+                        key="csv_download"
                     )
-                    fig_top.update_layout(showlegend=False, xaxis_tickangle=-45)
-                    st.plotly_chart(fig_top, use_container_width=True)
                 
                 with col2:
-                    st.markdown("**📉 Bottom 10 by NPV**")
-                    fig_bottom = px.bar(
-                        bottom_10, x='Scenario', y='NPV (13%)',
-                        color='NPV (13%)',
-                        color_continuous_scale='Reds_r'
+                    # Excel export with full details
+                    from io import BytesIO
+                    output = BytesIO()
+                    exporter = ExcelExporter(session)
+                    exporter.export_comparison(export_ids, output)
+                    output.seek(0)
+                    filename = generate_filename(f"comparison_{len(export_ids)}_scenarios")
+                    st.download_button(
+                        label="Download Excel Report",
+                        data=output,
+                        file_name=filename,
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        key="excel_download",
+                        type="primary"
                     )
-                    fig_bottom.update_layout(showlegend=False, xaxis_tickangle=-45)
-                    st.plotly_chart(fig_bottom, use_container_width=True)
-            
-            with tab3:
-                fig_scatter = px.scatter(
-                    df, x='Total CAPEX', y='NPV (13%)',
-                    color='IRR (%)',
-                    size='Gross Revenue',
-                    hover_name='Scenario',
-                    title="CAPEX vs NPV (size = Revenue, color = IRR)"
-                )
-                fig_scatter.add_hline(y=0, line_dash="dash", line_color="red")
-                st.plotly_chart(fig_scatter, use_container_width=True)
-            
-            # Export
-            st.markdown("### Export Comparison")
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                # CSV export
-                csv_data = df_sorted.to_csv(index=False)
-                st.download_button(
-                    "Download CSV",
-                    csv_data,
-                    f"comparison_{len(selected_scenarios)}_scenarios.csv",
-                    "text/csv",
-                    key="csv_download"
-                )
-            
-            with col2:
-                # Excel export with full details
-                from io import BytesIO
-                output = BytesIO()
-                exporter = ExcelExporter(session)
-                exporter.export_comparison(selected_ids, output)
-                output.seek(0)
-                filename = generate_filename(f"comparison_{len(selected_scenarios)}_scenarios")
-                st.download_button(
-                    label="Download Excel Report",
-                    data=output,
-                    file_name=filename,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    key="excel_download",
-                    type="primary"
-                )
-            
+                
             # ============================================
             # LEADERBOARD TOP 100 WITH SCORING
             # ============================================
@@ -1094,18 +1280,13 @@ def compare_scenarios_page():
             **Scoring Weights:** NPV (30%) | Contractor Share (25%) | IRR (15%) | Payback Period (10%) | CAPEX (10%) | OPEX (10%)
             """)
             
-            # Use comparator for scoring
-            comparator = ScenarioComparator(session)
-            
-            # Progress bar for leaderboard calculation
-            lb_progress = st.progress(0, text="Calculating leaderboard scores...")
-            ranked = comparator.rank_scenarios(selected_ids)
-            lb_progress.progress(100, text="Leaderboard calculation complete!")
-            lb_progress.empty()
-            
-            if ranked:
-                # Limit to top 100
+            # Reuse the ranking computed above (indexed ORDER BY rank LIMIT for Select All)
+            if leaderboard is not None:
+                top_100 = leaderboard.top(limit=100)
+            else:
                 top_100 = ranked[:100]
+            
+            if top_100:
                 
                 # Pagination - 10 per page
                 items_per_page = 10
@@ -1200,7 +1381,7 @@ def compare_scenarios_page():
                     st.success(f"""
                     **BEST SCENARIO: {best['scenario_name']}**
                     
-                    Score: **{best['total_score']:.2f}/100** | NPV: **${best['npv']:,.0f}** | IRR: **{best.get('irr', 0)*100:.2f}%** | Payback: **{best.get('payback_period', 0):.2f} years**
+                    Score: **{best['total_score']:.2f}/100** | NPV: **${best['npv']:,.0f}** | IRR: **{(best.get('irr') or 0)*100:.2f}%** | Payback: **{(best.get('payback_period') or 0):.2f} years**
                     """)
                 
                 # Export leaderboard
@@ -1229,6 +1410,52 @@ def compare_scenarios_page():
                     key="lb_csv_download"
                 )
 
+def render_query_stats_panel(stats):
+    """Debug panel with DB query statistics for the current rerun"""
+    summary = stats.summary()
+    with st.sidebar.expander(f"🔎 DB Queries: {summary['query_count']} ({summary['total_time_ms']:.0f} ms)"):
+        st.caption(f"{summary['distinct_statements']} distinct statements")
+        for fingerprint, count, total in stats.repeated():
+            st.warning(f"{count} similar queries ({total * 1000:.0f} ms) - possible N+1:\n\n`{fingerprint[:150]}`")
+        
+        st.markdown("**Most repeated**")
+        st.dataframe(pd.DataFrame([
+            {'Count': f['count'], 'Time (ms)': round(f['time_ms'], 1), 'Statement': f['fingerprint'][:120]}
+            for f in summary['top_fingerprints']
+        ]), hide_index=True)
+        
+        st.markdown("**Slowest**")
+        st.dataframe(pd.DataFrame([
+            {'Time (ms)': round(q['time_ms'], 1), 'Statement': q['statement'][:120]}
+            for q in summary['slowest']
+        ]), hide_index=True)
+
+def render_pool_stats_panel():
+    """Debug panel with connection pool state and counters (process-wide)"""
+    pools = pool_status()
+    if not pools:
+        return
+    with st.sidebar.expander("🔌 Connection Pools"):
+        st.dataframe(pd.DataFrame([{
+            'Pool': p['label'],
+            'Profile': p['profile'],
+            'Checked out': f"{p.get('checked_out', 0)}/{p.get('pool_size', 0)}",
+            'Overflow': p.get('overflow', 0),
+            'Wait p95 (ms)': round(p['wait_p95_ms'], 1),
+            'Wait max (ms)': round(p['wait_max_ms'], 1),
+            'Timeouts': p['timeouts'],
+            'Invalidated': p['invalidations'],
+            'Pre-ping failed': p['pre_ping_failures'],
+            'Opened': p['connects'],
+            'Closed': p['closes'],
+        } for p in pools]), hide_index=True)
+        st.caption(f"Audit log ({AUDIT_MODE}): {audit_writer.pending():,} buffered, "
+                   f"{audit_writer.written:,} written, {audit_writer.failed:,} failed")
+        for p in pools:
+            if p['timeouts'] or p['slow_checkouts']:
+                st.warning(f"{p['label']} pool: {p['timeouts']} checkout timeouts, "
+                           f"{p['slow_checkouts']} slow checkouts - consider a larger pool or profile")
+
 def main():
     """Main application"""
     
@@ -1276,9 +1503,8 @@ def main():
         **Get started by creating a new scenario!**
         """)
         
-        with get_db_session() as session:
-            scenario_count = session.query(Scenario).filter_by(is_active=True).count()
-            st.info(f"You currently have **{scenario_count}** active scenario(s).")
+        scenario_count, is_exact = get_scenario_count_cached()
+        st.info(f"You currently have **{'' if is_exact else '~'}{scenario_count:,}** active scenario(s).")
     
     elif page == "Create Scenario":
         st.title("Create New Scenario")
@@ -1344,6 +1570,7 @@ def main():
                                 selected_items
                             )
                             
+                            get_scenario_count_cached.clear()
                             st.success(f"Scenario '{scenario.name}' created successfully!")
                             st.session_state.current_scenario = scenario.id
                             
@@ -1499,9 +1726,18 @@ def main():
                 calc_financials = st.checkbox("Calculate financial metrics", value=True, 
                     help="Uncheck to import faster (you can calculate later)")
                 
+                # Parallel workers option
+                import_workers = st.number_input(
+                    "Parallel workers", min_value=1, max_value=16, value=1, step=1,
+                    help="Number of database connections used for OPEX generation and calculations (bounded by the bulk pool size, BULK_POOL_SIZE)"
+                )
+                profile_import = st.checkbox("Profile import stages", value=False,
+                    help="Show where the import time goes (parse, insert, OPEX, calculate)")
+                
                 # Import button
                 if st.button("🚀 Start Import", type="primary"):
-                    with get_db_session() as session:
+                    # Bulk pool: a large import cannot take the connections other users' pages need
+                    with get_bulk_db_session() as session:
                         from engine.bulk_importer import BulkScenarioImporter
                         importer = BulkScenarioImporter(session)
                         
@@ -1512,13 +1748,19 @@ def main():
                             progress_bar.progress(current / total)
                             status_text.text(f"{message} ({current}/{total})")
                         
-                        results = importer.import_from_excel(
-                            tmp_path,
-                            scenario_ids=selected_ids,
-                            calculate=calc_financials,
-                            progress_callback=update_progress
-                        )
+                        from contextlib import nullcontext
+                        from engine.profiler import profiling
+                        
+                        with (profiling() if profile_import else nullcontext()) as import_profile:
+                            results = importer.import_from_excel(
+                                tmp_path,
+                                scenario_ids=selected_ids,
+                                calculate=calc_financials,
+                                progress_callback=update_progress,
+                                workers=int(import_workers)
+                            )
                         
+                        get_scenario_count_cached.clear()
                         progress_bar.progress(1.0)
                         status_text.text("Import complete!")
                         
@@ -1534,6 +1776,7 @@ def main():
                         
                         if results['created'] > 0:
                             st.success(f"✅ Successfully imported {results['created']} scenarios!")
+                            st.caption(f"Import batch: `{results['import_batch']}` (can be deleted as a whole in Manage Scenarios)")
                             
                             # Show created scenarios
                             with st.expander("View created scenarios", expanded=True):
@@ -1543,6 +1786,10 @@ def main():
                                 if len(created) > 20:
                                     st.info(f"... and {len(created) - 20} more")
                         
+                        if import_profile is not None:
+                            with st.expander(f"⏱️ Import profile ({import_profile.wall_time:.2f}s)", expanded=True):
+                                st.dataframe(import_profile.to_dataframe(), use_container_width=True, hide_index=True)
+                        
                         if results['errors'] > 0:
                             with st.expander("View errors", expanded=True):
                                 errors = [s for s in results['scenarios'] if s['status'] == 'error']
@@ -1580,6 +1827,51 @@ def main():
         st.title("📋 Manage Scenarios")
         
         with get_db_session() as session:
+            # Scenarios whose reference data (CAPEX costs, OPEX mappings, fiscal terms, pricing) changed
+            recalculator = StaleRecalculator(session)
+            stale_count = recalculator.stale_count()
+            if stale_count:
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.warning(f"⚠️ {stale_count:,} scenarios have outdated results because reference data changed since they were calculated.")
+                with col2:
+                    if st.button("Recalculate stale only", key="recalculate_stale", use_container_width=True):
+                        progress_bar = st.progress(0)
+                        with get_bulk_db_session() as bulk_session:
+                            summary = StaleRecalculator(bulk_session).recalculate_stale(
+                                progress_callback=lambda done, total: progress_bar.progress(done / total)
+                            )
+                        st.success(f"Recalculated {summary['recalculated']:,} scenarios")
+                        for scenario_id, error in summary['errors']:
+                            st.error(f"Scenario {scenario_id}: {error}")
+            
+            # Whole bulk imports are removed in one set-based operation
+            batches = import_batches(session)
+            if batches:
+                with st.expander("🗑️ Delete an import batch"):
+                    batch_labels = {
+                        f"{batch} - {count:,} scenarios (imported {created:%Y-%m-%d %H:%M})": batch
+                        for batch, count, created in batches
+                    }
+                    batch_label = st.selectbox("Import batch", list(batch_labels), key="delete_batch")
+                    delete_mode = st.radio(
+                        "Mode",
+                        [f"Move to trash (purged after {PURGE_AFTER_DAYS} days)", "Delete permanently"],
+                        horizontal=True,
+                        key="delete_batch_mode"
+                    )
+                    if st.button("Delete batch", key="delete_batch_button", type="secondary"):
+                        batch = batch_labels[batch_label]
+                        if st.session_state.get("confirm_delete_batch") == batch:
+                            deleted = delete_import_batch(session, batch, soft=delete_mode.startswith("Move"))
+                            get_scenario_count_cached.clear()
+                            del st.session_state["confirm_delete_batch"]
+                            st.success(f"Deleted {deleted:,} scenarios from batch {batch}")
+                            st.rerun()
+                        else:
+                            st.session_state["confirm_delete_batch"] = batch
+                            st.warning("Click Delete batch again to confirm")
+            
             # Sorting options
             col1, col2 = st.columns([2, 1])
             with col1:
@@ -1590,42 +1882,23 @@ def main():
                     key="manage_sort"
                 )
             
-            # Query with sorting
-            if sort_order == "Newest First":
-                scenarios = session.query(Scenario).filter_by(is_active=True).order_by(Scenario.created_at.desc()).all()
-            else:
-                scenarios = session.query(Scenario).filter_by(is_active=True).order_by(Scenario.created_at.asc()).all()
+            # Keyset pagination - each page is one indexed range scan, no matter how deep
+            items_per_page = 10
+            nav_key = "manage_newest" if sort_order == "Newest First" else "manage_oldest"
+            page_data, page_num = get_keyset_page(session, nav_key, items_per_page,
+                                                  newest_first=(sort_order == "Newest First"))
+            page_scenarios = page_data['rows']
             
-            if not scenarios:
+            if not page_scenarios:
                 st.warning("No scenarios found. Create a new scenario to get started.")
             else:
-                st.markdown(f"**Total Active Scenarios:** {len(scenarios)}")
-                
-                # Pagination - 10 per page
-                items_per_page = 10
-                total_items = len(scenarios)
-                total_pages = max(1, (total_items - 1) // items_per_page + 1)
-                
-                # Page selector
-                with col2:
-                    if 'manage_page' not in st.session_state:
-                        st.session_state.manage_page = 1
-                    
-                    page_num = st.selectbox(
-                        "Page",
-                        range(1, total_pages + 1),
-                        index=min(st.session_state.manage_page - 1, total_pages - 1),
-                        format_func=lambda x: f"Page {x}/{total_pages}",
-                        key="manage_page_select"
-                    )
-                    st.session_state.manage_page = page_num
+                total_items, is_exact = get_scenario_count_cached()
+                total_label = "" if is_exact else "~"
+                total_pages = max(page_num, (total_items - 1) // items_per_page + 1)
+                st.markdown(f"**Total Active Scenarios:** {total_label}{total_items:,}")
                 
-                # Get current page items
                 start_idx = (page_num - 1) * items_per_page
-                end_idx = start_idx + items_per_page
-                page_scenarios = scenarios[start_idx:end_idx]
-                
-                st.caption(f"Showing {start_idx + 1}-{min(end_idx, total_items)} of {total_items} scenarios")
+                st.caption(f"Showing {start_idx + 1}-{start_idx + len(page_scenarios)} of {total_label}{total_items:,} scenarios")
                 st.markdown("---")
                 
                 # Display scenarios in a table with actions
@@ -1634,18 +1907,15 @@ def main():
                         if scenario.description:
                             st.write(f"**Description:** {scenario.description}")
                         
-                        # Get metrics
-                        from database.models import ScenarioMetrics
-                        metrics = session.query(ScenarioMetrics).filter_by(scenario_id=scenario.id).first()
-                        
-                        if metrics:
+                        # Metrics come with the page query (LEFT JOIN)
+                        if scenario.npv is not None:
                             col1, col2, col3 = st.columns(3)
                             with col1:
-                                st.metric("Total CAPEX", f"${metrics.total_capex:,.0f}")
+                                st.metric("Total CAPEX", f"${scenario.total_capex:,.0f}")
                             with col2:
-                                st.metric("NPV", f"${metrics.npv:,.0f}")
+                                st.metric("NPV", f"${scenario.npv:,.0f}")
                             with col3:
-                                st.metric("Total Revenue", f"${metrics.total_revenue:,.0f}")
+                                st.metric("Total Revenue", f"${scenario.total_revenue:,.0f}")
                         
                         st.markdown("---")
                         col_a, col_b, col_c, col_d, col_e = st.columns(5)
@@ -1679,6 +1949,7 @@ def main():
                         with col_c:
                             if st.button("Duplicate", key=f"dup_{scenario.id}"):
                                 # Duplicate scenario
+                                scenario = session.get(Scenario, scenario.id)
                                 new_name = f"{scenario.name} (Copy)"
                                 new_scenario = Scenario(
                                     name=new_name,
@@ -1688,7 +1959,8 @@ def main():
                                     pricing_assumptions_id=scenario.pricing_assumptions_id,
                                     production_enhancement_id=scenario.production_enhancement_id,
                                     created_by=scenario.created_by,
-                                    is_active=True
+                                    is_active=True,
+                                    capex_mask=scenario.capex_mask
                                 )
                                 session.add(new_scenario)
                                 session.flush()
@@ -1720,19 +1992,16 @@ def main():
                                 calculator = FinancialCalculator(new_scenario, session)
                                 calculator.save_calculations()
                                 
+                                get_scenario_count_cached.clear()
                                 st.success(f"Scenario '{new_name}' created successfully!")
                                 st.rerun()
                         
                         with col_d:
                             if st.button("Delete", key=f"del_{scenario.id}", type="secondary"):
                                 if st.session_state.get(f"confirm_delete_{scenario.id}", False):
-                                    # Delete related data
-                                    session.query(ScenarioCapex).filter_by(scenario_id=scenario.id).delete()
-                                    session.query(ScenarioOpex).filter_by(scenario_id=scenario.id).delete()
-                                    session.query(CalculationResult).filter_by(scenario_id=scenario.id).delete()
-                                    session.query(ScenarioMetrics).filter_by(scenario_id=scenario.id).delete()
-                                    session.delete(scenario)
-                                    session.commit()
+                                    # Related rows are removed by ON DELETE CASCADE
+                                    delete_scenarios(session, [scenario.id])
+                                    get_scenario_count_cached.clear()
                                     
                                     st.success(f"Scenario '{scenario.name}' deleted successfully!")
                                     if f"confirm_delete_{scenario.id}" in st.session_state:
@@ -1750,31 +2019,15 @@ def main():
                 
                 # Pagination navigation buttons
                 st.markdown("---")
-                col1, col2, col3, col4, col5 = st.columns(5)
-                with col1:
-                    if st.button("⏮️ First", disabled=(page_num == 1), key="manage_first"):
-                        st.session_state.manage_page = 1
-                        st.rerun()
-                with col2:
-                    if st.button("◀️ Prev", disabled=(page_num == 1), key="manage_prev"):
-                        st.session_state.manage_page = page_num - 1
-                        st.rerun()
-                with col3:
-                    st.markdown(f"<center>Page {page_num} of {total_pages}</center>", unsafe_allow_html=True)
-                with col4:
-                    if st.button("Next ▶️", disabled=(page_num == total_pages), key="manage_next"):
-                        st.session_state.manage_page = page_num + 1
-                        st.rerun()
-                with col5:
-                    if st.button("Last ⏭️", disabled=(page_num == total_pages), key="manage_last"):
-                        st.session_state.manage_page = total_pages
-                        st.rerun()
+                render_keyset_navigation(nav_key, page_data, page_num, total_pages, total_label)
     
     elif page == "View Scenarios":
         st.title("View Existing Scenarios")
         
         with get_db_session() as session:
-            scenarios = session.query(Scenario).filter_by(is_active=True).order_by(Scenario.created_at.desc()).all()
+            # Only one keyset page of (id, name, created_at) rows is loaded for the selector
+            page_data, page_num = get_keyset_page(session, "view", 50)
+            scenarios = page_data['rows']
             
             if not scenarios:
                 st.warning("No scenarios found. Create a new scenario to get started.")
@@ -1785,7 +2038,20 @@ def main():
                     del st.session_state.selected_scenario_id
                     display_scenario_results(scenario_id)
                 else:
-                    # Scenario selector
+                    # Scenario selector: ranked search results, or browse newest first
+                    search_text = st.text_input("Search scenarios", "", key="view_search",
+                                                help="Matches name and description, best matches first")
+                    if search_text.strip():
+                        scenarios = search_scenarios(session, search_text, limit=SEARCH_RESULT_LIMIT)
+                        if not scenarios:
+                            st.info("No scenarios match your search.")
+                            return
+                    else:
+                        total_items, is_exact = get_scenario_count_cached()
+                        total_label = "" if is_exact else "~"
+                        total_pages = max(page_num, (total_items - 1) // 50 + 1)
+                        render_keyset_navigation("view", page_data, page_num, total_pages, total_label)
+                    
                     scenario_options = {f"{s.name} (Created: {s.created_at.strftime('%Y-%m-%d')})": s.id 
                                        for s in scenarios}
                     selected_name = st.selectbox("Select a scenario to view:", list(scenario_options.keys()))
@@ -1868,4 +2134,10 @@ def main():
         """)
 
 if __name__ == "__main__":
-    main()
+    with track_queries("app rerun") as query_stats:
+        main()
+    
+    # Set SHOW_QUERY_STATS=1 to see per-rerun DB statistics and pool state in the sidebar
+    if os.getenv('SHOW_QUERY_STATS') == '1':
+        render_query_stats_panel(query_stats)
+        render_pool_stats_panel()
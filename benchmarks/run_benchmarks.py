@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Times the engine against a local database with synthetic datasets
+
+Usage:
+    python -m benchmarks.run_benchmarks --scale 512
+    python -m benchmarks.run_benchmarks --scale 10k --database-url postgresql://localhost/bench --reset
+    python -m benchmarks.run_benchmarks --scale 100k --sample 100
+
+Results are written as JSON to benchmarks/results/ so runs can be
+compared between versions.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from io import BytesIO
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from database.audit import audit_writer
+from database.connection import create_database_engine
+from database.models import Base, Scenario, ScenarioMetrics
+from database.queries import comparison_page
+from engine.bulk_importer import BulkScenarioImporter
+from engine.calculator import FinancialCalculator, save_calculations_batch
+from engine.comparator import ScenarioComparator
+from engine.leaderboard import LeaderboardStore
+from engine.opex_generator import OpexGenerator
+from utils.export import ExcelExporter
+from benchmarks.synthetic import seed_reference_data, populate_scenarios, build_template
+
+SCALES = {'512': 512, '10k': 10_000, '100k': 100_000}
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def timed(fn: Callable, repeat: int = 1) -> Dict:
+    """Run fn `repeat` times and return timing statistics in seconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return {
+        'repeat': repeat,
+        'min_s': min(durations),
+        'mean_s': sum(durations) / len(durations),
+        'max_s': max(durations),
+    }
+
+
+def git_revision() -> str:
+    """Short git revision of the working tree (best effort)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(RESULTS_DIR), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def prepare_database(database_url: str, reset: bool):
+    """Create the schema, refusing to touch a non-empty database unless reset"""
+    engine = create_database_engine(database_url)
+    if inspect(engine).has_table('scenarios'):
+        with engine.connect() as conn:
+            existing = conn.execute(text('SELECT COUNT(*) FROM scenarios')).scalar()
+        if existing and not reset:
+            raise SystemExit(f"Database already has {existing} scenarios; pass --reset to drop and recreate it")
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def run(scale: str, database_url: str, sample: int, import_rows: int,
+        repeat: int, workers: int, reset: bool) -> Dict:
+    """
+    Build a synthetic dataset and time the engine components
+
+    Args:
+        scale: Key of SCALES
+        database_url: Target database (SQLite file or local Postgres)
+        sample: Scenarios used for per-scenario stages (OPEX, calculator, export)
+        import_rows: Template rows for the bulk import stage
+        repeat: Repetitions for read-only stages
+        workers: Worker count for the parallel bulk import stage
+        reset: Drop existing tables first
+
+    Returns:
+        Result dictionary (also written as JSON)
+    """
+    n_scenarios = SCALES[scale]
+    engine = prepare_database(database_url, reset)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    session = Session()
+    results = {}
+
+    print(f"Seeding {n_scenarios:,} synthetic scenarios...")
+    start = time.perf_counter()
+    reference = seed_reference_data(session, n_profiles=4)
+    scenario_ids = populate_scenarios(session, reference, n_scenarios)
+    results['seed_dataset'] = {'repeat': 1, 'min_s': time.perf_counter() - start}
+    sample_ids = scenario_ids[:sample]
+    fiscal = reference['fiscal']
+
+    print(f"OpexGenerator on {len(sample_ids)} scenarios...")
+    def generate_opex():
+        generator = OpexGenerator(session)
+        for scenario_id in sample_ids:
+            generator.save_opex_for_scenario(scenario_id, fiscal.project_start_year, fiscal.project_end_year)
+    results['opex_generator'] = timed(generate_opex)
+
+    print(f"FinancialCalculator on {len(sample_ids)} scenarios...")
+    sample_scenarios = session.query(Scenario).filter(Scenario.id.in_(sample_ids)).all()
+    def calculate_only():
+        for scenario in sample_scenarios:
+            FinancialCalculator(scenario, session).calculate_scenario()
+    results['calculator_calculate'] = timed(calculate_only, repeat)
+    def calculate_and_save():
+        for scenario in sample_scenarios:
+            FinancialCalculator(scenario, session).save_calculations()
+    results['calculator_save'] = timed(calculate_and_save)
+    results['calculator_save_batch'] = timed(lambda: save_calculations_batch(session, sample_scenarios))
+
+    print(f"Metrics load: N+1 vs batch on {len(sample_ids)} scenarios...")
+    comparator = ScenarioComparator(session)
+    def metrics_n_plus_one():
+        for scenario_id in sample_ids:
+            session.query(Scenario).filter_by(id=scenario_id).first()
+            session.query(ScenarioMetrics).filter_by(scenario_id=scenario_id).first()
+        session.expire_all()
+    results['metrics_load_n_plus_one'] = timed(metrics_n_plus_one, repeat)
+    results['metrics_load_batch'] = timed(lambda: comparator.get_scenario_metrics_df(sample_ids), repeat)
+
+    print(f"rank_scenarios on {n_scenarios:,} scenarios...")
+    results['rank_scenarios'] = timed(lambda: comparator.rank_scenarios(scenario_ids), repeat)
+    results['rank_scenarios_sql_top_100'] = timed(
+        lambda: comparator.rank_scenarios_sql(scenario_ids, limit=100), repeat
+    )
+    results['top_scenarios_100'] = timed(
+        lambda: list(comparator.top_scenarios(scenario_ids, k=100)), repeat
+    )
+
+    print("Materialized leaderboard...")
+    leaderboard = LeaderboardStore(session)
+    results['leaderboard_refresh'] = timed(lambda: leaderboard.refresh(force=True))
+    results['leaderboard_top_100'] = timed(lambda: leaderboard.top(limit=100), repeat)
+    results['comparison_page'] = timed(
+        lambda: comparison_page(session, sort_by='npv', limit=10, offset=100, irr_min=0.15, irr_max=0.30), repeat
+    )
+
+    print(f"ExcelExporter.export_comparison on {len(sample_ids)} scenarios...")
+    exporter = ExcelExporter(session)
+    results['export_comparison'] = timed(lambda: exporter.export_comparison(sample_ids, BytesIO()))
+
+    print(f"Bulk import of {import_rows} template rows...")
+    with tempfile.TemporaryDirectory() as tmp:
+        template_path = os.path.join(tmp, 'bench_template.xlsx')
+        build_template(import_rows).to_excel(template_path, index=False)
+        importer = BulkScenarioImporter(session, session_factory=Session)
+        results['bulk_import'] = timed(lambda: importer.import_from_excel(template_path, fast=True))
+
+        if workers > 1:
+            # Second import on fresh Scenario IDs so nothing is skipped
+            build_template(import_rows, start_id=import_rows + 1).to_excel(template_path, index=False)
+            results['bulk_import_parallel'] = timed(
+                lambda: importer.import_from_excel(template_path, workers=workers, fast=True)
+            )
+            results['bulk_import_parallel']['workers'] = workers
+
+    session.close()
+    # Write buffered audit records while the (possibly temporary) database still exists
+    audit_writer.flush()
+    engine.dispose()
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'scale': scale,
+        'n_scenarios': n_scenarios,
+        'sample': len(sample_ids),
+        'import_rows': import_rows,
+        'database': engine.dialect.name,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run engine benchmarks on synthetic scenario datasets")
+    parser.add_argument('--scale', choices=list(SCALES), default='512')
+    parser.add_argument('--database-url', default=None,
+                        help="Database to benchmark against (default: temporary SQLite file, WAL)")
+    parser.add_argument('--sample', type=int, default=50,
+                        help="Scenarios used for OPEX/calculator/export stages")
+    parser.add_argument('--import-rows', type=int, default=50,
+                        help="Template rows for the bulk import stage")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions for read-only stages")
+    parser.add_argument('--workers', type=int, default=1, help="Workers for the parallel import stage")
+    parser.add_argument('--reset', action='store_true', help="Drop and recreate tables in a non-empty database")
+    parser.add_argument('--output', default=None, help="JSON output path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        report = run(args.scale, database_url, args.sample, args.import_rows,
+                     args.repeat, args.workers, args.reset)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{report['revision']}_{args.scale}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 60)
+    for name, stats in report['results'].items():
+        print(f"{name:<28} {stats['min_s']:>10.3f} s")
+    print("=" * 60)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Synthetic Benchmark Data
+CAPEX catalog, production profiles and scenario sets for benchmarks
+"""
+import itertools
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+
+from database.models import (
+    CapexCategory, CapexSubcategory, CapexItem, OpexMapping, FiscalTerms,
+    PricingAssumptions, ProductionEnhancement, ProductionProfile, ProductionData,
+    Scenario, ScenarioCapex, ScenarioMetrics
+)
+from database.composition import capex_mask_of
+from database.connection import bulk_load
+from engine.bulk_importer import BulkScenarioImporter
+
+# Template column -> Excel values allowed in that column (from CAPEX_MAPPING)
+TEMPLATE_CHOICES = {
+    'Production': ['CO2 EOR', 'CO2 EGR', 'Supersonic Separator'],
+    'Power': ['CCPP', 'FWT'],
+    'Transportation': ['Pipeline', 'VLGC', 'OWS', 'STS'],
+}
+FLARING_CHOICES = ['FGRS ON', 'FGRS OFF']
+
+# code -> (category, subcategory, name, unit, unit_cost, opex method, opex rate)
+CAPEX_CATALOG = {
+    'CCUS_EGR': ('PROD', 'CCUS', 'CCUS + CO2 EGR', '/unit.well', 20410366.50, 'PERCENTAGE', 0.05),
+    'CCUS_EOR': ('PROD', 'CCUS', 'CCUS + CO2 EOR', '/unit.well', 16510366.50, 'PERCENTAGE', 0.05),
+    'SUPERSONIC': ('PROD', 'SEP', 'Supersonic Separator', '/unit', 3000000.00, 'FIXED', 150000.00),
+    'CCPP': ('POWER', None, 'Combined Cycle Power Plant (CCPP)', '/unit', 8400000.00, 'PERCENTAGE', 0.05),
+    'FWT': ('POWER', None, 'Floating Wind Turbine (FWT)', '/unit', 15300000.00, 'PERCENTAGE', 0.05),
+    'PIPELINE_CO2': ('TRANS', 'PIPE', 'Pipeline (CO2/Utility)', '/km', 3000000.00, 'FIXED', 150000.00),
+    'STS': ('TRANS', 'SHIP', 'Stern Tube System (STS)', '/vessel', 2000000.00, 'PERCENTAGE', 0.05),
+    'OWS': ('TRANS', 'SHIP', 'Oil Water Separator (OWS)', '/unit', 25000.00, 'FIXED', 1250.00),
+    'VLGC': ('TRANS', 'SHIP', 'Very Large Gas Carriers (VLGC)', '/unit', 110000000.00, 'PERCENTAGE', 0.05),
+    'FGRS': ('FLARE', None, 'Flare Gas Recovery System (FGRS)', '/unit', 3000000.00, 'FIXED', 150000.00),
+}
+
+CATEGORIES = [('PROD', 'Production'), ('POWER', 'Power'), ('TRANS', 'Transportation'), ('FLARE', 'Flaring')]
+SUBCATEGORIES = [('CCUS', 'PROD', 'CCUS Systems'), ('SEP', 'PROD', 'Separators'),
+                 ('PIPE', 'TRANS', 'Pipeline'), ('SHIP', 'TRANS', 'Shipping')]
+
+
+def seed_reference_data(session, n_profiles: int = 1, seed: int = 42) -> Dict:
+    """
+    Insert a CAPEX catalog, OPEX mappings, fiscal terms, pricing,
+    enhancement rates and synthetic production profiles
+
+    Args:
+        session: Database session (empty schema)
+        n_profiles: Number of production profiles to generate
+        seed: Random seed for the production profiles
+
+    Returns:
+        Dictionary with the created reference objects
+    """
+    categories = {code: CapexCategory(code=code, name=name, sort_order=i + 1)
+                  for i, (code, name) in enumerate(CATEGORIES)}
+    session.add_all(categories.values())
+    session.flush()
+
+    subcategories = {code: CapexSubcategory(category_id=categories[cat].id, code=code, name=name)
+                     for code, cat, name in SUBCATEGORIES}
+    session.add_all(subcategories.values())
+    session.flush()
+
+    items = {}
+    for code, (cat, sub, name, unit, cost, method, rate) in CAPEX_CATALOG.items():
+        items[code] = CapexItem(
+            category_id=categories[cat].id,
+            subcategory_id=subcategories[sub].id if sub else None,
+            code=code, name=name, unit=unit, unit_cost=cost, is_active=True
+        )
+    for position, item in enumerate(items.values()):
+        item.bit_mask = 1 << position
+    session.add_all(items.values())
+    session.flush()
+
+    session.add_all([
+        OpexMapping(capex_item_id=items[code].id, opex_name=f"{items[code].name} O&M",
+                    opex_calculation_method=method, opex_rate=rate, year_start=1)
+        for code, (_, _, _, _, _, method, rate) in CAPEX_CATALOG.items()
+    ])
+
+    fiscal = FiscalTerms(name='Benchmark PSC Terms')
+    pricing = PricingAssumptions(name='Benchmark Pricing')
+    enhancement = ProductionEnhancement(name='Benchmark Enhancement')
+    session.add_all([fiscal, pricing, enhancement])
+    session.flush()
+
+    # Production profiles: ramp-up then exponential decline with noise
+    rng = np.random.default_rng(seed)
+    years = list(range(fiscal.project_start_year, fiscal.project_end_year + 1))
+    profiles = []
+    for p in range(n_profiles):
+        profile = ProductionProfile(name=f"Synthetic Profile {p + 1}", project_duration=len(years))
+        session.add(profile)
+        session.flush()
+
+        peak_oil = rng.uniform(1500, 3000)
+        peak_gas = rng.uniform(1.0, 2.5)
+        decline = rng.uniform(0.05, 0.15)
+        rows = []
+        for t, year in enumerate(years):
+            shape = min(1.0, (t + 1) / 2) * (1 - decline) ** max(0, t - 1)
+            rows.append({
+                'profile_id': profile.id,
+                'year': year,
+                'condensate_rate_bopd': float(peak_oil * shape * rng.uniform(0.9, 1.1)),
+                'gas_rate_mmscfd': float(peak_gas * shape * rng.uniform(0.9, 1.1)),
+            })
+        session.execute(insert(ProductionData), rows)
+        profiles.append(profile)
+
+    session.commit()
+    return {'items': items, 'fiscal': fiscal, 'pricing': pricing,
+            'enhancement': enhancement, 'profiles': profiles}
+
+
+def _subsets(values: List[str]) -> List[str]:
+    """All subsets of values as comma-separated strings ('' = none)"""
+    return [', '.join(combo) for r in range(len(values) + 1)
+            for combo in itertools.combinations(values, r)]
+
+
+def template_compositions() -> List[Dict[str, Optional[str]]]:
+    """
+    Every Excel-template row the CAPEX_MAPPING allows
+    (8 production x 4 power x 16 transportation x 2 flaring = 1024)
+    """
+    columns = list(TEMPLATE_CHOICES)
+    rows = []
+    for combo in itertools.product(*(_subsets(TEMPLATE_CHOICES[c]) for c in columns), FLARING_CHOICES):
+        row = {c: (v or None) for c, v in zip(columns, combo[:-1])}
+        row['Flaring'] = combo[-1]
+        rows.append(row)
+    return rows
+
+
+def composition_codes(composition: Dict[str, Optional[str]]) -> List[str]:
+    """CAPEX codes selected by one template row (mirrors parse_excel_row)"""
+    codes = []
+    for value in composition.values():
+        for label in (value or '').split(','):
+            code = BulkScenarioImporter.CAPEX_MAPPING.get(label.strip())
+            if code:
+                codes.append(code)
+    return codes
+
+
+def build_template(n_rows: int, start_id: int = 1) -> pd.DataFrame:
+    """
+    Bulk import template (same columns as 512_scenarios.xlsx)
+
+    Args:
+        n_rows: Number of rows
+        start_id: First Scenario ID
+
+    Returns:
+        DataFrame with Scenario ID, Production, Power, Transportation, Flaring
+    """
+    compositions = template_compositions()
+    rows = []
+    for i in range(n_rows):
+        row = {'Scenario ID': start_id + i}
+        row.update(compositions[i % len(compositions)])
+        rows.append(row)
+    return pd.DataFrame(rows, columns=['Scenario ID', 'Production', 'Power', 'Transportation', 'Flaring'])
+
+
+def populate_scenarios(session, reference: Dict, n_scenarios: int, seed: int = 42,
+                       batch_size: int = 5000) -> List[int]:
+    """
+    Bulk-insert scenarios, their CAPEX rows and synthetic metrics
+
+    Compositions cycle through template_compositions(); pipeline length
+    and profile vary per scenario. Metrics are derived from total CAPEX
+    with seeded noise so ranking/comparison have realistic spreads
+    without running the calculator n_scenarios times.
+
+    Args:
+        session: Database session
+        reference: Output of seed_reference_data
+        n_scenarios: Number of scenarios to create
+        seed: Random seed
+        batch_size: Rows per executemany batch
+
+    Returns:
+        List of created scenario IDs
+    """
+    rng = np.random.default_rng(seed)
+    items = reference['items']
+    profiles = reference['profiles']
+    compositions = template_compositions()
+
+    scenario_ids = []
+    for start in range(0, n_scenarios, batch_size):
+        count = min(batch_size, n_scenarios - start)
+        scenario_rows = []
+        for i in range(start, start + count):
+            composition = compositions[i % len(compositions)]
+            label = ' | '.join(v for v in composition.values() if v)
+            mask = capex_mask_of(items[code] for code in composition_codes(composition))
+            scenario_rows.append({
+                'name': f"B{i + 1}: {label}"[:200],
+                'description': 'Synthetic benchmark scenario',
+                'production_profile_id': profiles[i % len(profiles)].id,
+                'fiscal_terms_id': reference['fiscal'].id,
+                'pricing_assumptions_id': reference['pricing'].id,
+                'production_enhancement_id': reference['enhancement'].id,
+                'created_by': 'Benchmark',
+                'is_active': True,
+                'capex_mask': mask,
+            })
+
+        # One transaction per batch, without per-commit fsyncs
+        with bulk_load(session):
+            ids = session.execute(insert(Scenario).returning(Scenario.id, sort_by_parameter_order=True),
+                                  scenario_rows).scalars().all()
+
+            capex_rows, metrics_rows = [], []
+            for offset, scenario_id in enumerate(ids):
+                i = start + offset
+                total_capex = 0.0
+                for code in composition_codes(compositions[i % len(compositions)]):
+                    quantity = BulkScenarioImporter.DEFAULT_QUANTITIES.get(code, 1)
+                    if code == 'PIPELINE_CO2':
+                        quantity = int(rng.integers(10, 60))
+                    unit_cost = items[code].unit_cost
+                    total_capex += unit_cost * quantity
+                    capex_rows.append({'scenario_id': scenario_id, 'capex_item_id': items[code].id,
+                                       'quantity': quantity, 'unit_cost': unit_cost,
+                                       'total_cost': unit_cost * quantity})
+
+                revenue = float(rng.uniform(2.0e8, 3.5e8))
+                total_opex = total_capex * 0.05 * 12 * float(rng.uniform(0.8, 1.2))
+                margin = revenue - total_capex - total_opex
+                irr = float(rng.normal(0.25, 0.15)) if total_capex > 0 else None
+                metrics_rows.append({
+                    'scenario_id': scenario_id,
+                    'total_capex': total_capex,
+                    'total_opex': total_opex,
+                    'total_revenue': revenue,
+                    'total_contractor_share': max(0.0, margin) * 0.6723 * (1 - 0.405),
+                    'total_government_take': max(0.0, margin) * (0.3277 + 0.6723 * 0.405),
+                    'npv': margin * float(rng.uniform(0.4, 0.7)),
+                    'irr': irr,
+                    'payback_period_years': float(rng.uniform(1.0, 8.0)) if margin > 0 else None,
+                    'asr_amount': total_capex * 0.05,
+                    'contractor_ptcf': max(0.0, margin) * 0.6723 * 0.405,
+                    'peak_cash_exposure': total_capex * float(rng.uniform(0.5, 1.0)),
+                    'max_annual_revenue': revenue / 12 * float(rng.uniform(1.5, 2.5)),
+                    'final_cumulative_cash_flow': margin,
+                    'total_depreciation': total_capex,
+                })
+
+            if capex_rows:
+                session.execute(insert(ScenarioCapex), capex_rows)
+            session.execute(insert(ScenarioMetrics), metrics_rows)
+            session.commit()
+        scenario_ids.extend(ids)
+
+    return scenario_ids
@@ -1 +1,5 @@
-# Empty __init__.py to make database a package
+# Database package
+# Session event hooks are registered on import of the package, so every entry point
+# (app, scripts, init_db, benchmarks, notebooks) that touches the database gets them
+from database import staleness  # noqa: F401  (marks metrics stale when reference data changes)
+from database import audit  # noqa: F401  (records scenario and reference-data changes in audit_log)
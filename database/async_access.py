@@ -0,0 +1,216 @@
+"""
+Async Data Access
+Load a page's independent datasets concurrently on SQLAlchemy's async engine
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from database.connection import (
+    POOL_PROFILES, detect_pool_profile, get_database_url, get_read_database_url, get_read_session_factory
+)
+from database.models import Scenario, ScenarioMetrics, CalculationResult, ScenarioCapex, CapexItem, ScenarioOpex
+
+logger = logging.getLogger(__name__)
+
+# Set ASYNC_PAGE_LOADS=0 to load page data sequentially on a read-only session
+ASYNC_PAGE_LOADS = os.getenv('ASYNC_PAGE_LOADS', '1') != '0'
+
+# Async DBAPI driver per dialect (psycopg 3 provides both sync and async connections)
+ASYNC_DRIVERS = {'postgresql': 'psycopg', 'sqlite': 'aiosqlite'}
+
+# Seconds a sync caller waits for one concurrent load
+LOAD_TIMEOUT = float(os.getenv('ASYNC_LOAD_TIMEOUT', '60'))
+
+_loop = None
+_loop_lock = threading.Lock()
+_async_engine = None
+_async_unavailable = None  # reason the async engine could not be created
+
+
+def async_database_url(db_url):
+    """Same database URL with the async driver of its dialect"""
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop running in a daemon thread for the lifetime of the process
+
+    Async connections belong to the loop that opened them, so all loads run
+    on this one loop (Streamlit reruns would otherwise start a new loop each
+    time and strand the pooled connections).
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='async-db', daemon=True).start()
+    return _loop
+
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """
+    Run a coroutine on the background loop and wait for its result (sync wrapper for Streamlit)
+
+    The caller's context variables (e.g. track_queries scopes) carry over
+    into the coroutine and the tasks it starts. On timeout the task is
+    cancelled (releasing its connections) before TimeoutError is raised.
+    """
+    loop = _background_loop()
+    future = Future()
+    tasks = []
+
+    def start():
+        task = loop.create_task(coro)
+        tasks.append(task)
+
+        def done(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        task.add_done_callback(done)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    try:
+        return future.result(timeout if timeout is not None else LOAD_TIMEOUT)
+    except FutureTimeoutError:
+        # start() was scheduled first, so the task exists by the time this runs
+        loop.call_soon_threadsafe(lambda: tasks[0].cancel())
+        raise
+
+
+def get_async_engine():
+    """
+    Get or create the async engine (None when async loading is off or unavailable)
+
+    Page loads only read, so the engine targets the read replica when
+    READ_DATABASE_URL is set and runs read-only transactions on PostgreSQL.
+    Unavailable means the async driver or greenlet is not installed, or the
+    database is in-memory SQLite (an async connection would open a separate,
+    empty database).
+    """
+    global _async_engine, _async_unavailable
+    if not ASYNC_PAGE_LOADS or _async_unavailable:
+        return None
+    if _async_engine is None:
+        try:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            db_url = get_read_database_url() or get_database_url()
+            url = make_url(db_url)
+            if url.get_backend_name() == 'sqlite':
+                if url.database in (None, '', ':memory:'):
+                    raise ValueError("in-memory SQLite cannot be shared with an async engine")
+                options = {}
+            else:
+                profile = detect_pool_profile(url)
+                options = dict(POOL_PROFILES[profile], pool_pre_ping=True,
+                               execution_options={'postgresql_readonly': True})
+                if profile == 'transaction_pooler':
+                    options['connect_args'] = {"prepare_threshold": None}
+            _async_engine = create_async_engine(async_database_url(url), **options)
+        except Exception as e:
+            _async_unavailable = str(e)
+            logger.warning("[db] async page loads disabled, loading sequentially: %s", e)
+            return None
+    return _async_engine
+
+
+async def _fetch_concurrently(engine, statements: Dict) -> Dict[str, list]:
+    """Run each statement on its own pooled connection, all at once"""
+    async def fetch(statement):
+        async with engine.connect() as conn:
+            return (await conn.execute(statement)).all()
+
+    rows = await asyncio.gather(*(fetch(statement) for statement in statements.values()))
+    return dict(zip(statements, rows))
+
+
+def _fetch_sequentially(statements: Dict) -> Dict[str, list]:
+    """Run the statements one after another on a read-only session"""
+    session = get_read_session_factory()()
+    try:
+        return {name: session.execute(statement).all() for name, statement in statements.items()}
+    finally:
+        session.rollback()
+        session.close()
+
+
+def load_datasets(statements: Dict) -> Dict[str, list]:
+    """
+    Execute independent read statements, concurrently when possible
+
+    Page latency becomes roughly the slowest statement instead of the sum.
+    Falls back to sequential loading when the async engine is unavailable
+    or the concurrent load fails (a timed-out load is cancelled first, so
+    the two never run at the same time).
+
+    Args:
+        statements: Dataset name -> SELECT statement
+
+    Returns:
+        Dataset name -> list of rows
+    """
+    engine = get_async_engine()
+    if engine is not None:
+        try:
+            return run_sync(_fetch_concurrently(engine, statements))
+        except Exception as e:
+            logger.warning("[db] concurrent load failed, retrying sequentially: %s", e)
+    return _fetch_sequentially(statements)
+
+
+def scenario_page_statements(scenario_id: int) -> Dict:
+    """Independent queries behind the scenario results page"""
+    return {
+        'scenario': select(Scenario.__table__).where(Scenario.id == scenario_id),
+        'metrics': select(ScenarioMetrics.__table__).where(ScenarioMetrics.scenario_id == scenario_id),
+        'results': select(CalculationResult.__table__).where(
+            CalculationResult.scenario_id == scenario_id
+        ).order_by(CalculationResult.year),
+        'capex': select(
+            CapexItem.name, ScenarioCapex.quantity, ScenarioCapex.unit_cost, ScenarioCapex.total_cost
+        ).join(
+            CapexItem, CapexItem.id == ScenarioCapex.capex_item_id
+        ).where(
+            ScenarioCapex.scenario_id == scenario_id
+        ).order_by(ScenarioCapex.id),
+        'opex': select(
+            ScenarioOpex.year, func.sum(ScenarioOpex.opex_amount)
+        ).where(
+            ScenarioOpex.scenario_id == scenario_id
+        ).group_by(ScenarioOpex.year).order_by(ScenarioOpex.year),
+    }
+
+
+def load_scenario_page(scenario_id: int) -> Dict:
+    """
+    Load everything the scenario results page shows in one concurrent round
+
+    Returns:
+        Dictionary with scenario and metrics (rows or None), results and
+        capex (lists of rows) and opex_summary ({year: total OPEX})
+    """
+    data = load_datasets(scenario_page_statements(scenario_id))
+    return {
+        'scenario': data['scenario'][0] if data['scenario'] else None,
+        'metrics': data['metrics'][0] if data['metrics'] else None,
+        'results': data['results'],
+        'capex': data['capex'],
+        'opex_summary': {year: total for year, total in data['opex']},
+    }
@@ -0,0 +1,251 @@
+"""
+Audit Log
+Records INSERT/UPDATE/DELETE of scenarios and reference data in audit_log, written in batches
+"""
+import atexit
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.orm import Session
+
+from database.models import (
+    AuditLog, Scenario, CapexCategory, CapexSubcategory, CapexItem, OpexMapping,
+    FiscalTerms, PricingAssumptions, ProductionEnhancement, ProductionProfile
+)
+
+logger = logging.getLogger(__name__)
+
+# Models whose changes are audited (high-volume result tables are derived data and are not)
+AUDITED_MODELS = (Scenario, CapexCategory, CapexSubcategory, CapexItem, OpexMapping,
+                  FiscalTerms, PricingAssumptions, ProductionEnhancement, ProductionProfile)
+
+# background: buffered and written by a writer thread (default)
+# transaction: one bulk INSERT per flush in the same transaction as the change
+# off: nothing is recorded
+AUDIT_MODE = os.getenv('AUDIT_MODE', 'background')
+
+# Records per INSERT and the longest a record waits in the buffer (seconds)
+AUDIT_BATCH_SIZE = 500
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '2'))
+
+# Buffered records beyond this are dropped (logged) rather than growing memory without bound
+AUDIT_MAX_BUFFER = 100_000
+
+_audit_user: ContextVar = ContextVar('audit_user', default=os.getenv('AUDIT_USER'))
+
+
+@contextmanager
+def audit_user(name: str):
+    """Attribute changes made in this context (thread/async task) to a user"""
+    token = _audit_user.set(name)
+    try:
+        yield
+    finally:
+        _audit_user.reset(token)
+
+
+def _jsonable(value):
+    """Column value as something the JSON column can store"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _column_values(state, keys: Optional[Iterable[str]] = None) -> Dict:
+    """Loaded column values of an object (never triggers a lazy load)"""
+    loaded = state.dict
+    keys = keys if keys is not None else [attr.key for attr in state.mapper.column_attrs]
+    return {key: _jsonable(loaded[key]) for key in keys if key in loaded}
+
+
+def _record(table_name: str, record_id: int, action: str, old_values=None, new_values=None) -> Dict:
+    return {
+        'table_name': table_name,
+        'record_id': record_id,
+        'action': action,
+        'user_name': _audit_user.get(),
+        'timestamp': datetime.now(),
+        'old_values': old_values,
+        'new_values': new_values,
+    }
+
+
+def _flush_records(session) -> List[Dict]:
+    """Audit records for the objects written by the current flush"""
+    records = []
+    for obj in session.new:
+        if isinstance(obj, AUDITED_MODELS):
+            state = inspect(obj)
+            records.append(_record(state.mapper.local_table.name, obj.id, 'INSERT', new_values=_column_values(state)))
+    for obj in session.dirty:
+        if isinstance(obj, AUDITED_MODELS):
+            state = inspect(obj)
+            old_values, new_values = {}, {}
+            for attr in state.mapper.column_attrs:
+                history = state.attrs[attr.key].history
+                if history.has_changes():
+                    old_values[attr.key] = _jsonable(history.deleted[0]) if history.deleted else None
+                    new_values[attr.key] = _jsonable(history.added[0]) if history.added else None
+            if new_values:
+                records.append(_record(state.mapper.local_table.name, obj.id, 'UPDATE', old_values, new_values))
+    for obj in session.deleted:
+        if isinstance(obj, AUDITED_MODELS):
+            state = inspect(obj)
+            records.append(_record(state.mapper.local_table.name, obj.id, 'DELETE', old_values=_column_values(state)))
+    return records
+
+
+class AuditWriter:
+    """
+    Buffers audit records and bulk-inserts them from a daemon thread
+
+    Records are handed over only after their transaction commits, so rolled
+    back changes are never logged. The thread writes whenever a batch is
+    full or AUDIT_FLUSH_INTERVAL has passed, each batch in its own short
+    transaction, so writers (e.g. bulk imports) never wait for audit rows.
+    """
+
+    def __init__(self, batch_size: int = AUDIT_BATCH_SIZE, flush_interval: float = AUDIT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._buffer = []  # [(engine, record)]
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def submit(self, engine, records: List[Dict]):
+        """Queue committed records for writing"""
+        with self._lock:
+            room = AUDIT_MAX_BUFFER - len(self._buffer)
+            if room < len(records):
+                self.dropped += len(records) - max(room, 0)
+                logger.warning("[audit] buffer full, dropped %d records", len(records) - max(room, 0))
+                records = records[:max(room, 0)]
+            self._buffer.extend((engine, record) for record in records)
+            full = len(self._buffer) >= self.batch_size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        """Records waiting to be written"""
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """
+        Write everything buffered now (also called by the writer thread and at exit)
+
+        Returns:
+            Number of records written
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        by_engine = {}
+        for engine, record in batch:
+            by_engine.setdefault(engine, []).append(record)
+
+        written = 0
+        for engine, records in by_engine.items():
+            for start in range(0, len(records), self.batch_size):
+                chunk = records[start:start + self.batch_size]
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(AuditLog.__table__), chunk)
+                    written += len(chunk)
+                except Exception as e:
+                    self.failed += len(chunk)
+                    logger.error("[audit] failed to write %d records: %s", len(chunk), e)
+        with self._lock:
+            self.written += written
+        return written
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self.pending():
+                self.flush()
+
+
+audit_writer = AuditWriter()
+atexit.register(audit_writer.flush)
+
+
+def record_bulk(session, model, record_ids: Iterable[int], action: str, new_values: Optional[Dict] = None):
+    """
+    Audit rows changed by bulk/Core statements, which bypass the ORM events
+
+    Args:
+        session: Session whose transaction made the change
+        model: Audited model class
+        record_ids: Primary keys of the changed rows
+        action: INSERT, UPDATE or DELETE
+        new_values: Values set by an UPDATE (same for every row)
+    """
+    if AUDIT_MODE == 'off':
+        return
+    table_name = model.__table__.name
+    values = {key: _jsonable(value) for key, value in new_values.items()} if new_values else None
+    records = [_record(table_name, record_id, action, new_values=values) for record_id in record_ids]
+    _buffer_or_insert(session, records)
+
+
+def _buffer_or_insert(session, records: List[Dict]):
+    """Insert records now (transaction mode) or keep them until the transaction commits"""
+    if not records:
+        return
+    if AUDIT_MODE == 'transaction':
+        session.connection().execute(insert(AuditLog.__table__), records)
+    else:
+        # Tagged with the innermost transaction so a rolled back savepoint drops its records
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        session.info.setdefault('audit_pending', []).extend((transaction, record) for record in records)
+
+
+def _within(transaction, ancestor) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _audit_after_flush(session, flush_context):
+    """Capture audited changes of every flush"""
+    if AUDIT_MODE != 'off':
+        _buffer_or_insert(session, _flush_records(session))
+
+
+@event.listens_for(Session, 'after_commit')
+def _audit_after_commit(session):
+    """Hand committed records to the background writer"""
+    pending = session.info.pop('audit_pending', None)
+    if pending:
+        audit_writer.submit(session.get_bind(), [record for _, record in pending])
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _audit_after_rollback(session, previous_transaction):
+    """Changes that were rolled back (whole transaction or savepoint) are not audited"""
+    pending = session.info.get('audit_pending')
+    if pending:
+        session.info['audit_pending'] = [
+            (transaction, record) for transaction, record in pending
+            if not _within(transaction, previous_transaction)
+        ]
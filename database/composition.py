@@ -0,0 +1,34 @@
+"""
+CAPEX Composition Bitmasks
+Encode the set of CAPEX items of a scenario as one integer (Scenario.capex_mask)
+"""
+from typing import Iterable, List, Tuple
+
+from database.models import CapexItem
+
+
+def capex_mask_of(items: Iterable[CapexItem]) -> int:
+    """Composition mask of a set of CAPEX items (items without a bit are ignored)"""
+    mask = 0
+    for item in items:
+        mask |= item.bit_mask or 0
+    return mask
+
+
+def capex_bits(session) -> List[Tuple[int, str, str]]:
+    """
+    CAPEX items that have a bit, in catalog order
+
+    Returns:
+        List of (bit_mask, code, name)
+    """
+    rows = session.query(CapexItem.bit_mask, CapexItem.code, CapexItem.name).filter(
+        CapexItem.bit_mask.isnot(None)
+    ).order_by(CapexItem.category_id, CapexItem.id).all()
+    return [(r[0], r[1], r[2]) for r in rows]
+
+
+def decode_capex_mask(mask: int, bits: List[Tuple[int, str, str]]) -> List[str]:
+    """Codes of the items contained in a composition mask"""
+    return [code for bit, code, _ in bits if (mask or 0) & bit]
+
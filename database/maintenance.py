@@ -0,0 +1,177 @@
+"""
+Scenario Maintenance
+Set-based deletion of scenarios, import batches and soft-deleted scenarios
+"""
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import delete, exists, func, inspect, select, text, update
+
+from database.audit import record_bulk
+from database.models import (
+    Scenario, ScenarioCapex, ScenarioOpex, CalculationResult, ScenarioMetrics,
+    ScenarioComparison, ComparisonScenario, ScenarioLeaderboard
+)
+
+# Tables whose rows belong to a scenario (foreign keys declared ON DELETE CASCADE)
+SCENARIO_CHILD_TABLES = [ScenarioCapex, ScenarioOpex, CalculationResult, ScenarioMetrics,
+                         ComparisonScenario, ScenarioLeaderboard]
+
+# Soft-deleted scenarios older than this are removed by purge_deleted()
+PURGE_AFTER_DAYS = 30
+
+# IDs per DELETE/UPDATE when deleting explicit ID lists
+CHUNK_SIZE = 5000
+
+_cascade_schema = {}  # engine URL -> all child foreign keys cascade
+
+
+def cascade_deletes_enabled(session) -> bool:
+    """
+    Whether deleting a scenarios row removes its child rows in the database
+
+    True when every foreign key to scenarios is ON DELETE CASCADE (databases
+    created before the cascades need init_db.py --upgrade) and, on SQLite,
+    foreign keys are enabled on this connection.
+    """
+    bind = session.get_bind()
+    key = str(bind.url)
+    if key not in _cascade_schema:
+        inspector = inspect(bind)
+        _cascade_schema[key] = all(
+            (fk['options'].get('ondelete') or '').upper() == 'CASCADE'
+            for model in SCENARIO_CHILD_TABLES
+            for fk in inspector.get_foreign_keys(model.__tablename__)
+            if fk['referred_table'] == 'scenarios'
+        )
+    if not _cascade_schema[key]:
+        return False
+    if bind.dialect.name == 'sqlite':
+        return bool(session.execute(text("PRAGMA foreign_keys")).scalar())
+    return True
+
+
+def _changed_ids(session, statement) -> List[int]:
+    """Run a set-based UPDATE/DELETE on scenarios and return the affected IDs (for the audit log)"""
+    dialect = session.get_bind().dialect
+    if dialect.update_returning and dialect.delete_returning:
+        return session.execute(statement.returning(Scenario.id)).scalars().all()
+    ids = session.execute(select(Scenario.id).where(statement.whereclause)).scalars().all()
+    session.execute(statement)
+    return ids
+
+
+def _delete_where(session, condition) -> int:
+    """
+    Delete the scenarios matching a WHERE condition on scenarios
+
+    One DELETE when the database cascades; otherwise one DELETE per child
+    table (by subquery) before the scenarios themselves. Never per scenario.
+    Saved comparisons left without any member scenario are deleted as well.
+    """
+    comparison_ids = session.execute(
+        select(ComparisonScenario.comparison_id).distinct().where(
+            ComparisonScenario.scenario_id.in_(select(Scenario.id).where(condition))
+        )
+    ).scalars().all()
+    if not cascade_deletes_enabled(session):
+        matching = select(Scenario.id).where(condition)
+        for model in SCENARIO_CHILD_TABLES:
+            session.execute(delete(model.__table__).where(model.__table__.c.scenario_id.in_(matching)))
+    ids = _changed_ids(session, delete(Scenario.__table__).where(condition))
+    record_bulk(session, Scenario, ids, 'DELETE')
+    if comparison_ids:
+        session.execute(delete(ScenarioComparison.__table__).where(
+            ScenarioComparison.id.in_(comparison_ids),
+            ~exists().where(ComparisonScenario.comparison_id == ScenarioComparison.id)
+        ))
+    return len(ids)
+
+
+def _soft_delete_where(session, condition) -> int:
+    """Soft-delete the active scenarios matching a WHERE condition on scenarios"""
+    values = {'is_active': False, 'deleted_at': datetime.now()}
+    ids = _changed_ids(session, update(Scenario.__table__).where(condition, Scenario.is_active == True).values(**values))
+    record_bulk(session, Scenario, ids, 'UPDATE', new_values=values)
+    return len(ids)
+
+
+def delete_scenarios(session, scenario_ids: List[int]) -> int:
+    """
+    Permanently delete scenarios and everything that belongs to them
+
+    Args:
+        session: Database session
+        scenario_ids: Scenarios to delete
+
+    Returns:
+        Number of scenarios deleted
+    """
+    deleted = 0
+    for start in range(0, len(scenario_ids), CHUNK_SIZE):
+        deleted += _delete_where(session, Scenario.id.in_(scenario_ids[start:start + CHUNK_SIZE]))
+    session.commit()
+    return deleted
+
+
+def soft_delete_scenarios(session, scenario_ids: List[int]) -> int:
+    """
+    Hide scenarios (is_active=False) and stamp deleted_at for a later purge
+
+    Returns:
+        Number of scenarios soft-deleted
+    """
+    updated = 0
+    for start in range(0, len(scenario_ids), CHUNK_SIZE):
+        updated += _soft_delete_where(session, Scenario.id.in_(scenario_ids[start:start + CHUNK_SIZE]))
+    session.commit()
+    return updated
+
+
+def delete_import_batch(session, import_batch: str, soft: bool = True) -> int:
+    """
+    Delete every scenario created by one bulk import run
+
+    Args:
+        session: Database session
+        import_batch: Scenario.import_batch value (see BulkScenarioImporter)
+        soft: Soft-delete (purged later) instead of deleting now
+
+    Returns:
+        Number of scenarios deleted
+    """
+    if soft:
+        count = _soft_delete_where(session, Scenario.import_batch == import_batch)
+    else:
+        count = _delete_where(session, Scenario.import_batch == import_batch)
+    session.commit()
+    return count
+
+
+def purge_deleted(session, older_than_days: int = PURGE_AFTER_DAYS) -> int:
+    """
+    Permanently remove scenarios soft-deleted more than older_than_days ago
+
+    Returns:
+        Number of scenarios purged
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    purged = _delete_where(session, (Scenario.is_active == False) & (Scenario.deleted_at < cutoff))
+    session.commit()
+    return purged
+
+
+def import_batches(session) -> List[Tuple[str, int, datetime]]:
+    """
+    Import batches that still have active scenarios, newest first
+
+    Returns:
+        List of (import_batch, active scenario count, first created_at)
+    """
+    rows = session.query(
+        Scenario.import_batch, func.count(Scenario.id), func.min(Scenario.created_at)
+    ).filter(
+        Scenario.import_batch.isnot(None),
+        Scenario.is_active == True
+    ).group_by(Scenario.import_batch).order_by(func.min(Scenario.created_at).desc()).all()
+    return [(r[0], r[1], r[2]) for r in rows]
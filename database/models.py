@@ -2,7 +2,7 @@
 Database Models for Financial Scenario Testing Application
 """
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean, Text, 
+    Column, Integer, BigInteger, String, Float, Boolean, Text, 
     DateTime, ForeignKey, UniqueConstraint, Index, JSON
 )
 from sqlalchemy.ext.declarative import declarative_base
@@ -52,6 +52,7 @@ class CapexItem(Base):
     unit = Column(String(100), nullable=False)
     unit_cost = Column(Float, nullable=False)
     description = Column(Text)
+    bit_mask = Column(BigInteger, unique=True)  # Single bit of this item in Scenario.capex_mask
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -198,17 +199,21 @@ class Scenario(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     created_by = Column(String(200))
     is_active = Column(Boolean, default=True)
-    
-    scenario_capex = relationship("ScenarioCapex", back_populates="scenario")
-    scenario_opex = relationship("ScenarioOpex", back_populates="scenario")
-    calculation_results = relationship("CalculationResult", back_populates="scenario")
-    metrics = relationship("ScenarioMetrics", back_populates="scenario", uselist=False)
+    capex_mask = Column(BigInteger, default=0)  # OR of CapexItem.bit_mask of the selected items
+    import_batch = Column(String(50))  # Set by BulkScenarioImporter, one value per import run
+    deleted_at = Column(DateTime)  # Soft delete time (is_active=False), purged later
+    
+    # Child rows are removed by ON DELETE CASCADE in the database
+    scenario_capex = relationship("ScenarioCapex", back_populates="scenario", cascade="all, delete-orphan", passive_deletes=True)
+    scenario_opex = relationship("ScenarioOpex", back_populates="scenario", cascade="all, delete-orphan", passive_deletes=True)
+    calculation_results = relationship("CalculationResult", back_populates="scenario", cascade="all, delete-orphan", passive_deletes=True)
+    metrics = relationship("ScenarioMetrics", back_populates="scenario", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
 class ScenarioCapex(Base):
     __tablename__ = 'scenario_capex'
     
     id = Column(Integer, primary_key=True)
-    scenario_id = Column(Integer, ForeignKey('scenarios.id'))
+    scenario_id = Column(Integer, ForeignKey('scenarios.id', ondelete='CASCADE'))
     capex_item_id = Column(Integer, ForeignKey('capex_items.id'))
     quantity = Column(Float, nullable=False)
     unit_cost = Column(Float, nullable=False)
@@ -226,7 +231,7 @@ class ScenarioOpex(Base):
     __tablename__ = 'scenario_opex'
     
     id = Column(Integer, primary_key=True)
-    scenario_id = Column(Integer, ForeignKey('scenarios.id'))
+    scenario_id = Column(Integer, ForeignKey('scenarios.id', ondelete='CASCADE'))
     year = Column(Integer, nullable=False)
     opex_name = Column(String(200), nullable=False)
     opex_amount = Column(Float, nullable=False)
@@ -242,7 +247,7 @@ class CalculationResult(Base):
     __tablename__ = 'calculation_results'
     
     id = Column(Integer, primary_key=True)
-    scenario_id = Column(Integer, ForeignKey('scenarios.id'))
+    scenario_id = Column(Integer, ForeignKey('scenarios.id', ondelete='CASCADE'))
     year = Column(Integer, nullable=False)
     oil_production = Column(Float)
     gas_production_mmscf = Column(Float)
@@ -271,7 +276,7 @@ class ScenarioMetrics(Base):
     __tablename__ = 'scenario_metrics'
     
     id = Column(Integer, primary_key=True)
-    scenario_id = Column(Integer, ForeignKey('scenarios.id'))
+    scenario_id = Column(Integer, ForeignKey('scenarios.id', ondelete='CASCADE'))
     total_capex = Column(Float)
     total_opex = Column(Float)
     total_revenue = Column(Float)
@@ -281,6 +286,14 @@ class ScenarioMetrics(Base):
     irr = Column(Float, nullable=True)
     payback_period_years = Column(Float, nullable=True)
     asr_amount = Column(Float)
+    # Aggregates over the annual results, stored so views don't re-aggregate calculation_results
+    contractor_ptcf = Column(Float)  # SUM(contractor_tax)
+    peak_cash_exposure = Column(Float)  # -MIN(cumulative_cash_flow), 0 if never negative
+    max_annual_revenue = Column(Float)
+    final_cumulative_cash_flow = Column(Float)
+    total_depreciation = Column(Float)
+    input_fingerprint = Column(String(64))  # sha256 of the calculation inputs (FinancialCalculator.input_fingerprint)
+    is_stale = Column(Boolean, default=False)  # Reference data used by this result changed (engine/recalculator.py)
     calculated_at = Column(DateTime, default=datetime.now)
     
     scenario = relationship("Scenario", back_populates="metrics")
@@ -308,7 +321,7 @@ class ComparisonScenario(Base):
     
     id = Column(Integer, primary_key=True)
     comparison_id = Column(Integer, ForeignKey('scenario_comparisons.id'))
-    scenario_id = Column(Integer, ForeignKey('scenarios.id'))
+    scenario_id = Column(Integer, ForeignKey('scenarios.id', ondelete='CASCADE'))
     rank = Column(Integer)
     score = Column(Float)
     
@@ -318,6 +331,32 @@ class ComparisonScenario(Base):
         UniqueConstraint('comparison_id', 'scenario_id', name='uq_comparison_scenario'),
     )
 
+# Materialized ranking of all active scenarios per scoring profile
+class ScenarioLeaderboard(Base):
+    __tablename__ = 'scenario_leaderboard'
+    
+    id = Column(Integer, primary_key=True)
+    profile = Column(String(50), nullable=False)
+    scenario_id = Column(Integer, ForeignKey('scenarios.id', ondelete='CASCADE'), nullable=False)
+    score = Column(Float, nullable=False)
+    rank = Column(Integer, nullable=False)
+    irr = Column(Float, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    __table_args__ = (
+        UniqueConstraint('profile', 'scenario_id', name='uq_leaderboard_profile_scenario'),
+    )
+
+# Metrics signature each profile's leaderboard was last built from
+class LeaderboardState(Base):
+    __tablename__ = 'leaderboard_state'
+    
+    profile = Column(String(50), primary_key=True)
+    metrics_count = Column(Integer, nullable=False)
+    scenario_id_sum = Column(BigInteger, nullable=False)  # SUM(scenario_id) exceeds INTEGER at ~65k scenarios
+    metrics_calculated_at = Column(DateTime)
+    refreshed_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
 # ====================================
 # AUDIT TRAIL
 # ====================================
@@ -344,3 +383,16 @@ Index('idx_scenario_opex_scenario', ScenarioOpex.scenario_id)
 Index('idx_calculation_results_scenario', CalculationResult.scenario_id)
 Index('idx_production_data_profile', ProductionData.profile_id)
 Index('idx_scenarios_active', Scenario.is_active)
+Index('idx_scenarios_active_created', Scenario.is_active, Scenario.created_at, Scenario.id)
+Index('idx_scenarios_capex_mask', Scenario.capex_mask)
+Index('idx_scenarios_import_batch', Scenario.import_batch)
+Index('idx_scenarios_deleted_at', Scenario.deleted_at)
+Index('idx_scenario_metrics_npv', ScenarioMetrics.npv)
+Index('idx_scenario_metrics_irr', ScenarioMetrics.irr)
+Index('idx_scenario_metrics_payback', ScenarioMetrics.payback_period_years)
+Index('idx_scenario_metrics_fingerprint', ScenarioMetrics.input_fingerprint)
+Index('idx_scenario_metrics_stale', ScenarioMetrics.is_stale)
+Index('idx_leaderboard_profile_rank', ScenarioLeaderboard.profile, ScenarioLeaderboard.rank)
+Index('idx_leaderboard_profile_irr', ScenarioLeaderboard.profile, ScenarioLeaderboard.irr)
+Index('idx_audit_log_record', AuditLog.table_name, AuditLog.record_id)
+Index('idx_audit_log_timestamp', AuditLog.timestamp)
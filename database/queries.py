@@ -0,0 +1,401 @@
+"""
+Scenario List Queries
+Keyset pagination, cheap counts, server-side comparison queries and name search
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, text, tuple_, case, or_, literal
+
+from database.models import Scenario, ScenarioMetrics, ScenarioLeaderboard
+
+# Scenario counts above this are estimated from PostgreSQL statistics instead of COUNT(*)
+EXACT_COUNT_LIMIT = 10000
+
+# Columns returned for list views (no ORM entities, no relationship loading)
+SCENARIO_LIST_COLUMNS = (
+    Scenario.id,
+    Scenario.name,
+    Scenario.description,
+    Scenario.created_at,
+    ScenarioMetrics.total_capex,
+    ScenarioMetrics.npv,
+    ScenarioMetrics.total_revenue,
+)
+
+
+def scenario_page(session, after: Optional[Tuple[datetime, int]] = None,
+                  before: Optional[Tuple[datetime, int]] = None, last_page: bool = False,
+                  per_page: int = 10, newest_first: bool = True) -> Dict:
+    """
+    One page of active scenarios using keyset (seek) pagination on (created_at, id)
+
+    Pages are addressed by the sort key of a neighbouring row instead of an
+    OFFSET, so every page is a single range scan on idx_scenarios_active_created
+    no matter how deep the user pages.
+
+    Args:
+        session: Database session
+        after: Key of the last row of the previous page (next page)
+        before: Key of the first row of the following page (previous page)
+        last_page: Fetch the final page
+        per_page: Rows per page
+        newest_first: Sort by created_at descending
+
+    Returns:
+        Dictionary with rows, first_key, last_key, has_prev, has_next
+    """
+    sort_key = tuple_(Scenario.created_at, Scenario.id)
+    query = session.query(*SCENARIO_LIST_COLUMNS).outerjoin(
+        ScenarioMetrics, ScenarioMetrics.scenario_id == Scenario.id
+    ).filter(Scenario.is_active == True)
+
+    # Walking backwards (previous/last page) reverses the sort, then the rows are flipped back
+    backwards = before is not None or last_page
+    descending = newest_first != backwards
+    if after is not None:
+        query = query.filter(sort_key < tuple_(*after) if newest_first else sort_key > tuple_(*after))
+    elif before is not None:
+        query = query.filter(sort_key > tuple_(*before) if newest_first else sort_key < tuple_(*before))
+
+    if descending:
+        query = query.order_by(Scenario.created_at.desc(), Scenario.id.desc())
+    else:
+        query = query.order_by(Scenario.created_at.asc(), Scenario.id.asc())
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    return {
+        'rows': rows,
+        'first_key': (rows[0].created_at, rows[0].id) if rows else None,
+        'last_key': (rows[-1].created_at, rows[-1].id) if rows else None,
+        'has_prev': has_more if backwards else after is not None,
+        'has_next': (before is not None) if backwards else has_more,
+    }
+
+
+def count_active_scenarios(session, exact_limit: int = EXACT_COUNT_LIMIT) -> Tuple[int, bool]:
+    """
+    Number of active scenarios, estimated for large PostgreSQL tables
+
+    On PostgreSQL the planner statistics (pg_class.reltuples, kept up to date
+    by autovacuum/ANALYZE) give the total row count first; above exact_limit
+    rows the soft-deleted scenarios (counted exactly through idx_scenarios_active,
+    a small set since purge_deleted removes them) are subtracted from that
+    estimate instead of counting every active row. Smaller tables and other
+    databases are counted exactly.
+
+    Args:
+        session: Database session
+        exact_limit: Estimated row count above which the estimate is returned (None = always exact)
+
+    Returns:
+        Tuple of (active scenario count, is_exact)
+    """
+    if exact_limit is not None and session.get_bind().dialect.name == 'postgresql':
+        estimate = session.execute(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('scenarios')"
+        )).scalar()
+        if estimate is not None and estimate >= exact_limit:
+            inactive = session.query(func.count(Scenario.id)).filter(
+                or_(Scenario.is_active == False, Scenario.is_active.is_(None))
+            ).scalar()
+            return max(int(estimate) - inactive, 0), False
+
+    count = session.query(func.count(Scenario.id)).filter(Scenario.is_active == True).scalar()
+    return count, True
+
+
+# ====================================
+# COMPARISON QUERIES
+# ====================================
+
+# Sortable comparison columns (key -> column); score/rank come from the materialized leaderboard
+COMPARISON_SORT_COLUMNS = {
+    'score': ScenarioLeaderboard.score,
+    'npv': ScenarioMetrics.npv,
+    'irr': ScenarioMetrics.irr,
+    'payback_period': ScenarioMetrics.payback_period_years,
+    'total_revenue': ScenarioMetrics.total_revenue,
+    'total_contractor_share': ScenarioMetrics.total_contractor_share,
+    'total_government_take': ScenarioMetrics.total_government_take,
+    'contractor_ptcf': ScenarioMetrics.contractor_ptcf,
+    'total_capex': ScenarioMetrics.total_capex,
+    'total_opex': ScenarioMetrics.total_opex,
+    'scenario_name': Scenario.name,
+    'scenario_id': Scenario.id,
+}
+
+COMPARISON_COLUMNS = (
+    Scenario.id.label('scenario_id'),
+    Scenario.name.label('scenario_name'),
+    ScenarioMetrics.npv,
+    ScenarioMetrics.irr,
+    ScenarioMetrics.payback_period_years.label('payback_period'),
+    ScenarioMetrics.total_revenue,
+    ScenarioMetrics.total_contractor_share,
+    ScenarioMetrics.total_government_take,
+    ScenarioMetrics.contractor_ptcf,
+    ScenarioMetrics.total_capex,
+    ScenarioMetrics.total_opex,
+    ScenarioLeaderboard.score,
+    ScenarioLeaderboard.rank,
+)
+
+
+def _apply_comparison_filters(query, scenario_ids: List[int] = None, id_min: int = None, id_max: int = None,
+                              search: str = None, irr_min: float = None, irr_max: float = None,
+                              npv_min: float = None, capex_include: int = 0, capex_exclude: int = 0):
+    """
+    WHERE clause shared by the comparison queries (query must join ScenarioMetrics)
+
+    capex_include / capex_exclude are composition masks (see database/composition.py):
+    scenarios must contain every included item and none of the excluded ones.
+    Both are tested on scenarios.capex_mask, without joining scenario_capex.
+    """
+    query = query.filter(Scenario.is_active == True)
+    if scenario_ids is not None:
+        query = query.filter(Scenario.id.in_(scenario_ids))
+    if id_min is not None:
+        query = query.filter(Scenario.id >= id_min)
+    if id_max is not None:
+        query = query.filter(Scenario.id <= id_max)
+    if search:
+        query = query.filter(Scenario.name.ilike(f"%{_escape_like(search)}%", escape='\\'))
+    if irr_min is not None:
+        query = query.filter(ScenarioMetrics.irr >= irr_min)
+    if irr_max is not None:
+        query = query.filter(ScenarioMetrics.irr <= irr_max)
+    if npv_min is not None:
+        query = query.filter(ScenarioMetrics.npv > npv_min)
+    if capex_include:
+        query = query.filter(Scenario.capex_mask.bitwise_and(capex_include) == capex_include)
+    if capex_exclude:
+        query = query.filter(Scenario.capex_mask.bitwise_and(capex_exclude) == 0)
+    return query
+
+
+def comparison_page(session, sort_by: str = 'score', descending: bool = True, limit: Optional[int] = 10,
+                    offset: int = 0, profile: str = 'default', **filters) -> Dict:
+    """
+    One sorted page of scenario metrics, filtered and paged in SQL
+
+    Args:
+        session: Database session
+        sort_by: Key of COMPARISON_SORT_COLUMNS (NULLs always sort last)
+        descending: Sort direction
+        limit: Rows per page (None = all matching rows)
+        offset: Rows to skip
+        profile: Leaderboard profile used for score/rank
+        **filters: scenario_ids, id_min, id_max, search, irr_min, irr_max, npv_min,
+            capex_include, capex_exclude
+
+    Returns:
+        Dictionary with rows (list of dicts) and total (matching row count)
+    """
+    sort_column = COMPARISON_SORT_COLUMNS[sort_by]
+    order = sort_column.desc() if descending else sort_column.asc()
+
+    query = session.query(*COMPARISON_COLUMNS).join(
+        ScenarioMetrics, ScenarioMetrics.scenario_id == Scenario.id
+    ).outerjoin(
+        ScenarioLeaderboard,
+        (ScenarioLeaderboard.scenario_id == Scenario.id) & (ScenarioLeaderboard.profile == profile)
+    )
+    query = _apply_comparison_filters(query, **filters)
+    query = query.order_by(order.nulls_last(), Scenario.id).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+
+    total_query = _apply_comparison_filters(
+        session.query(func.count(Scenario.id)).join(ScenarioMetrics, ScenarioMetrics.scenario_id == Scenario.id),
+        **filters
+    )
+
+    return {
+        'rows': [dict(r._mapping) for r in query.all()],
+        'total': total_query.scalar(),
+    }
+
+
+def comparison_summary(session, **filters) -> Dict:
+    """
+    Aggregate statistics for the comparison header, computed in SQL
+
+    Args:
+        session: Database session
+        **filters: Same filters as comparison_page
+
+    Returns:
+        Dictionary with count, positive_npv, avg_payback, best_npv and best_irr rows
+    """
+    base = session.query(
+        func.count(Scenario.id),
+        func.sum(case((ScenarioMetrics.npv > 0, 1), else_=0)),
+        func.avg(ScenarioMetrics.payback_period_years)
+    ).join(ScenarioMetrics, ScenarioMetrics.scenario_id == Scenario.id)
+    count, positive_npv, avg_payback = _apply_comparison_filters(base, **filters).one()
+
+    def best(column):
+        query = session.query(Scenario.name, column).join(ScenarioMetrics, ScenarioMetrics.scenario_id == Scenario.id)
+        query = _apply_comparison_filters(query, **filters).filter(column.isnot(None))
+        return query.order_by(column.desc(), Scenario.id).first()
+
+    return {
+        'count': count,
+        'positive_npv': positive_npv or 0,
+        'avg_payback': avg_payback,
+        'best_npv': best(ScenarioMetrics.npv),
+        'best_irr': best(ScenarioMetrics.irr),
+    }
+
+
+def composition_stats(session, limit: Optional[int] = None, **filters) -> List[Dict]:
+    """
+    Metrics aggregated per CAPEX composition (GROUP BY scenarios.capex_mask)
+
+    Args:
+        session: Database session
+        limit: Maximum compositions (None = all)
+        **filters: Same filters as comparison_page
+
+    Returns:
+        List of dicts (capex_mask, count, avg_npv, max_npv, avg_irr, avg_payback, positive_npv),
+        best average NPV first
+    """
+    avg_npv = func.avg(ScenarioMetrics.npv)
+    query = session.query(
+        Scenario.capex_mask.label('capex_mask'),
+        func.count(Scenario.id).label('count'),
+        avg_npv.label('avg_npv'),
+        func.max(ScenarioMetrics.npv).label('max_npv'),
+        func.avg(ScenarioMetrics.irr).label('avg_irr'),
+        func.avg(ScenarioMetrics.payback_period_years).label('avg_payback'),
+        func.sum(case((ScenarioMetrics.npv > 0, 1), else_=0)).label('positive_npv')
+    ).join(ScenarioMetrics, ScenarioMetrics.scenario_id == Scenario.id)
+    query = _apply_comparison_filters(query, **filters).group_by(Scenario.capex_mask)
+    query = query.order_by(avg_npv.desc().nulls_last(), Scenario.capex_mask)
+    if limit is not None:
+        query = query.limit(limit)
+    return [dict(r._mapping) for r in query.all()]
+
+
+def scenario_id_at(session, position: int) -> Optional[int]:
+    """ID of the n-th active scenario (1-based, ordered by ID) for range selections"""
+    return session.query(Scenario.id).filter(Scenario.is_active == True)\
+        .order_by(Scenario.id).offset(position - 1).limit(1).scalar()
+
+
+def comparison_ids(session, **filters) -> List[int]:
+    """IDs of all scenarios matching the comparison filters (ID order)"""
+    query = session.query(Scenario.id).join(ScenarioMetrics, ScenarioMetrics.scenario_id == Scenario.id)
+    return [r[0] for r in _apply_comparison_filters(query, **filters).order_by(Scenario.id).all()]
+
+
+def scenario_options(session, search: str = None, limit: int = 50, offset: int = 0) -> Dict:
+    """
+    One page of (id, name) rows for scenario pickers
+
+    Args:
+        session: Database session
+        search: Optional case-insensitive name fragment
+        limit: Rows per page
+        offset: Rows to skip
+
+    Returns:
+        Dictionary with rows and total
+    """
+    query = session.query(Scenario.id, Scenario.name).filter(Scenario.is_active == True)
+    if search:
+        query = query.filter(Scenario.name.ilike(f"%{_escape_like(search)}%", escape='\\'))
+    return {
+        'rows': query.order_by(Scenario.id).offset(offset).limit(limit).all(),
+        'total': query.order_by(None).count(),
+    }
+
+
+# ====================================
+# SCENARIO SEARCH
+# ====================================
+
+# Engine URL -> whether pg_trgm is installed (checked once per engine)
+_trigram_support = {}
+
+def has_trigram_search(session) -> bool:
+    """Check whether the pg_trgm extension is available (PostgreSQL only)"""
+    bind = session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return False
+    key = str(bind.url)
+    if key not in _trigram_support:
+        _trigram_support[key] = session.execute(text(
+            "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+        )).scalar() is not None
+    return _trigram_support[key]
+
+
+def _escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_scenarios(session, term: str, limit: int = 50, include_description: bool = True) -> List:
+    """
+    Ranked scenario search on name (and description)
+
+    PostgreSQL with pg_trgm: substring matches use the trigram GIN indexes
+    created by init_db.upgrade_schema() and are ranked by word_similarity,
+    so fragments like "CCPP" or "VLGC" rank scenarios where they appear as
+    a whole word first. Other databases use a portable LIKE match ranked by
+    exact > prefix > word start > substring > description-only.
+
+    Args:
+        session: Database session
+        term: Search text (case-insensitive)
+        limit: Maximum matches
+        include_description: Also match Scenario.description
+
+    Returns:
+        List of rows with id, name, description, created_at, relevance (higher = better)
+    """
+    term = (term or '').strip()
+    if not term:
+        return []
+
+    pattern = f"%{_escape_like(term)}%"
+    name_match = Scenario.name.ilike(pattern, escape='\\')
+    description_match = Scenario.description.ilike(pattern, escape='\\')
+    match = or_(name_match, description_match) if include_description else name_match
+
+    if has_trigram_search(session):
+        relevance = func.greatest(
+            func.word_similarity(term, Scenario.name),
+            func.word_similarity(term, func.coalesce(Scenario.description, '')) * 0.5
+        )
+    else:
+        lowered = func.lower(Scenario.name)
+        needle = term.lower()
+        relevance = case(
+            (lowered == needle, 5),
+            (lowered.like(f"{_escape_like(needle)}%", escape='\\'), 4),
+            (lowered.like(f"% {_escape_like(needle)}%", escape='\\'), 3),
+            (name_match, 2),
+            else_=literal(1)
+        )
+
+    return session.query(
+        Scenario.id,
+        Scenario.name,
+        Scenario.description,
+        Scenario.created_at,
+        relevance.label('relevance')
+    ).filter(
+        Scenario.is_active == True,
+        match
+    ).order_by(
+        relevance.desc(), func.length(Scenario.name), Scenario.id
+    ).limit(limit).all()
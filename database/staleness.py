@@ -0,0 +1,113 @@
+"""
+Stale Metrics Tracking
+Marks scenario metrics stale when the reference data they were calculated from changes
+"""
+from typing import Dict, Iterable
+
+from sqlalchemy import event, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+from database.models import (
+    Scenario, ScenarioCapex, ScenarioMetrics, CapexItem, OpexMapping,
+    FiscalTerms, PricingAssumptions, ProductionEnhancement, ProductionData
+)
+
+# Reference-data columns that affect results (None = all except UNTRACKED_COLUMNS)
+TRACKED_COLUMNS = {
+    CapexItem: {'unit_cost', 'code'},
+    OpexMapping: {'capex_item_id', 'opex_calculation_method', 'opex_rate', 'year_start', 'year_end'},
+    FiscalTerms: None,
+    PricingAssumptions: None,
+    ProductionEnhancement: None,
+    ProductionData: None,
+}
+UNTRACKED_COLUMNS = {'id', 'name', 'version', 'description', 'notes', 'created_at', 'updated_at',
+                     'effective_date', 'is_active'}
+
+def mark_stale(session, capex_item_ids: Iterable[int] = (), fiscal_terms_ids: Iterable[int] = (),
+               pricing_ids: Iterable[int] = (), enhancement_ids: Iterable[int] = (),
+               profile_ids: Iterable[int] = ()) -> int:
+    """
+    Flag the metrics of every scenario that depends on the given reference rows
+
+    One UPDATE: scenarios reach CAPEX items (and their OPEX mappings) through
+    scenario_capex, the other reference data through their own foreign keys.
+    Call this directly after bulk UPDATEs or raw SQL, which bypass the
+    flush hook below.
+
+    Args:
+        session: Database session (not committed)
+        capex_item_ids: Changed CAPEX items (including items whose OPEX mapping changed)
+        fiscal_terms_ids: Changed fiscal terms
+        pricing_ids: Changed pricing assumptions
+        enhancement_ids: Changed production enhancement rows
+        profile_ids: Production profiles whose production data changed
+
+    Returns:
+        Number of metrics rows newly marked stale
+    """
+    conditions = []
+    if capex_item_ids:
+        conditions.append(ScenarioMetrics.scenario_id.in_(
+            select(ScenarioCapex.scenario_id).where(ScenarioCapex.capex_item_id.in_(list(capex_item_ids)))
+        ))
+    for column, ids in ((Scenario.fiscal_terms_id, fiscal_terms_ids),
+                        (Scenario.pricing_assumptions_id, pricing_ids),
+                        (Scenario.production_enhancement_id, enhancement_ids),
+                        (Scenario.production_profile_id, profile_ids)):
+        if ids:
+            conditions.append(ScenarioMetrics.scenario_id.in_(select(Scenario.id).where(column.in_(list(ids)))))
+    if not conditions:
+        return 0
+
+    statement = update(ScenarioMetrics.__table__).where(
+        ScenarioMetrics.is_stale == False, or_(*conditions)
+    ).values(is_stale=True)
+    return session.execute(statement).rowcount
+
+
+def _changed_reference_rows(session) -> Dict[str, set]:
+    """Reference rows added, deleted or modified (in tracked columns) in the current flush"""
+    changed = {'capex_item_ids': set(), 'fiscal_terms_ids': set(), 'pricing_ids': set(),
+               'enhancement_ids': set(), 'profile_ids': set()}
+
+    def modified(state) -> bool:
+        tracked = TRACKED_COLUMNS[state.class_]
+        keys = tracked if tracked is not None else \
+            [attr.key for attr in state.mapper.column_attrs if attr.key not in UNTRACKED_COLUMNS]
+        return any(state.attrs[key].history.has_changes() for key in keys)
+
+    for obj in session.dirty:
+        if type(obj) in TRACKED_COLUMNS and modified(inspect(obj)):
+            _collect(changed, obj, inspect(obj).attrs)
+    for obj in list(session.new) + list(session.deleted):
+        # New CAPEX items / fiscal terms / ... are not used by any scenario yet
+        if isinstance(obj, (OpexMapping, ProductionData)):
+            _collect(changed, obj, inspect(obj).attrs)
+    return changed
+
+
+def _collect(changed: Dict[str, set], obj, attrs):
+    """Add the reference IDs a changed row stands for (old and new foreign keys)"""
+    if isinstance(obj, CapexItem):
+        changed['capex_item_ids'].add(obj.id)
+    elif isinstance(obj, OpexMapping):
+        history = attrs.capex_item_id.history
+        changed['capex_item_ids'].update(v for v in history.sum() if v is not None)
+    elif isinstance(obj, FiscalTerms):
+        changed['fiscal_terms_ids'].add(obj.id)
+    elif isinstance(obj, PricingAssumptions):
+        changed['pricing_ids'].add(obj.id)
+    elif isinstance(obj, ProductionEnhancement):
+        changed['enhancement_ids'].add(obj.id)
+    elif isinstance(obj, ProductionData):
+        history = attrs.profile_id.history
+        changed['profile_ids'].update(v for v in history.sum() if v is not None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_stale_after_flush(session, flush_context):
+    """Mark dependent scenarios stale whenever reference data is changed through the ORM"""
+    changed = _changed_reference_rows(session)
+    if any(changed.values()):
+        mark_stale(session.connection(), **changed)
@@ -2,14 +2,22 @@
 Bulk Scenario Importer
 Import scenarios from Excel template with CAPEX configurations
 """
+import contextvars
+import uuid
+from contextlib import nullcontext
 import pandas as pd
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional, Tuple
 from database.models import (
     Scenario, ScenarioCapex, CapexItem, FiscalTerms, 
     PricingAssumptions, ProductionProfile, ProductionEnhancement
 )
+from database.composition import capex_mask_of
+from database.connection import bulk_load
 from engine.calculator import FinancialCalculator
 from engine.opex_generator import OpexGenerator
+from engine.profiler import stage
 
 
 class BulkScenarioImporter:
@@ -57,8 +65,13 @@ class BulkScenarioImporter:
         'FGRS': 1,
     }
     
-    def __init__(self, session):
+    # Rows handed to a worker at a time in parallel imports
+    PARTITION_SIZE = 16
+    
+    def __init__(self, session, session_factory=None):
         self.session = session
+        self.session_factory = session_factory
+        self.import_batch = None  # Stamped on scenarios of the current import_from_excel run
         self._load_capex_items()
         self._load_defaults()
     
@@ -157,7 +170,8 @@ class BulkScenarioImporter:
         self, 
         row: pd.Series, 
         custom_quantities: Optional[Dict[str, float]] = None,
-        calculate: bool = True
+        calculate: bool = True,
+        fast: bool = False
     ) -> Tuple[Scenario, Dict]:
         """
         Create a scenario from Excel row
@@ -166,25 +180,70 @@ class BulkScenarioImporter:
             row: pandas Series with scenario configuration
             custom_quantities: Optional custom quantities for CAPEX items
             calculate: Whether to run financial calculations
+            fast: Commit with relaxed durability (bulk_load), see import_from_excel
             
         Returns:
             Tuple of (Scenario object, result info dict)
         """
         scenario_id = int(row['Scenario ID'])
-        capex_selections = self.parse_excel_row(row)
-        
-        # Generate name and description
-        name = self.generate_scenario_name(row, scenario_id)
-        description = f"Bulk imported scenario #{scenario_id}"
         
-        # Check if scenario with this excel_id already exists
-        existing = self.session.query(Scenario).filter(
-            Scenario.name.like(f"S{scenario_id}:%")
-        ).first()
+        with stage('import.check_existing'):
+            # Check if scenario with this excel_id already exists
+            existing = self.session.query(Scenario).filter(
+                Scenario.name.like(f"S{scenario_id}:%")
+            ).first()
         
         if existing:
             return existing, {'status': 'skipped', 'reason': 'Already exists', 'scenario_id': existing.id}
         
+        with bulk_load(self.session) if fast else nullcontext():
+            scenario, info = self._insert_scenario(row, custom_quantities)
+            with stage('import.commit'):
+                self.session.commit()
+        
+        self._process_scenario(self.session, scenario, calculate, self._project_years())
+        
+        return scenario, info
+    
+    def _insert_scenario(
+        self, 
+        row: pd.Series, 
+        custom_quantities: Optional[Dict[str, float]] = None
+    ) -> Tuple[Scenario, Dict]:
+        """
+        Insert the scenario and its CAPEX rows (flushed, not committed)
+        
+        Args:
+            row: pandas Series with scenario configuration
+            custom_quantities: Optional custom quantities for CAPEX items
+            
+        Returns:
+            Tuple of (Scenario object, result info dict)
+        """
+        scenario_id = int(row['Scenario ID'])
+        with stage('import.parse'):
+            capex_selections = self.parse_excel_row(row)
+            
+            # Generate name and description
+            name = self.generate_scenario_name(row, scenario_id)
+            description = f"Bulk imported scenario #{scenario_id}"
+        
+        with stage('import.insert'):
+            return self._insert_scenario_rows(scenario_id, capex_selections, name, description, custom_quantities)
+    
+    def _insert_scenario_rows(
+        self, 
+        scenario_id: int, 
+        capex_selections: Dict[str, List[str]], 
+        name: str, 
+        description: str, 
+        custom_quantities: Optional[Dict[str, float]]
+    ) -> Tuple[Scenario, Dict]:
+        """Add the Scenario and ScenarioCapex rows for a parsed Excel row"""
+        all_codes = []
+        for category, codes in capex_selections.items():
+            all_codes.extend(codes)
+        
         # Create scenario
         scenario = Scenario(
             name=name,
@@ -194,16 +253,14 @@ class BulkScenarioImporter:
             pricing_assumptions_id=self.pricing.id,
             production_enhancement_id=self.enhancement.id if self.enhancement else None,
             created_by='BulkImporter',
-            is_active=True
+            import_batch=self.import_batch,
+            is_active=True,
+            capex_mask=capex_mask_of(self.capex_items[code] for code in all_codes if code in self.capex_items)
         )
         self.session.add(scenario)
         self.session.flush()
         
         # Add CAPEX items
-        all_codes = []
-        for category, codes in capex_selections.items():
-            all_codes.extend(codes)
-        
         total_capex = 0
         for code in all_codes:
             capex_item = self.capex_items.get(code)
@@ -221,22 +278,6 @@ class BulkScenarioImporter:
                 )
                 self.session.add(scenario_capex)
         
-        self.session.commit()
-        
-        # Generate OPEX
-        opex_gen = OpexGenerator(self.session)
-        opex_gen.save_opex_for_scenario(
-            scenario.id, 
-            self.fiscal_terms.project_start_year, 
-            self.fiscal_terms.project_end_year, 
-            escalation_rate=0.02
-        )
-        
-        # Calculate financials if requested
-        if calculate:
-            calculator = FinancialCalculator(scenario, self.session)
-            calculator.save_calculations()
-        
         return scenario, {
             'status': 'created',
             'scenario_id': scenario.id,
@@ -245,13 +286,43 @@ class BulkScenarioImporter:
             'total_capex': total_capex
         }
     
+    def _project_years(self) -> Tuple[int, int]:
+        """Project start and end year of the fiscal terms, as plain ints (safe to hand to worker threads)"""
+        return self.fiscal_terms.project_start_year, self.fiscal_terms.project_end_year
+    
+    def _process_scenario(self, session, scenario: Scenario, calculate: bool, project_years: Tuple[int, int]):
+        """
+        Generate OPEX and (optionally) financials for an inserted scenario
+        
+        Only uses the given session and plain values, never objects of
+        self.session, so worker threads can call it.
+        """
+        start_year, end_year = project_years
+        with stage('import.opex'):
+            # Generate OPEX
+            opex_gen = OpexGenerator(session)
+            opex_gen.save_opex_for_scenario(
+                scenario.id, 
+                start_year, 
+                end_year, 
+                escalation_rate=0.02
+            )
+        
+        # Calculate financials if requested
+        if calculate:
+            with stage('import.calculate'):
+                calculator = FinancialCalculator(scenario, session)
+                calculator.save_calculations()
+    
     def import_from_excel(
         self, 
         excel_path: str, 
         scenario_ids: Optional[List[int]] = None,
         limit: Optional[int] = None,
         calculate: bool = True,
-        progress_callback = None
+        progress_callback = None,
+        workers: int = 1,
+        fast: bool = False
     ) -> Dict:
         """
         Import scenarios from Excel file
@@ -262,11 +333,15 @@ class BulkScenarioImporter:
             limit: Optional limit on number of scenarios to import
             calculate: Whether to run financial calculations
             progress_callback: Optional callback function for progress updates
+            workers: Number of parallel workers (1 = sequential, None = pool size)
+            fast: Insert under bulk_load() (no fsync on SQLite, asynchronous commit on
+                PostgreSQL); only for re-runnable loads such as seeding and benchmarks
             
         Returns:
             Dictionary with import results
         """
-        df = pd.read_excel(excel_path)
+        with stage('import.read_excel'):
+            df = pd.read_excel(excel_path)
         
         # Filter by scenario_ids if specified
         if scenario_ids:
@@ -276,20 +351,27 @@ class BulkScenarioImporter:
         if limit:
             df = df.head(limit)
         
+        # One batch ID per run, so the whole import can be deleted at once (database/maintenance.py)
+        self.import_batch = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        
         results = {
             'total': len(df),
             'created': 0,
             'skipped': 0,
             'errors': 0,
+            'import_batch': self.import_batch,
             'scenarios': []
         }
         
+        if workers is None or workers > 1:
+            return self._import_parallel(df, results, calculate, progress_callback, workers, fast)
+        
         for idx, row in df.iterrows():
             try:
                 if progress_callback:
                     progress_callback(idx + 1, len(df), f"Processing scenario {row['Scenario ID']}")
                 
-                scenario, info = self.create_scenario_from_row(row, calculate=calculate)
+                scenario, info = self.create_scenario_from_row(row, calculate=calculate, fast=fast)
                 results['scenarios'].append(info)
                 
                 if info['status'] == 'created':
@@ -307,6 +389,149 @@ class BulkScenarioImporter:
         
         return results
     
+    def _import_parallel(
+        self, 
+        df: pd.DataFrame, 
+        results: Dict, 
+        calculate: bool, 
+        progress_callback, 
+        workers: Optional[int],
+        fast: bool = False
+    ) -> Dict:
+        """
+        Parallel import: scenarios are inserted in file order on this session,
+        then OPEX generation and calculations run in worker threads
+        
+        Each worker uses its own session from the session factory (default:
+        the dedicated bulk pool), so the number of useful workers is bounded
+        by that pool's size.
+        Per-row results are merged back in file order.
+        
+        Args:
+            df: Rows to import (already filtered)
+            results: Result dictionary to fill
+            calculate: Whether to run financial calculations
+            progress_callback: Optional callback function for progress updates
+            workers: Number of worker threads (None = pool size)
+            fast: Insert under bulk_load()
+            
+        Returns:
+            Dictionary with import results
+        """
+        from database.connection import get_bulk_session_factory
+        
+        session_factory = self.session_factory or get_bulk_session_factory()
+        pool_size = _pool_size(session_factory)
+        if workers is None:
+            workers = pool_size or 1
+        elif pool_size:
+            workers = min(workers, pool_size)
+        
+        total = len(df)
+        row_infos = [None] * total
+        
+        # Existing-ID check done once up front instead of once per row
+        existing = {}
+        for sid, name in self.session.query(Scenario.id, Scenario.name).filter(
+            Scenario.name.like('S%:%')
+        ).all():
+            excel_id = name[1:name.index(':')]
+            if excel_id.isdigit():
+                existing.setdefault(int(excel_id), sid)
+        
+        # Phase 1: insert scenarios + CAPEX sequentially so IDs follow file order
+        pending = []
+        with bulk_load(self.session) if fast else nullcontext():
+            for pos, (_, row) in enumerate(df.iterrows()):
+                try:
+                    excel_id = int(row['Scenario ID'])
+                    if excel_id in existing:
+                        row_infos[pos] = {'status': 'skipped', 'reason': 'Already exists', 'scenario_id': existing[excel_id]}
+                        continue
+                    
+                    with self.session.begin_nested():
+                        scenario, info = self._insert_scenario(row)
+                    existing[excel_id] = scenario.id
+                    row_infos[pos] = info
+                    pending.append((pos, scenario.id))
+                except Exception as e:
+                    row_infos[pos] = {'status': 'error', 'scenario_id': row['Scenario ID'], 'error': str(e)}
+            self.session.commit()
+        
+        done = total - len(pending)
+        if progress_callback and total:
+            progress_callback(done, total, "Scenarios inserted")
+        
+        # Phase 2: OPEX + calculations, partitioned across workers
+        # (fiscal terms read here: the workers must not refresh objects of self.session)
+        project_years = self._project_years()
+        partitions = [
+            pending[i:i + self.PARTITION_SIZE] 
+            for i in range(0, len(pending), self.PARTITION_SIZE)
+        ]
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            # Each task runs in a copy of this context so profiling and
+            # query tracking scopes carry over into the worker threads
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run, 
+                    self._process_partition, session_factory, partition, calculate, project_years
+                )
+                for partition in partitions
+            ]
+            for future in as_completed(futures):
+                for pos, error in future.result():
+                    if error:
+                        row_infos[pos] = {
+                            'status': 'error',
+                            'scenario_id': df.iloc[pos]['Scenario ID'],
+                            'error': error
+                        }
+                    done += 1
+                if progress_callback:
+                    progress_callback(done, total, f"Processed {done} scenarios")
+        
+        for info in row_infos:
+            results['scenarios'].append(info)
+            if info['status'] == 'created':
+                results['created'] += 1
+            elif info['status'] == 'skipped':
+                results['skipped'] += 1
+            else:
+                results['errors'] += 1
+        
+        return results
+    
+    def _process_partition(self, session_factory, partition: List[Tuple[int, int]], calculate: bool,
+                           project_years: Tuple[int, int]) -> List[Tuple[int, Optional[str]]]:
+        """
+        Worker: generate OPEX and calculations for one partition
+        
+        Args:
+            session_factory: Factory for the worker's own session
+            partition: List of (row position, scenario id)
+            calculate: Whether to run financial calculations
+            project_years: (start year, end year) of the fiscal terms
+            
+        Returns:
+            List of (row position, error message or None)
+        """
+        session = session_factory()
+        outcome = []
+        try:
+            for pos, scenario_id in partition:
+                try:
+                    scenario = session.query(Scenario).filter_by(id=scenario_id).first()
+                    self._process_scenario(session, scenario, calculate, project_years)
+                    outcome.append((pos, None))
+                except Exception as e:
+                    session.rollback()
+                    outcome.append((pos, str(e)))
+        finally:
+            session.close()
+        return outcome
+    
     def preview_import(self, excel_path: str, limit: int = 10) -> pd.DataFrame:
         """
         Preview what would be imported without creating scenarios
@@ -346,11 +571,21 @@ class BulkScenarioImporter:
         return pd.DataFrame(preview_data)
 
 
+def _pool_size(session_factory) -> Optional[int]:
+    """Connection pool size behind a session factory (None if unbounded/unknown)"""
+    bind = session_factory.kw.get('bind') if hasattr(session_factory, 'kw') else None
+    pool = getattr(bind, 'pool', None)
+    size = getattr(pool, 'size', None)
+    return size() if callable(size) else None
+
+
 def import_scenarios_from_excel(
     excel_path: str,
     scenario_ids: Optional[List[int]] = None,
     limit: Optional[int] = None,
-    calculate: bool = True
+    calculate: bool = True,
+    workers: int = 1,
+    fast: bool = False
 ) -> Dict:
     """
     Convenience function to import scenarios from Excel
@@ -360,6 +595,8 @@ def import_scenarios_from_excel(
         scenario_ids: Optional list of specific scenario IDs to import
         limit: Optional limit on number of scenarios
         calculate: Whether to run financial calculations
+        workers: Number of parallel workers (1 = sequential, None = pool size)
+        fast: Relaxed-durability load (see BulkScenarioImporter.import_from_excel)
         
     Returns:
         Import results dictionary
@@ -372,5 +609,7 @@ def import_scenarios_from_excel(
             excel_path, 
             scenario_ids=scenario_ids, 
             limit=limit,
-            calculate=calculate
+            calculate=calculate,
+            workers=workers,
+            fast=fast
         )
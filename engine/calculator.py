@@ -2,14 +2,133 @@
 Financial Calculation Engine
 Implements all financial calculations based on the mathematical formulas
 """
+import hashlib
+import json
 import pandas as pd
 import numpy as np
 import numpy_financial as npf
-from typing import Dict, List, Tuple
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert, select, delete, literal
+from sqlalchemy.dialects import postgresql, sqlite
 from database.models import (
     Scenario, ScenarioCapex, ScenarioOpex, CalculationResult, ScenarioMetrics,
     FiscalTerms, PricingAssumptions, ProductionData, ProductionEnhancement, CapexItem
 )
+from engine.profiler import stage, profiled
+
+# Bump whenever calculate_scenario changes its results, so stored
+# results of older versions are no longer reused (see input_fingerprint)
+CALCULATION_VERSION = 1
+
+# Reference-data columns that do not affect results
+_FINGERPRINT_SKIP_COLUMNS = {'id', 'name', 'version', 'created_at', 'effective_date', 'is_active'}
+
+# Columns copied when results are reused from another scenario
+_RESULT_COLUMNS = [c.name for c in CalculationResult.__table__.columns if c.name not in ('id', 'scenario_id')]
+_METRICS_COLUMNS = [c.name for c in ScenarioMetrics.__table__.columns
+                    if c.name not in ('id', 'scenario_id', 'input_fingerprint', 'is_stale', 'calculated_at')]
+
+# INSERT ... ON CONFLICT DO UPDATE per dialect (others fall back to delete + insert)
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+# Unique constraints the upserts resolve conflicts on (uq_scenario_year, uq_scenario_metrics)
+_RESULT_KEY = ['scenario_id', 'year']
+_METRICS_KEY = ['scenario_id']
+
+
+def _reference_values(obj) -> Optional[Dict]:
+    """Column values of a reference-data row that feed the calculation"""
+    if obj is None:
+        return None
+    return {c.name: getattr(obj, c.name) for c in obj.__table__.columns
+            if c.name not in _FINGERPRINT_SKIP_COLUMNS}
+
+
+def _upsert(session, model, key: List[str], scenario_ids: List[int],
+            rows: List[Dict] = None, columns: List[str] = None, source=None) -> int:
+    """
+    Insert rows, updating rows that already exist for `key` in place
+    
+    Existing rows keep their IDs, so recalculation does not churn indexes
+    or leave dead tuples behind the way delete + insert does.
+    
+    Args:
+        session: Database session
+        model: CalculationResult or ScenarioMetrics
+        key: Columns of the unique constraint to resolve conflicts on
+        scenario_ids: Scenarios written (used by the delete + insert fallback)
+        rows: Row dictionaries, written as one executemany
+        columns: Target columns of `source`
+        source: SELECT to insert from instead of rows
+    
+    Returns:
+        Row count reported by the driver
+    """
+    table = model.__table__
+    dialect_insert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if dialect_insert is None:
+        session.execute(delete(table).where(table.c.scenario_id.in_(scenario_ids)))
+        statement = insert(table)
+    else:
+        statement = dialect_insert(table)
+    
+    if source is not None:
+        statement = statement.from_select(columns, source)
+    else:
+        columns = list(rows[0])
+    
+    if dialect_insert is not None:
+        statement = statement.on_conflict_do_update(
+            index_elements=key,
+            set_={c: statement.excluded[c] for c in columns if c not in key}
+        )
+    
+    if source is not None:
+        return session.execute(statement).rowcount
+    return session.execute(statement, rows).rowcount
+
+
+def save_results(session, calculations: List[Tuple[List[CalculationResult], ScenarioMetrics]]):
+    """
+    Upsert calculated results and metrics of many scenarios (not committed)
+    
+    Writes one executemany per table for the whole batch, plus a DELETE of
+    years a scenario no longer has (e.g. after switching to a shorter profile).
+    
+    Args:
+        session: Database session
+        calculations: (results, metrics) pairs as returned by calculate_scenario
+    """
+    if not calculations:
+        return
+    now = datetime.now()
+    scenario_ids = [metrics.scenario_id for _, metrics in calculations]
+    
+    result_rows = [
+        dict({'scenario_id': r.scenario_id}, **{c: getattr(r, c) for c in _RESULT_COLUMNS})
+        for results, _ in calculations for r in results
+    ]
+    if result_rows:
+        _upsert(session, CalculationResult, _RESULT_KEY, scenario_ids, rows=result_rows)
+    
+    by_years = {}
+    for results, metrics in calculations:
+        by_years.setdefault(tuple(sorted(r.year for r in results)), []).append(metrics.scenario_id)
+    for years, ids in by_years.items():
+        session.execute(delete(CalculationResult).where(
+            CalculationResult.scenario_id.in_(ids),
+            CalculationResult.year.notin_(years)
+        ))
+    
+    metrics_rows = [
+        dict({'scenario_id': m.scenario_id, 'input_fingerprint': m.input_fingerprint,
+              'is_stale': False, 'calculated_at': now},
+             **{c: getattr(m, c) for c in _METRICS_COLUMNS})
+        for _, m in calculations
+    ]
+    _upsert(session, ScenarioMetrics, _METRICS_KEY, scenario_ids, rows=metrics_rows)
+
 
 class FinancialCalculator:
     """
@@ -307,6 +426,7 @@ class FinancialCalculator:
         
         return has_eor, has_egr
     
+    @profiled('calculate')
     def calculate_scenario(self) -> Tuple[List[CalculationResult], ScenarioMetrics]:
         """
         Main calculation method - calculates all financial metrics for the scenario
@@ -315,141 +435,148 @@ class FinancialCalculator:
         Returns:
             Tuple of (calculation_results, scenario_metrics)
         """
-        # Get total CAPEX
-        capex_total = self.get_total_capex()
-        
-        # Calculate ASR (5% of total CAPEX, paid in final year)
-        asr_amount = capex_total * self.fiscal_terms.asr_rate
-        
-        # Check enhancement types
-        has_eor, has_egr = self.check_enhancement_types()
-        
-        # Get production data
-        production_data = self.session.query(ProductionData).filter_by(
-            profile_id=self.scenario.production_profile_id
-        ).order_by(ProductionData.year).all()
-        
-        # Get OPEX data
-        scenario_opex = self.session.query(ScenarioOpex).filter_by(
-            scenario_id=self.scenario.id
-        ).order_by(ScenarioOpex.year).all()
-        opex_by_year = {}
-        for opex in scenario_opex:
-            if opex.year not in opex_by_year:
-                opex_by_year[opex.year] = 0
-            opex_by_year[opex.year] += opex.opex_amount
+        with stage('calculate.load_capex'):
+            # Get total CAPEX
+            capex_total = self.get_total_capex()
+            
+            # Calculate ASR (5% of total CAPEX, paid in final year)
+            asr_amount = capex_total * self.fiscal_terms.asr_rate
+            
+            # Check enhancement types
+            has_eor, has_egr = self.check_enhancement_types()
+        
+        with stage('calculate.load_production'):
+            # Get production data
+            production_data = self.session.query(ProductionData).filter_by(
+                profile_id=self.scenario.production_profile_id
+            ).order_by(ProductionData.year).all()
+        
+        with stage('calculate.load_opex'):
+            # Get OPEX data
+            scenario_opex = self.session.query(ScenarioOpex).filter_by(
+                scenario_id=self.scenario.id
+            ).order_by(ScenarioOpex.year).all()
+            opex_by_year = {}
+            for opex in scenario_opex:
+                if opex.year not in opex_by_year:
+                    opex_by_year[opex.year] = 0
+                opex_by_year[opex.year] += opex.opex_amount
         
         # Determine last year for ASR
         last_year = self.fiscal_terms.project_end_year
         
-        # Calculate year by year
-        results = []
-        cumulative_cf = 0
-        cash_flows = []
-        cumulative_cfs = []  # For NPV/IRR calculation (Excel style)
-        
-        for prod in production_data:
-            year = prod.year
-            period = year - self.fiscal_terms.project_start_year + 1
-            
-            # Convert daily rates to annual production
-            # Annual = Daily Rate × Working Days (220)
-            oil_prod_base = prod.condensate_rate_bopd * self.pricing.working_days
-            gas_prod_base = prod.gas_rate_mmscfd * self.pricing.working_days
-            
-            # 1. Calculate enhanced production with EOR/EGR
-            oil_prod, gas_prod = self.calculate_enhanced_production(
-                oil_prod_base, 
-                gas_prod_base,
-                has_eor, 
-                has_egr
-            )
-            
-            # 2. Convert gas to MMBTU
-            gas_mmbtu = self.convert_gas_to_mmbtu(gas_prod)
-            
-            # 3. Calculate revenue
-            oil_rev, gas_rev, total_rev = self.calculate_revenue(oil_prod, gas_mmbtu)
-            
-            # 4. CAPEX (assuming all CAPEX in year 1 for now - you may need to adjust)
-            year_capex = capex_total if period == 1 else 0
-            
-            # 5. Get OPEX for this year
-            year_opex = opex_by_year.get(year, 0)
-            
-            # 6. Calculate depreciation (only first 5 years)
-            if period <= self.fiscal_terms.depreciation_life:
-                depreciation = self.calculate_depreciation_ddb(capex_total, period)
-            else:
-                depreciation = 0
-            
-            # 7. ASR (only in final year)
-            year_asr = asr_amount if year == last_year else 0
-            
-            # 8. Total Cost Recoverable = CAPEX + OPEX + Depreciation + ASR
-            total_cost_recoverable = year_capex + year_opex + depreciation + year_asr
-            
-            # 9. Available for Production Split = Revenue - Total Cost Recoverable
-            available_for_split = total_rev - total_cost_recoverable
-            
-            # 10. PSC Split based on Available for Split
-            # CRITICAL: NO SPLIT if:
-            # 1. Available <= 0 (losses), OR
-            # 2. Year is last year (ASR year)
-            if available_for_split <= 0 or year == last_year:
-                psc_split = {
-                    'contractor_pretax': 0,
-                    'contractor_tax': 0,
-                    'contractor_aftertax': 0,
-                    'government_pretax': 0,
-                    'government_total': 0
-                }
-            else:
-                psc_split = self.calculate_psc_split(available_for_split)
-            
-            # 11. Annual Cash Flow for IRR/NPV
-            # EXCEL STYLE: CF = Revenue - OPEX - CAPEX - Depreciation - ASR
-            # Excel includes depreciation in cash flow calculation
-            annual_cf = total_rev - year_opex - year_capex - depreciation - year_asr
+        with stage('calculate.yearly_loop'):
+            # Calculate year by year
+            results = []
+            cumulative_cf = 0
+            cash_flows = []
+            cumulative_cfs = []  # For NPV/IRR calculation (Excel style)
             
-            # 12. Cumulative Cash Flow
-            cumulative_cf += annual_cf
-            cash_flows.append(annual_cf)
-            cumulative_cfs.append(cumulative_cf)  # Store cumulative for NPV/IRR (Excel style)
+            for prod in production_data:
+                year = prod.year
+                period = year - self.fiscal_terms.project_start_year + 1
+                
+                # Convert daily rates to annual production
+                # Annual = Daily Rate × Working Days (220)
+                oil_prod_base = prod.condensate_rate_bopd * self.pricing.working_days
+                gas_prod_base = prod.gas_rate_mmscfd * self.pricing.working_days
+                
+                # 1. Calculate enhanced production with EOR/EGR
+                oil_prod, gas_prod = self.calculate_enhanced_production(
+                    oil_prod_base, 
+                    gas_prod_base,
+                    has_eor, 
+                    has_egr
+                )
+                
+                # 2. Convert gas to MMBTU
+                gas_mmbtu = self.convert_gas_to_mmbtu(gas_prod)
+                
+                # 3. Calculate revenue
+                oil_rev, gas_rev, total_rev = self.calculate_revenue(oil_prod, gas_mmbtu)
+                
+                # 4. CAPEX (assuming all CAPEX in year 1 for now - you may need to adjust)
+                year_capex = capex_total if period == 1 else 0
+                
+                # 5. Get OPEX for this year
+                year_opex = opex_by_year.get(year, 0)
+                
+                # 6. Calculate depreciation (only first 5 years)
+                if period <= self.fiscal_terms.depreciation_life:
+                    depreciation = self.calculate_depreciation_ddb(capex_total, period)
+                else:
+                    depreciation = 0
+                
+                # 7. ASR (only in final year)
+                year_asr = asr_amount if year == last_year else 0
+                
+                # 8. Total Cost Recoverable = CAPEX + OPEX + Depreciation + ASR
+                total_cost_recoverable = year_capex + year_opex + depreciation + year_asr
+                
+                # 9. Available for Production Split = Revenue - Total Cost Recoverable
+                available_for_split = total_rev - total_cost_recoverable
+                
+                # 10. PSC Split based on Available for Split
+                # CRITICAL: NO SPLIT if:
+                # 1. Available <= 0 (losses), OR
+                # 2. Year is last year (ASR year)
+                if available_for_split <= 0 or year == last_year:
+                    psc_split = {
+                        'contractor_pretax': 0,
+                        'contractor_tax': 0,
+                        'contractor_aftertax': 0,
+                        'government_pretax': 0,
+                        'government_total': 0
+                    }
+                else:
+                    psc_split = self.calculate_psc_split(available_for_split)
+                
+                # 11. Annual Cash Flow for IRR/NPV
+                # EXCEL STYLE: CF = Revenue - OPEX - CAPEX - Depreciation - ASR
+                # Excel includes depreciation in cash flow calculation
+                annual_cf = total_rev - year_opex - year_capex - depreciation - year_asr
+                
+                # 12. Cumulative Cash Flow
+                cumulative_cf += annual_cf
+                cash_flows.append(annual_cf)
+                cumulative_cfs.append(cumulative_cf)  # Store cumulative for NPV/IRR (Excel style)
+                
+                # Store result
+                result = CalculationResult(
+                    scenario_id=self.scenario.id,
+                    year=year,
+                    oil_production=oil_prod,
+                    gas_production_mmscf=gas_prod,
+                    gas_production_mmbtu=gas_mmbtu,
+                    oil_revenue=oil_rev,
+                    gas_revenue=gas_rev,
+                    total_revenue=total_rev,
+                    depreciation=depreciation,
+                    opex_total=year_opex,
+                    operating_profit=available_for_split,  # This is "Available for Split"
+                    contractor_share_pretax=psc_split['contractor_pretax'],
+                    contractor_tax=psc_split['contractor_tax'],
+                    contractor_share_aftertax=psc_split['contractor_aftertax'],
+                    government_share_pretax=psc_split['government_pretax'],
+                    government_total_take=psc_split['government_total'],
+                    cash_flow=annual_cf,
+                    cumulative_cash_flow=cumulative_cf
+                )
+                results.append(result)
             
-            # Store result
-            result = CalculationResult(
-                scenario_id=self.scenario.id,
-                year=year,
-                oil_production=oil_prod,
-                gas_production_mmscf=gas_prod,
-                gas_production_mmbtu=gas_mmbtu,
-                oil_revenue=oil_rev,
-                gas_revenue=gas_rev,
-                total_revenue=total_rev,
-                depreciation=depreciation,
-                opex_total=year_opex,
-                operating_profit=available_for_split,  # This is "Available for Split"
-                contractor_share_pretax=psc_split['contractor_pretax'],
-                contractor_tax=psc_split['contractor_tax'],
-                contractor_share_aftertax=psc_split['contractor_aftertax'],
-                government_share_pretax=psc_split['government_pretax'],
-                government_total_take=psc_split['government_total'],
-                cash_flow=annual_cf,
-                cumulative_cash_flow=cumulative_cf
-            )
-            results.append(result)
-        
         # Calculate NPV at 13% using CUMULATIVE cash flows (Excel style)
         # Excel formula: =NPV(0.13, J33:U33) where J33:U33 are cumulative CFs
-        npv = self.calculate_npv(cumulative_cfs, self.fiscal_terms.discount_rate)
+        with stage('calculate.npv'):
+            npv = self.calculate_npv(cumulative_cfs, self.fiscal_terms.discount_rate)
         
         # Calculate IRR using CUMULATIVE cash flows (Excel style)
         # Excel formula: =IRR(J33:U33, 20%)
-        irr = self.calculate_irr(cumulative_cfs)
+        with stage('calculate.irr'):
+            irr = self.calculate_irr(cumulative_cfs)
         
         # Calculate Payback Period
-        payback_period = self.calculate_payback_period(results)
+        with stage('calculate.payback'):
+            payback_period = self.calculate_payback_period(results)
         
         # Calculate metrics (matching Excel J35-J41)
         # Gross Revenue = SUM all revenues
@@ -471,6 +598,9 @@ class FinancialCalculator:
         # Total OPEX
         total_opex = sum(opex_by_year.values())
         
+        # Cash exposure = deepest point of the cumulative cash flow curve
+        peak_cash_exposure = max(0, -min(cumulative_cfs)) if cumulative_cfs else 0
+        
         # Create metrics
         metrics = ScenarioMetrics(
             scenario_id=self.scenario.id,
@@ -482,25 +612,180 @@ class FinancialCalculator:
             npv=npv,
             irr=irr,
             payback_period_years=payback_period,
-            asr_amount=asr_amount
+            asr_amount=asr_amount,
+            contractor_ptcf=contractor_ptcf,
+            peak_cash_exposure=peak_cash_exposure,
+            max_annual_revenue=max((r.total_revenue for r in results), default=0),
+            final_cumulative_cash_flow=cumulative_cf,
+            total_depreciation=sum(r.depreciation for r in results)
         )
         
         return results, metrics
     
+    def input_fingerprint(self) -> str:
+        """
+        Content hash of everything calculate_scenario reads
+        
+        Covers the CAPEX lines, OPEX rows, production data and the values
+        (not IDs) of the fiscal terms, pricing and enhancement rows, plus
+        CALCULATION_VERSION. Scenarios with equal fingerprints have
+        identical results.
+        
+        Returns:
+            sha256 hex digest
+        """
+        capex = self.session.query(
+            CapexItem.code, ScenarioCapex.quantity, ScenarioCapex.unit_cost, ScenarioCapex.total_cost
+        ).join(CapexItem, CapexItem.id == ScenarioCapex.capex_item_id).filter(
+            ScenarioCapex.scenario_id == self.scenario.id
+        ).order_by(CapexItem.code).all()
+        opex = self.session.query(
+            ScenarioOpex.year, ScenarioOpex.opex_name, ScenarioOpex.opex_amount
+        ).filter(
+            ScenarioOpex.scenario_id == self.scenario.id
+        ).order_by(ScenarioOpex.year, ScenarioOpex.id).all()
+        production = self.session.query(
+            ProductionData.year, ProductionData.condensate_rate_bopd, ProductionData.gas_rate_mmscfd
+        ).filter(
+            ProductionData.profile_id == self.scenario.production_profile_id
+        ).order_by(ProductionData.year).all()
+        
+        payload = {
+            'version': CALCULATION_VERSION,
+            'capex': [list(r) for r in capex],
+            'opex': [list(r) for r in opex],
+            'production': [list(r) for r in production],
+            'fiscal': _reference_values(self.fiscal_terms),
+            'pricing': _reference_values(self.pricing),
+            'enhancement': _reference_values(self.enhancement),
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+    
+    def _reuse_results(self, fingerprint: str) -> bool:
+        """
+        Upsert results and metrics of another scenario with the same fingerprint
+        
+        Returns:
+            True if results were copied, False if no usable donor exists
+        """
+        donor_id = self.session.query(ScenarioMetrics.scenario_id).filter(
+            ScenarioMetrics.input_fingerprint == fingerprint,
+            ScenarioMetrics.scenario_id != self.scenario.id
+        ).order_by(ScenarioMetrics.id).limit(1).scalar()
+        if donor_id is None:
+            return False
+        
+        result_table = CalculationResult.__table__
+        copied = _upsert(
+            self.session, CalculationResult, _RESULT_KEY, [self.scenario.id],
+            columns=['scenario_id'] + _RESULT_COLUMNS,
+            source=select(literal(self.scenario.id), *[result_table.c[c] for c in _RESULT_COLUMNS]).where(
+                result_table.c.scenario_id == donor_id
+            )
+        )
+        if not copied:
+            return False
+        self.session.execute(delete(CalculationResult).where(
+            CalculationResult.scenario_id == self.scenario.id,
+            CalculationResult.year.notin_(select(result_table.c.year).where(result_table.c.scenario_id == donor_id))
+        ))
+        
+        metrics_table = ScenarioMetrics.__table__
+        _upsert(
+            self.session, ScenarioMetrics, _METRICS_KEY, [self.scenario.id],
+            columns=['scenario_id', 'input_fingerprint', 'is_stale', 'calculated_at'] + _METRICS_COLUMNS,
+            source=select(literal(self.scenario.id), literal(fingerprint), literal(False), literal(datetime.now()),
+                          *[metrics_table.c[c] for c in _METRICS_COLUMNS]).where(
+                metrics_table.c.scenario_id == donor_id
+            )
+        )
+        return True
+    
     def save_calculations(self):
         """
         Calculate and save results to database
+        
+        Rows are upserted on (scenario_id, year) and scenario_id, so a
+        recalculation updates the existing rows in place. If another
+        scenario already has results for the same input fingerprint,
+        those are copied in SQL instead of recalculated.
+        
+        Returns:
+            Tuple of (calculation_results, scenario_metrics)
         """
-        # Delete existing results
-        self.session.query(CalculationResult).filter_by(scenario_id=self.scenario.id).delete()
-        self.session.query(ScenarioMetrics).filter_by(scenario_id=self.scenario.id).delete()
+        with stage('calculate.fingerprint'):
+            fingerprint = self.input_fingerprint()
+        
+        with stage('calculate.reuse'):
+            reused = self._reuse_results(fingerprint)
+        if reused:
+            self.session.commit()
+            results = self.session.query(CalculationResult).filter_by(
+                scenario_id=self.scenario.id
+            ).order_by(CalculationResult.year).all()
+            metrics = self.session.query(ScenarioMetrics).filter_by(scenario_id=self.scenario.id).first()
+            return results, metrics
         
         # Calculate
         results, metrics = self.calculate_scenario()
+        metrics.input_fingerprint = fingerprint
         
-        # Save results
-        self.session.add_all(results)
-        self.session.add(metrics)
-        self.session.commit()
+        with stage('calculate.save'):
+            save_results(self.session, [(results, metrics)])
+            self.session.commit()
         
         return results, metrics
+
+
+def save_calculations_batch(session, scenarios: List[Scenario]) -> Dict[int, str]:
+    """
+    Calculate many scenarios and upsert them in one statement batch
+    
+    Scenarios sharing an input fingerprint within the batch are calculated
+    once; fingerprints already stored for other scenarios are copied in SQL.
+    
+    Args:
+        session: Database session
+        scenarios: Scenarios with CAPEX and OPEX in place
+    
+    Returns:
+        Dictionary of scenario_id -> 'calculated', 'duplicate' or 'reused'
+    """
+    status = {}
+    calculations = []
+    computed = {}  # fingerprint -> (results, metrics) calculated in this batch
+    
+    for scenario in scenarios:
+        calculator = FinancialCalculator(scenario, session)
+        with stage('calculate.fingerprint'):
+            fingerprint = calculator.input_fingerprint()
+        
+        if fingerprint in computed:
+            results, metrics = computed[fingerprint]
+            calculations.append((
+                [CalculationResult(scenario_id=scenario.id, **{c: getattr(r, c) for c in _RESULT_COLUMNS})
+                 for r in results],
+                ScenarioMetrics(scenario_id=scenario.id, input_fingerprint=fingerprint,
+                                **{c: getattr(metrics, c) for c in _METRICS_COLUMNS})
+            ))
+            status[scenario.id] = 'duplicate'
+            continue
+        
+        with stage('calculate.reuse'):
+            reused = calculator._reuse_results(fingerprint)
+        if reused:
+            status[scenario.id] = 'reused'
+            continue
+        
+        results, metrics = calculator.calculate_scenario()
+        metrics.input_fingerprint = fingerprint
+        computed[fingerprint] = (results, metrics)
+        calculations.append((results, metrics))
+        status[scenario.id] = 'calculated'
+    
+    with stage('calculate.save'):
+        save_results(session, calculations)
+        session.commit()
+    
+    return status
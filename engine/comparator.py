@@ -1,10 +1,239 @@
 """
 Scenario Comparison and Ranking Engine
 """
-from typing import List, Dict
+from collections.abc import Sequence
+from typing import List, Dict, Optional
+import numpy as np
 import pandas as pd
-from sqlalchemy import func
+from sqlalchemy import Float, case, func, literal, select
 from database.models import Scenario, ScenarioMetrics, ScenarioComparison, ComparisonScenario, CalculationResult
+from engine.pareto import DEFAULT_OBJECTIVES, add_pareto_fronts
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # optional: SimilarityIndex falls back to an exact NumPy scan
+    cKDTree = None
+
+# Scoring profiles: score column -> weight (weights sum to 1.0)
+# Terms are summed in this order, so 'default' reproduces the original formula exactly
+SCORING_PROFILES = {
+    'default': {
+        'npv_score': 0.30,          # NPV: 30%
+        'contractor_score': 0.25,   # Contractor Share: 25%
+        'irr_score': 0.15,          # IRR: 15%
+        'payback_score': 0.10,      # Payback Period: 10%
+        'capex_score': 0.10,        # CAPEX: 10%
+        'opex_score': 0.10,         # OPEX: 10%
+    },
+    'npv_focus': {
+        'npv_score': 0.50,
+        'contractor_score': 0.20,
+        'irr_score': 0.10,
+        'payback_score': 0.10,
+        'capex_score': 0.05,
+        'opex_score': 0.05,
+    },
+    'capital_efficiency': {
+        'npv_score': 0.20,
+        'contractor_score': 0.15,
+        'irr_score': 0.20,
+        'payback_score': 0.15,
+        'capex_score': 0.20,
+        'opex_score': 0.10,
+    },
+}
+
+# Scored metrics in summation order: (score column, metric column, higher is better)
+SCORE_METRICS = [
+    ('npv_score', 'npv', True),
+    ('contractor_score', 'total_contractor_share', True),
+    ('irr_score', 'irr_capped', True),
+    ('payback_score', 'payback_filled', False),
+    ('capex_score', 'total_capex', False),
+    ('opex_score', 'total_opex', False),
+]
+
+# IRR is capped at 100% for scoring (NULL IRR = instant payback, also scored as 100%)
+IRR_SCORE_CAP = 1.0
+
+# Payback used for every scenario when none has a payback period
+PAYBACK_FILL_DEFAULT = 99
+
+
+def resolve_weights(profile: str = 'default', weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Weights to score with: custom weights if given, otherwise the profile's
+    
+    Raises:
+        ValueError: Unknown profile or weight for a column that is not in SCORE_METRICS
+    """
+    if weights is None:
+        if profile not in SCORING_PROFILES:
+            raise ValueError(f"Unknown scoring profile: {profile}")
+        return SCORING_PROFILES[profile]
+    unknown = set(weights) - {score for score, _, _ in SCORE_METRICS}
+    if unknown:
+        raise ValueError(f"Unknown score columns: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def normalize_columns(values: np.ndarray, higher_is_better: np.ndarray) -> np.ndarray:
+    """
+    Min-max normalize every column of a metrics matrix to 0-1 at once
+    
+    Columns where lower is better are flipped (1 - scaled); a column whose
+    values are all equal scores 1.0. NaN metrics stay NaN.
+    
+    Args:
+        values: Scenarios x metrics matrix
+        higher_is_better: One flag per column
+        
+    Returns:
+        Matrix of scores with the same shape
+    """
+    frame = pd.DataFrame(values)
+    low, high = frame.min().to_numpy(), frame.max().to_numpy()  # NaN-skipping, no all-NaN warnings
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = (values - low) / (high - low)
+    scores = np.where(higher_is_better, scaled, 1 - scaled)
+    return np.where(high != low, scores, 1.0)
+
+
+def rank_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Sort scored scenarios by total_score and number them (ties by scenario ID, so ranks are deterministic)"""
+    df = df.sort_values(['total_score', 'scenario_id'], ascending=[False, True])
+    df['rank'] = range(1, len(df) + 1)
+    return df
+
+
+# Metrics compared by the metric-profile similarity (z-scored, IRR capped as in the scoring)
+SIMILARITY_METRICS = ['npv', 'irr_capped', 'total_capex']
+
+# Number of similar scenarios listed
+SIMILAR_SCENARIOS = 10
+
+_similarity_indexes = {}  # engine URL -> (metrics version, SimilarityIndex)
+
+_POPCOUNT_8 = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Number of set bits of each uint64"""
+    if hasattr(np, 'bitwise_count'):  # NumPy 2.0+
+        return np.bitwise_count(values)
+    return _POPCOUNT_8[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def top_k_order(scores: np.ndarray, scenario_ids: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Positions of the k best scores, best first, without sorting the rest
+    
+    Same order as rank_frame (score descending, NaN last, ties by scenario
+    ID): np.argpartition-style selection finds the k-th best key, then only
+    the candidates up to it (including every tie) are sorted.
+    
+    Args:
+        scores: total_score per scenario
+        scenario_ids: Scenario ID per scenario (tie-break)
+        k: Number of positions (None = all, fully sorted)
+        
+    Returns:
+        Array of row positions
+    """
+    key = np.where(np.isnan(scores), np.inf, -scores)
+    if k is not None and k < len(key):
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        kth = np.partition(key, k - 1)[k - 1]
+        candidates = np.flatnonzero(key <= kth)
+    else:
+        candidates = np.arange(len(key))
+    order = candidates[np.lexsort((scenario_ids[candidates], key[candidates]))]
+    return order[:k] if k is not None else order
+
+
+class RankedRecords(Sequence):
+    """
+    Read-only ranked records built lazily from column arrays
+    
+    Behaves like the list rank_scenarios returns, but a record dictionary is
+    only created when it is accessed, so showing the top 100 of a large
+    selection costs 100 dictionaries. Slicing returns another view.
+    """
+    
+    def __init__(self, columns: Dict[str, np.ndarray], order: np.ndarray, ranks: np.ndarray):
+        self._columns = columns
+        self._order = order
+        self._ranks = ranks
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, order: np.ndarray, ranks: np.ndarray) -> 'RankedRecords':
+        return cls({column: df[column].to_numpy() for column in df.columns}, order, ranks)
+    
+    def __len__(self) -> int:
+        return len(self._order)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RankedRecords(self._columns, self._order[index], self._ranks[index])
+        position = self._order[index]
+        record = {column: _native(values[position]) for column, values in self._columns.items()}
+        record['rank'] = int(self._ranks[index])
+        return record
+    
+    def column(self, name: str) -> np.ndarray:
+        """One column in ranked order (rank included)"""
+        if name == 'rank':
+            return self._ranks
+        return self._columns[name][self._order]
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """Records as a DataFrame in ranked order"""
+        df = pd.DataFrame({column: values[self._order] for column, values in self._columns.items()})
+        df['rank'] = self._ranks
+        return df
+
+
+def _native(value):
+    """NumPy scalar as the Python value DataFrame.to_dict would give"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def score_scenarios(df: pd.DataFrame, weights: Dict[str, float]) -> pd.DataFrame:
+    """
+    Add the score columns and the weighted total_score to a metrics DataFrame
+    
+    All metrics are normalized as one matrix, so rescoring with other
+    weights costs a few array operations.
+    
+    Args:
+        df: Metrics as returned by ScenarioComparator.get_scenario_metrics_df
+        weights: Score column -> weight (see SCORING_PROFILES)
+        
+    Returns:
+        The same DataFrame with irr_capped, payback_filled, the score columns and total_score
+    """
+    # IRR capped at IRR_SCORE_CAP, NaN (all positive CFs, instant payback) treated as the cap,
+    # so scenarios with tiny CAPEX do not dominate unfairly
+    irr = df['irr'].to_numpy(dtype=float)
+    df['irr_capped'] = np.where(np.isnan(irr), IRR_SCORE_CAP, np.where(irr > 0, np.minimum(irr, IRR_SCORE_CAP), 0.0))
+    
+    # Missing payback = worst case (longest payback)
+    payback = df['payback_period'].astype(float)
+    df['payback_filled'] = payback.fillna(payback.max() if payback.notna().any() else PAYBACK_FILL_DEFAULT)
+    
+    values = df[[metric for _, metric, _ in SCORE_METRICS]].to_numpy(dtype=float)
+    scores = normalize_columns(values, np.array([higher for _, _, higher in SCORE_METRICS]))
+    for index, (score, _, _) in enumerate(SCORE_METRICS):
+        df[score] = scores[:, index]
+    
+    columns = [index for index, (score, _, _) in enumerate(SCORE_METRICS) if score in weights]
+    weighted = scores[:, columns] * np.array([weights[SCORE_METRICS[index][0]] for index in columns])
+    # Accumulated left to right (same order as the SQL ranking) so both give identical totals
+    total = np.cumsum(weighted, axis=1)[:, -1] if columns else np.zeros(len(df))
+    df['total_score'] = total * 100
+    return df
+
 
 class ScenarioComparator:
     """
@@ -80,11 +309,12 @@ class ScenarioComparator:
         # Normalize values (will be done relative to all scenarios in comparison)
         return 0  # Placeholder - will be calculated in rank_scenarios
     
-    def rank_scenarios(self, scenario_ids: List[int]) -> List[Dict]:
+    def rank_scenarios(self, scenario_ids: List[int], profile: str = 'default',
+                       weights: Optional[Dict[str, float]] = None) -> List[Dict]:
         """
         Rank scenarios based on multiple criteria
         
-        Scoring Weights (Total = 100%):
+        Scoring Weights for the 'default' profile (Total = 100%):
         - NPV: 30% (Higher is better)
         - Contractor Share: 25% (Higher is better)
         - IRR: 15% (Higher is better)
@@ -94,100 +324,190 @@ class ScenarioComparator:
         
         Args:
             scenario_ids: List of scenario IDs to compare
+            profile: Key of SCORING_PROFILES
+            weights: Custom score column -> weight (overrides profile)
             
         Returns:
             List of dictionaries with ranked scenarios
         """
-        df = self.get_scenario_metrics_df(scenario_ids)
-        
-        if df.empty:
-            return []
+        return ComparisonContext(self, scenario_ids).ranked(profile, weights)
+    
+    def top_scenarios(self, scenario_ids: List[int], k: Optional[int] = 100, profile: str = 'default',
+                      weights: Optional[Dict[str, float]] = None,
+                      irr_min: float = None, irr_max: float = None) -> 'RankedRecords':
+        """
+        Top k of a selection as a lazy records view (see ComparisonContext.top)
         
-        # Normalize metrics for scoring (0-1 scale)
+        For all active scenarios, rank_scenarios_sql(limit=k) returns the
+        same rows with the selection done by the database.
+        """
+        return ComparisonContext(self, scenario_ids).top(k, profile, weights, irr_min, irr_max)
+    
+    def context(self, scenario_ids: List[int]) -> 'ComparisonContext':
+        """Comparison context for one selection (metrics loaded once, rankings memoized)"""
+        return ComparisonContext(self, scenario_ids)
+    
+    def rescore(self, ranked: List[Dict], weights: Dict[str, float]) -> List[Dict]:
+        """
+        Re-rank already scored scenarios with other weights, without touching the database
         
-        # 1. NPV - Higher is better (30%)
-        if df['npv'].max() != df['npv'].min():
-            df['npv_score'] = (df['npv'] - df['npv'].min()) / (df['npv'].max() - df['npv'].min())
-        else:
-            df['npv_score'] = 1.0
+        The normalized score columns do not depend on the weights, so only
+        the weighted total and the order change.
         
-        # 2. Contractor Share - Higher is better (25%)
-        if df['total_contractor_share'].max() != df['total_contractor_share'].min():
-            df['contractor_score'] = (df['total_contractor_share'] - df['total_contractor_share'].min()) / \
-                                     (df['total_contractor_share'].max() - df['total_contractor_share'].min())
-        else:
-            df['contractor_score'] = 1.0
-        
-        # 3. IRR - Higher is better (15%)
-        # CAP IRR at 100% for scoring to handle extreme cases:
-        # - IRR > 100% (very high returns) → capped at 100%
-        # - IRR = NaN (all positive CFs, instant payback) → treated as 100%
-        # This prevents scenarios with tiny CAPEX from dominating unfairly
-        IRR_CAP = 1.0  # 100% cap for scoring purposes
-        df['irr_capped'] = df['irr'].apply(lambda x: min(x, IRR_CAP) if pd.notna(x) and x > 0 else IRR_CAP if pd.isna(x) else 0)
-        
-        if df['irr_capped'].max() != df['irr_capped'].min():
-            df['irr_score'] = (df['irr_capped'] - df['irr_capped'].min()) / \
-                              (df['irr_capped'].max() - df['irr_capped'].min())
-        else:
-            df['irr_score'] = 1.0
-        
-        # 4. Payback Period - Lower is better (10%)
-        # Handle None/NaN values by filling with maximum (worst case)
-        df['payback_filled'] = df['payback_period'].fillna(df['payback_period'].max() if df['payback_period'].notna().any() else 99)
-        if df['payback_filled'].max() != df['payback_filled'].min():
-            df['payback_score'] = 1 - (df['payback_filled'] - df['payback_filled'].min()) / \
-                                  (df['payback_filled'].max() - df['payback_filled'].min())
-        else:
-            df['payback_score'] = 1.0
+        Args:
+            ranked: Records from rank_scenarios
+            weights: Score column -> weight
+            
+        Returns:
+            New list of records ranked by the new total_score
+        """
+        weights = resolve_weights(weights=weights)
+        if not ranked:
+            return []
+        df = pd.DataFrame(ranked)
+        columns = [score for score, _, _ in SCORE_METRICS if score in weights]
+        weighted = df[columns].to_numpy(dtype=float) * np.array([weights[score] for score in columns])
+        total = np.cumsum(weighted, axis=1)[:, -1] if columns else np.zeros(len(df))
+        df['total_score'] = total * 100
+        return rank_frame(df).to_dict('records')
+    
+    def rank_scenarios_sql(
+        self, 
+        scenario_ids: Optional[List[int]] = None, 
+        profile: str = 'default',
+        limit: Optional[int] = None, 
+        offset: int = 0,
+        weights: Optional[Dict[str, float]] = None
+    ) -> List[Dict]:
+        """
+        Rank scenarios in a single SQL statement and return only one page of the ranking
         
-        # 5. CAPEX - Lower is better (10%)
-        if df['total_capex'].max() != df['total_capex'].min():
-            df['capex_score'] = 1 - (df['total_capex'] - df['total_capex'].min()) / \
-                                (df['total_capex'].max() - df['total_capex'].min())
-        else:
-            df['capex_score'] = 1.0
+        Same scores and ranks as rank_scenarios: the min-max bounds come from
+        MIN()/MAX() OVER () across the whole selection, the score is summed
+        in the same order and ranks come from ROW_NUMBER() OVER (score desc,
+        scenario_id) - the unique 1..n ranks rank_scenarios assigns. Only the
+        requested rows leave the database.
         
-        # 6. OPEX - Lower is better (10%)
-        if df['total_opex'].max() != df['total_opex'].min():
-            df['opex_score'] = 1 - (df['total_opex'] - df['total_opex'].min()) / \
-                               (df['total_opex'].max() - df['total_opex'].min())
+        Args:
+            scenario_ids: Scenarios to rank (None = all active scenarios)
+            profile: Key of SCORING_PROFILES
+            limit: Number of ranked rows to return (None = all)
+            offset: Number of top-ranked rows to skip
+            weights: Custom score column -> weight (overrides profile)
+            
+        Returns:
+            List of dictionaries with the same keys and values as rank_scenarios
+        """
+        weights = resolve_weights(profile, weights)
+        m = ScenarioMetrics
+        cap = literal(IRR_SCORE_CAP, Float)
+        
+        base = select(
+            Scenario.id.label('scenario_id'),
+            Scenario.name.label('scenario_name'),
+            m.total_capex,
+            m.total_opex,
+            m.total_revenue,
+            m.total_contractor_share,
+            m.total_government_take,
+            m.npv,
+            m.irr,
+            m.payback_period_years.label('payback_period'),
+            m.asr_amount,
+            case(
+                (m.irr.is_(None), cap),
+                (m.irr > 0, case((m.irr < cap, m.irr), else_=cap)),
+                else_=literal(0.0, Float)
+            ).label('irr_capped'),
+            func.coalesce(
+                m.payback_period_years, func.max(m.payback_period_years).over(),
+                literal(float(PAYBACK_FILL_DEFAULT), Float)
+            ).label('payback_filled')
+        ).join(
+            m, Scenario.id == m.scenario_id
+        )
+        if scenario_ids is None:
+            base = base.where(Scenario.is_active == True)
         else:
-            df['opex_score'] = 1.0
-        
-        # Calculate weighted total score (NEW WEIGHTS)
-        df['total_score'] = (
-            df['npv_score'] * 0.30 +         # NPV: 30%
-            df['contractor_score'] * 0.25 +   # Contractor Share: 25%
-            df['irr_score'] * 0.15 +          # IRR: 15%
-            df['payback_score'] * 0.10 +      # Payback Period: 10%
-            df['capex_score'] * 0.10 +        # CAPEX: 10%
-            df['opex_score'] * 0.10           # OPEX: 10%
-        ) * 100
-        
-        # Sort by score
-        df = df.sort_values('total_score', ascending=False)
-        df['rank'] = range(1, len(df) + 1)
-        
+            base = base.where(Scenario.id.in_(scenario_ids))
+        base = base.subquery()
+        
+        def normalized(column, higher_is_better: bool):
+            low, high = func.min(column).over(), func.max(column).over()
+            scaled = (column - low) / (high - low)
+            return case((high == low, literal(1.0, Float)), else_=scaled if higher_is_better else 1 - scaled)
+        
+        score_columns = {score: normalized(base.c[metric], higher) for score, metric, higher in SCORE_METRICS}
+        scored = select(
+            *base.c, *(expr.label(name) for name, expr in score_columns.items())
+        ).subquery()
+        
+        # Summed in SCORE_METRICS order like score_scenarios, so floating-point results match exactly
+        total = literal(0, Float)
+        for score, _, _ in SCORE_METRICS:
+            if score in weights:
+                total = total + scored.c[score] * literal(weights[score], Float)
+        total = total * literal(100.0, Float)
+        
+        ranked = select(
+            *scored.c, total.label('total_score')
+        ).subquery()
+        ranked = select(
+            *ranked.c,
+            func.row_number().over(
+                order_by=(ranked.c.total_score.desc().nulls_last(), ranked.c.scenario_id)
+            ).label('rank')
+        ).subquery()
+        
+        query = select(*ranked.c).order_by(ranked.c.rank)
+        if offset:
+            query = query.where(ranked.c.rank > offset)
+        if limit is not None:
+            query = query.where(ranked.c.rank <= offset + limit)
+        
+        rows = self.session.execute(query).mappings().all()
+        columns = ['scenario_id', 'scenario_name', 'total_capex', 'total_opex', 'total_revenue',
+                   'total_contractor_share', 'total_government_take', 'npv', 'irr', 'payback_period',
+                   'asr_amount', 'npv_score', 'contractor_score', 'irr_capped', 'irr_score',
+                   'payback_filled', 'payback_score', 'capex_score', 'opex_score', 'total_score', 'rank']
+        df = pd.DataFrame([dict(r) for r in rows], columns=columns)
+        # NULL metrics as NaN, as in rank_scenarios (a page of all-NULL values would stay None otherwise)
+        numeric = [c for c in columns if c not in ('scenario_id', 'scenario_name', 'rank')]
+        df[numeric] = df[numeric].astype(float)
         return df.to_dict('records')
     
-    def get_best_scenario_recommendation(self, scenario_ids: List[int]) -> Dict:
+    def get_best_scenario_recommendation(self, scenario_ids: List[int],
+                                         context: Optional['ComparisonContext'] = None) -> Dict:
         """
         Get the best scenario with detailed recommendation
         
         Args:
             scenario_ids: List of scenario IDs to compare
+            context: Comparison context of the same selection (reuses its ranking)
             
         Returns:
             Dictionary with recommendation details
         """
-        ranked = self.rank_scenarios(scenario_ids)
+        if context is not None:
+            ranked = context.ranked()
+        else:
+            ranked = self.rank_scenarios_sql(scenario_ids, limit=1)
         
         if not ranked:
             return None
         
-        best = ranked[0]
+        return self.recommendation(ranked[0])
+    
+    def recommendation(self, best: Dict) -> Dict:
+        """
+        Recommendation text and key figures for a ranked scenario record
         
+        Args:
+            best: Record from rank_scenarios (usually rank 1)
+            
+        Returns:
+            Dictionary with recommendation details
+        """
         # Generate recommendation text
         reasons = []
         
@@ -239,20 +559,13 @@ class ScenarioComparator:
         Returns:
             Dictionary with detailed comparison
         """
-        ranked = self.rank_scenarios(scenario_ids)
-        best = self.get_best_scenario_recommendation(scenario_ids)
-        df = self.get_scenario_metrics_df(scenario_ids)
+        # One metrics load shared by the ranking, the recommendation and the statistics
+        context = self.context(scenario_ids)
         
         return {
-            'ranked_scenarios': ranked,
-            'best_scenario': best,
-            'summary_statistics': {
-                'avg_npv': df['npv'].mean(),
-                'max_npv': df['npv'].max(),
-                'min_npv': df['npv'].min(),
-                'avg_capex': df['total_capex'].mean(),
-                'avg_revenue': df['total_revenue'].mean()
-            }
+            'ranked_scenarios': context.ranked(),
+            'best_scenario': self.get_best_scenario_recommendation(scenario_ids, context=context),
+            'summary_statistics': context.summary_statistics()
         }
     
     def save_comparison(self, name: str, description: str, scenario_ids: List[int]) -> ScenarioComparison:
@@ -291,3 +604,271 @@ class ScenarioComparator:
         self.session.commit()
         
         return comparison
+
+
+class ComparisonContext:
+    """
+    One scenario selection's metrics, loaded once per request, with rankings memoized per weight profile
+    
+    Every view of a comparison (ranking, recommendation, statistics,
+    re-weighting) reads the same metrics DataFrame instead of querying again.
+    Build one per request: it does not notice metrics recalculated later.
+    """
+    
+    def __init__(self, comparator: ScenarioComparator, scenario_ids: List[int]):
+        self.comparator = comparator
+        self.scenario_ids = scenario_ids
+        self._metrics = None
+        self._scored = {}
+        self._rankings = {}
+    
+    @property
+    def metrics(self) -> pd.DataFrame:
+        """Raw metrics of the selection (loaded on first use)"""
+        if self._metrics is None:
+            self._metrics = self.comparator.get_scenario_metrics_df(self.scenario_ids)
+        return self._metrics
+    
+    def ranked(self, profile: str = 'default', weights: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """
+        Ranked records as returned by ScenarioComparator.rank_scenarios (shared, do not modify)
+        
+        Args:
+            profile: Key of SCORING_PROFILES
+            weights: Custom score column -> weight (overrides profile)
+        """
+        weights = resolve_weights(profile, weights)
+        key = tuple(sorted(weights.items()))
+        if key not in self._rankings:
+            scored = self._scored_frame(weights)
+            self._rankings[key] = rank_frame(scored.copy()).to_dict('records') if not scored.empty else []
+        return self._rankings[key]
+    
+    def _scored_frame(self, weights: Dict[str, float]) -> pd.DataFrame:
+        """Metrics with score columns and total_score, unsorted (memoized per weights)"""
+        key = tuple(sorted(weights.items()))
+        if key not in self._scored:
+            self._scored[key] = score_scenarios(self.metrics.copy(), weights) if not self.metrics.empty else self.metrics
+        return self._scored[key]
+    
+    def top(self, k: Optional[int] = 100, profile: str = 'default', weights: Optional[Dict[str, float]] = None,
+            irr_min: float = None, irr_max: float = None) -> RankedRecords:
+        """
+        Best k scenarios as a lazy records view (cost depends on k, not on the selection size)
+        
+        Scores are normalized over the whole selection; the IRR bounds only
+        filter which scenarios are returned, and rank stays the overall rank
+        (as LeaderboardStore.top).
+        
+        Args:
+            k: Number of scenarios (None = all matching, fully sorted)
+            profile: Key of SCORING_PROFILES
+            weights: Custom score column -> weight (overrides profile)
+            irr_min: Optional lower IRR bound (inclusive, decimal)
+            irr_max: Optional upper IRR bound (inclusive, decimal)
+            
+        Returns:
+            RankedRecords with the same keys as rank_scenarios records
+        """
+        scored = self._scored_frame(resolve_weights(profile, weights))
+        if scored.empty:
+            return RankedRecords({}, np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))
+        scores = scored['total_score'].to_numpy(dtype=float)
+        scenario_ids = scored['scenario_id'].to_numpy()
+        
+        if irr_min is None and irr_max is None:
+            order = top_k_order(scores, scenario_ids, k)
+            return RankedRecords.from_frame(scored, order, np.arange(1, len(order) + 1))
+        
+        irr = scored['irr'].to_numpy(dtype=float)
+        matching = ~np.isnan(irr)
+        if irr_min is not None:
+            matching &= irr >= irr_min
+        if irr_max is not None:
+            matching &= irr <= irr_max
+        positions = np.flatnonzero(matching)
+        order = positions[top_k_order(scores[positions], scenario_ids[positions], k)]
+        # Overall ranks need the full ordering (one array sort; records are still built only for k rows)
+        overall = np.empty(len(scores), dtype=np.intp)
+        overall[top_k_order(scores, scenario_ids)] = np.arange(1, len(scores) + 1)
+        return RankedRecords.from_frame(scored, order, overall[order])
+    
+    def best(self, profile: str = 'default', weights: Optional[Dict[str, float]] = None) -> Optional[Dict]:
+        """Top-ranked record (None if no scenario has metrics)"""
+        ranked = self.ranked(profile, weights)
+        return ranked[0] if ranked else None
+    
+    def pareto(self, objectives=DEFAULT_OBJECTIVES, max_fronts: Optional[int] = 1) -> pd.DataFrame:
+        """
+        Metrics of the selection with their Pareto front number (see engine.pareto)
+        
+        Args:
+            objectives: Keys of engine.pareto.PARETO_METRICS
+            max_fronts: Successive fronts to compute (None = all)
+            
+        Returns:
+            Metrics DataFrame with pareto_front (1 = non-dominated, 0 = beyond max_fronts)
+        """
+        return add_pareto_fronts(self.metrics.copy(), objectives, max_fronts)
+    
+    def summary_statistics(self) -> Dict:
+        """NPV, CAPEX and revenue statistics of the selection"""
+        df = self.metrics
+        if df.empty:
+            return {'avg_npv': None, 'max_npv': None, 'min_npv': None, 'avg_capex': None, 'avg_revenue': None}
+        return {
+            'avg_npv': df['npv'].mean(),
+            'max_npv': df['npv'].max(),
+            'min_npv': df['npv'].min(),
+            'avg_capex': df['total_capex'].mean(),
+            'avg_revenue': df['total_revenue'].mean()
+        }
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour lookup over all active scenarios with metrics
+    
+    Two notions of similar: CAPEX composition (Jaccard similarity of the
+    capex_mask bitsets, one vectorized popcount over all scenarios) and
+    metric profile (Euclidean distance of z-scored SIMILARITY_METRICS, on a
+    KD-tree when scipy is installed, otherwise an exact NumPy scan). Build
+    it once per metrics version with get_similarity_index.
+    """
+    
+    def __init__(self, records: List[Dict]):
+        self.scenario_ids = np.array([r['scenario_id'] for r in records], dtype=np.int64)
+        self.names = [r['scenario_name'] for r in records]
+        self.masks = np.array([r['capex_mask'] or 0 for r in records], dtype=np.int64).view(np.uint64)
+        self.npv = np.array([r['npv'] for r in records], dtype=float)
+        self.irr = np.array([r['irr'] for r in records], dtype=float)
+        self.total_capex = np.array([r['total_capex'] for r in records], dtype=float)
+        self._positions = {scenario_id: position for position, scenario_id in enumerate(self.scenario_ids.tolist())}
+        
+        irr_capped = np.where(np.isnan(self.irr), IRR_SCORE_CAP,
+                              np.where(self.irr > 0, np.minimum(self.irr, IRR_SCORE_CAP), 0.0))
+        columns = {'npv': self.npv, 'irr_capped': irr_capped, 'total_capex': self.total_capex}
+        self.points = np.column_stack([self._zscore(columns[name]) for name in SIMILARITY_METRICS]) \
+            if records else np.empty((0, len(SIMILARITY_METRICS)))
+        self._tree = cKDTree(self.points) if cKDTree is not None and records else None
+    
+    @staticmethod
+    def _zscore(values: np.ndarray) -> np.ndarray:
+        """Standardize a column (missing values at the mean, constant columns at 0)"""
+        if np.isnan(values).all():
+            return np.zeros(len(values))
+        mean, std = np.nanmean(values), np.nanstd(values)
+        values = np.where(np.isnan(values), mean, values)
+        return (values - mean) / std if std > 0 else np.zeros(len(values))
+    
+    @classmethod
+    def build(cls, session) -> 'SimilarityIndex':
+        """Load every active scenario with metrics in one query and index it"""
+        rows = session.query(
+            Scenario.id,
+            Scenario.name,
+            Scenario.capex_mask,
+            ScenarioMetrics.npv,
+            ScenarioMetrics.irr,
+            ScenarioMetrics.total_capex
+        ).join(
+            ScenarioMetrics, Scenario.id == ScenarioMetrics.scenario_id
+        ).filter(
+            Scenario.is_active == True
+        ).order_by(Scenario.id).all()
+        return cls([{
+            'scenario_id': r[0],
+            'scenario_name': r[1],
+            'capex_mask': r[2],
+            'npv': r[3],
+            'irr': r[4],
+            'total_capex': r[5]
+        } for r in rows])
+    
+    def __len__(self) -> int:
+        return len(self.scenario_ids)
+    
+    def _records(self, positions, key: str, values) -> List[Dict]:
+        return [{
+            'scenario_id': int(self.scenario_ids[p]),
+            'scenario_name': self.names[p],
+            key: float(value),
+            'npv': _native(self.npv[p]),
+            'irr': _native(self.irr[p]),
+            'total_capex': _native(self.total_capex[p]),
+        } for p, value in zip(positions, values)]
+    
+    def similar_composition(self, scenario_id: int, k: int = SIMILAR_SCENARIOS) -> List[Dict]:
+        """
+        Scenarios with the most similar CAPEX composition
+        
+        Args:
+            scenario_id: Scenario to compare against
+            k: Number of scenarios
+            
+        Returns:
+            Up to k records (scenario_id, scenario_name, similarity 0-1, npv, irr,
+            total_capex), most similar first, ties by scenario ID
+        """
+        position = self._positions.get(scenario_id)
+        if position is None:
+            return []
+        query = self.masks[position]
+        union = _popcount(self.masks | query).astype(float)
+        shared = _popcount(self.masks & query).astype(float)
+        # Two empty compositions are identical
+        similarity = np.divide(shared, union, out=np.ones(len(union)), where=union > 0)
+        similarity[position] = np.nan  # never list the scenario itself (NaN sorts last)
+        order = top_k_order(similarity, self.scenario_ids, min(k, len(self) - 1))
+        return self._records(order, 'similarity', similarity[order])
+    
+    def similar_metrics(self, scenario_id: int, k: int = SIMILAR_SCENARIOS) -> List[Dict]:
+        """
+        Scenarios with the closest metric profile (NPV, IRR, CAPEX)
+        
+        Args:
+            scenario_id: Scenario to compare against
+            k: Number of scenarios
+            
+        Returns:
+            Up to k records (scenario_id, scenario_name, distance in standard
+            deviations, npv, irr, total_capex), closest first
+        """
+        position = self._positions.get(scenario_id)
+        if position is None:
+            return []
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return []
+        point = self.points[position]
+        if self._tree is not None:
+            # One extra neighbour for the scenario itself (any duplicate may come back first)
+            distances, positions = self._tree.query(point, k=k + 1)
+            pairs = [(d, p) for d, p in zip(np.atleast_1d(distances), np.atleast_1d(positions)) if p != position]
+            pairs = pairs[:k]
+            distances = np.array([d for d, _ in pairs])
+            positions = np.array([p for _, p in pairs], dtype=np.intp)
+        else:
+            distances = np.sqrt(((self.points - point) ** 2).sum(axis=1))
+            distances[position] = np.nan
+            positions = top_k_order(-distances, self.scenario_ids, k)
+            distances = distances[positions]
+        return self._records(positions, 'distance', distances)
+
+
+def get_similarity_index(session) -> SimilarityIndex:
+    """
+    Similarity index of the current metrics, rebuilt only when the metrics change
+    
+    The version is the leaderboard's metrics signature (row count, ID sum,
+    latest calculated_at), so one aggregate query decides whether the
+    cached index is still valid.
+    """
+    from engine.leaderboard import LeaderboardStore  # engine.leaderboard imports this module
+    
+    version = LeaderboardStore(session).metrics_signature()
+    key = str(session.get_bind().url)
+    cached = _similarity_indexes.get(key)
+    if cached is None or cached[0] != version:
+        cached = _similarity_indexes[key] = (version, SimilarityIndex.build(session))
+    return cached[1]
@@ -0,0 +1,193 @@
+"""
+Materialized Leaderboard
+Persisted scores and ranks of all active scenarios per scoring profile
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, update, delete
+
+from database.models import Scenario, ScenarioMetrics, ScenarioLeaderboard, LeaderboardState
+from engine.comparator import ScenarioComparator, SCORING_PROFILES
+
+
+class LeaderboardStore:
+    """
+    Reads and refreshes the scenario_leaderboard table
+
+    Scores are min-max normalized over all active scenarios, so one changed
+    metrics row can move every score. A refresh therefore recomputes the
+    ranking in memory, but only writes leaderboard rows whose score, rank or
+    IRR actually changed. Refreshes are triggered lazily: the metrics
+    signature (row count, sum of scenario IDs, latest calculated_at) is
+    compared with the one stored in leaderboard_state.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def metrics_signature(self) -> Tuple[int, int, Optional[datetime]]:
+        """
+        Signature of the metrics of all active scenarios
+
+        Returns:
+            Tuple of (row count, sum of scenario IDs, latest calculated_at)
+        """
+        count, id_sum, latest = self.session.query(
+            func.count(ScenarioMetrics.id),
+            func.coalesce(func.sum(ScenarioMetrics.scenario_id), 0),
+            func.max(ScenarioMetrics.calculated_at)
+        ).join(
+            Scenario, Scenario.id == ScenarioMetrics.scenario_id
+        ).filter(
+            Scenario.is_active == True
+        ).one()
+        return count, id_sum, latest
+
+    def is_stale(self, profile: str = 'default') -> bool:
+        """Check whether metrics changed since the profile was last refreshed"""
+        state = self.session.get(LeaderboardState, profile)
+        if state is None:
+            return True
+        return (state.metrics_count, state.scenario_id_sum, state.metrics_calculated_at) != self.metrics_signature()
+
+    def refresh(self, profile: str = 'default', force: bool = False) -> int:
+        """
+        Rebuild the leaderboard of a profile if the metrics changed
+
+        Args:
+            profile: Key of SCORING_PROFILES
+            force: Refresh even if the signature is unchanged
+
+        Returns:
+            Number of leaderboard rows inserted, updated or deleted
+        """
+        if profile not in SCORING_PROFILES:
+            raise ValueError(f"Unknown scoring profile: {profile}")
+
+        signature = self.metrics_signature()
+        state = self.session.get(LeaderboardState, profile)
+        if not force and state is not None and \
+                (state.metrics_count, state.scenario_id_sum, state.metrics_calculated_at) == signature:
+            return 0
+
+        active_ids = [r[0] for r in self.session.query(Scenario.id).filter(Scenario.is_active == True).all()]
+        ranked = ScenarioComparator(self.session).rank_scenarios(active_ids, profile=profile) if active_ids else []
+
+        existing = {
+            r.scenario_id: r for r in self.session.query(
+                ScenarioLeaderboard.id, ScenarioLeaderboard.scenario_id, ScenarioLeaderboard.score,
+                ScenarioLeaderboard.rank, ScenarioLeaderboard.irr
+            ).filter(ScenarioLeaderboard.profile == profile).all()
+        }
+
+        now = datetime.now()
+        inserts, updates = [], []
+        for r in ranked:
+            irr = r['irr'] if r['irr'] == r['irr'] else None  # NaN -> NULL
+            row = existing.pop(r['scenario_id'], None)
+            if row is None:
+                inserts.append({'profile': profile, 'scenario_id': r['scenario_id'], 'score': r['total_score'],
+                                'rank': r['rank'], 'irr': irr, 'updated_at': now})
+            elif (row.score, row.rank, row.irr) != (r['total_score'], r['rank'], irr):
+                updates.append({'id': row.id, 'score': r['total_score'], 'rank': r['rank'],
+                                'irr': irr, 'updated_at': now})
+        removed = [row.id for row in existing.values()]
+
+        if removed:
+            self.session.execute(delete(ScenarioLeaderboard).where(ScenarioLeaderboard.id.in_(removed)))
+        if updates:
+            self.session.execute(update(ScenarioLeaderboard), updates)
+        if inserts:
+            self.session.execute(insert(ScenarioLeaderboard), inserts)
+
+        if state is None:
+            state = LeaderboardState(profile=profile)
+            self.session.add(state)
+        state.metrics_count, state.scenario_id_sum, state.metrics_calculated_at = signature
+        state.refreshed_at = now
+        self.session.commit()
+
+        return len(inserts) + len(updates) + len(removed)
+
+    @staticmethod
+    def _filter_irr(query, irr_min: float = None, irr_max: float = None):
+        """Apply inclusive IRR bounds (uses idx_leaderboard_profile_irr)"""
+        if irr_min is not None:
+            query = query.filter(ScenarioLeaderboard.irr >= irr_min)
+        if irr_max is not None:
+            query = query.filter(ScenarioLeaderboard.irr <= irr_max)
+        return query
+
+    def _leaderboard_query(self, profile: str, irr_min: float = None, irr_max: float = None):
+        """Leaderboard rows joined with scenario name and metrics"""
+        query = self.session.query(
+            ScenarioLeaderboard.rank,
+            ScenarioLeaderboard.score,
+            Scenario.id,
+            Scenario.name,
+            ScenarioMetrics.npv,
+            ScenarioMetrics.irr,
+            ScenarioMetrics.payback_period_years,
+            ScenarioMetrics.total_contractor_share,
+            ScenarioMetrics.total_revenue,
+            ScenarioMetrics.total_capex,
+            ScenarioMetrics.total_opex
+        ).join(
+            Scenario, Scenario.id == ScenarioLeaderboard.scenario_id
+        ).join(
+            ScenarioMetrics, ScenarioMetrics.scenario_id == ScenarioLeaderboard.scenario_id
+        ).filter(
+            ScenarioLeaderboard.profile == profile
+        )
+        return self._filter_irr(query, irr_min, irr_max)
+
+    def top(self, profile: str = 'default', limit: Optional[int] = 100, offset: int = 0,
+            irr_min: float = None, irr_max: float = None) -> List[Dict]:
+        """
+        Best-ranked scenarios (indexed ORDER BY rank LIMIT)
+
+        Args:
+            profile: Key of SCORING_PROFILES
+            limit: Maximum rows (None = all)
+            offset: Rows to skip
+            irr_min: Optional lower IRR bound (inclusive, decimal)
+            irr_max: Optional upper IRR bound (inclusive, decimal)
+
+        Returns:
+            List of dictionaries with the same keys as rank_scenarios records
+        """
+        query = self._leaderboard_query(profile, irr_min, irr_max).order_by(ScenarioLeaderboard.rank).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+
+        return [{
+            'rank': r[0],
+            'total_score': r[1],
+            'scenario_id': r[2],
+            'scenario_name': r[3],
+            'npv': r[4],
+            'irr': r[5],
+            'payback_period': r[6],
+            'total_contractor_share': r[7],
+            'total_revenue': r[8],
+            'total_capex': r[9],
+            'total_opex': r[10]
+        } for r in query.all()]
+
+    def count(self, profile: str = 'default', irr_min: float = None, irr_max: float = None) -> int:
+        """Number of leaderboard rows matching the IRR bounds"""
+        query = self.session.query(func.count(ScenarioLeaderboard.id)).filter(ScenarioLeaderboard.profile == profile)
+        return self._filter_irr(query, irr_min, irr_max).scalar()
+
+    def scores(self, profile: str = 'default') -> Dict[int, Tuple[float, int]]:
+        """
+        Score and rank of every scenario
+
+        Returns:
+            Dictionary of scenario_id -> (score, rank)
+        """
+        rows = self.session.query(
+            ScenarioLeaderboard.scenario_id, ScenarioLeaderboard.score, ScenarioLeaderboard.rank
+        ).filter(ScenarioLeaderboard.profile == profile).all()
+        return {r[0]: (r[1], r[2]) for r in rows}
@@ -4,6 +4,7 @@ Automatically generates OPEX based on selected CAPEX items
 """
 from typing import List, Dict
 from database.models import ScenarioCapex, ScenarioOpex, OpexMapping, CapexItem
+from engine.profiler import stage, profiled
 
 class OpexGenerator:
     """
@@ -13,6 +14,7 @@ class OpexGenerator:
     def __init__(self, session):
         self.session = session
     
+    @profiled('opex.generate')
     def generate_opex_for_scenario(self, scenario_id: int, start_year: int, end_year: int, escalation_rate: float = 0.02) -> List[ScenarioOpex]:
         """
         Generate OPEX for a scenario based on its CAPEX selections
@@ -94,15 +96,17 @@ class OpexGenerator:
             end_year: Project end year
             escalation_rate: Annual OPEX escalation rate (default 2%)
         """
-        # Delete existing OPEX
-        self.session.query(ScenarioOpex).filter_by(scenario_id=scenario_id).delete()
+        with stage('opex.delete_old'):
+            # Delete existing OPEX
+            self.session.query(ScenarioOpex).filter_by(scenario_id=scenario_id).delete()
         
         # Generate new OPEX with escalation
         opex_list = self.generate_opex_for_scenario(scenario_id, start_year, end_year, escalation_rate)
         
-        # Save to database
-        self.session.add_all(opex_list)
-        self.session.commit()
+        with stage('opex.insert'):
+            # Save to database
+            self.session.add_all(opex_list)
+            self.session.commit()
         
         return opex_list
     
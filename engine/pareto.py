@@ -0,0 +1,193 @@
+"""
+Pareto Frontier Analysis
+Non-dominated scenarios (and successive fronts) over selectable metrics
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Objective key -> (metrics column, higher is better, missing value counts as best)
+# Missing IRR means all cash flows are positive (instant payback), as in the scoring;
+# any other missing metric counts as the worst value
+PARETO_METRICS = {
+    'npv': ('npv', True, False),
+    'irr': ('irr', True, True),
+    'contractor_share': ('total_contractor_share', True, False),
+    'capex': ('total_capex', False, False),
+    'payback': ('payback_period', False, False),
+}
+
+PARETO_LABELS = {
+    'npv': 'NPV',
+    'irr': 'IRR',
+    'contractor_share': 'Contractor Share',
+    'capex': 'CAPEX',
+    'payback': 'Payback Period',
+}
+
+DEFAULT_OBJECTIVES = ('npv', 'capex')
+
+
+def objective_matrix(df: pd.DataFrame, objectives: Sequence[str] = DEFAULT_OBJECTIVES) -> np.ndarray:
+    """
+    Metrics as a matrix where lower is better in every column
+
+    Args:
+        df: Metrics with the PARETO_METRICS columns (e.g. ScenarioComparator.get_scenario_metrics_df)
+        objectives: Keys of PARETO_METRICS
+
+    Returns:
+        Scenarios x objectives float matrix (missing values mapped to -inf/+inf)
+    """
+    unknown = [key for key in objectives if key not in PARETO_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown Pareto objectives: {', '.join(unknown)}")
+    if not objectives:
+        raise ValueError("At least one Pareto objective is required")
+
+    columns = []
+    for key in objectives:
+        column, higher_is_better, missing_is_best = PARETO_METRICS[key]
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+        if higher_is_better:
+            values = -values
+        columns.append(np.where(np.isnan(values), -np.inf if missing_is_best else np.inf, values))
+    return np.column_stack(columns) if len(df) else np.empty((0, len(objectives)))
+
+
+def _front_1d(values: np.ndarray) -> np.ndarray:
+    return values[:, 0] == values[:, 0].min()
+
+
+def _front_2d(values: np.ndarray) -> np.ndarray:
+    """Sort by (x, y) and sweep the running minimum of y - O(n log n)"""
+    order = np.lexsort((values[:, 1], values[:, 0]))
+    x, y = values[order, 0], values[order, 1]
+    # Identical points do not dominate each other: compare against the points before each group
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = (x[1:] != x[:-1]) | (y[1:] != y[:-1])
+    group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(order)), 0))
+    running_min = np.minimum.accumulate(y)
+    best_before = running_min[np.maximum(group_start - 1, 0)]
+    mask = np.empty(len(order), dtype=bool)
+    mask[order] = (group_start == 0) | (y < best_before)
+    return mask
+
+
+def _front_3d(values: np.ndarray) -> np.ndarray:
+    """
+    Sort by (x, y, z) and sweep with a (y, z) staircase - O(n log n) searches
+
+    The staircase holds the minimal (y, z) points seen so far (y ascending,
+    z strictly descending); a point is dominated when the last staircase
+    entry with y <= its y also has z <= its z.
+    """
+    order = np.lexsort((values[:, 2], values[:, 1], values[:, 0]))
+    points = values[order].tolist()
+    mask = np.zeros(len(order), dtype=bool)
+    stair_y, stair_z = [], []
+    previous, previous_front = None, False
+    for index, point in enumerate(points):
+        if point == previous:
+            # Duplicates share their twin's result (and are not dominated by it)
+            mask[order[index]] = previous_front
+            continue
+        _, y, z = point
+        position = bisect_right(stair_y, y) - 1
+        front = position < 0 or stair_z[position] > z
+        if front:
+            start = bisect_left(stair_y, y)
+            end = start
+            while end < len(stair_y) and stair_z[end] >= z:
+                end += 1
+            stair_y[start:end] = [y]
+            stair_z[start:end] = [z]
+        mask[order[index]] = front
+        previous, previous_front = point, front
+    return mask
+
+
+def _front_nd(values: np.ndarray) -> np.ndarray:
+    """Block-nested-loop front for more than three objectives (candidates checked against the front)"""
+    order = np.lexsort(values.T[::-1])
+    front = []
+    mask = np.zeros(len(values), dtype=bool)
+    for index in order:
+        point = values[index]
+        if front:
+            members = values[front]
+            dominated = np.any(np.all(members <= point, axis=1) & np.any(members < point, axis=1))
+            if dominated:
+                continue
+        front.append(index)
+        mask[index] = True
+    return mask
+
+
+def pareto_mask(values: np.ndarray) -> np.ndarray:
+    """
+    Non-dominated rows of a lower-is-better objective matrix
+
+    A row is dominated when another row is no worse in every objective and
+    better in at least one; identical rows are all kept.
+
+    Returns:
+        Boolean mask, True for rows on the Pareto front
+    """
+    if len(values) == 0:
+        return np.zeros(0, dtype=bool)
+    dimensions = values.shape[1]
+    if dimensions == 1:
+        return _front_1d(values)
+    if dimensions == 2:
+        return _front_2d(values)
+    if dimensions == 3:
+        return _front_3d(values)
+    return _front_nd(values)
+
+
+def pareto_fronts(values: np.ndarray, max_fronts: Optional[int] = 1) -> np.ndarray:
+    """
+    Successive Pareto fronts (non-dominated sorting) by peeling one front at a time
+
+    Args:
+        values: Lower-is-better objective matrix
+        max_fronts: Fronts to compute (None = until every row is assigned)
+
+    Returns:
+        Front number per row (1 = Pareto front, 0 = beyond max_fronts)
+    """
+    fronts = np.zeros(len(values), dtype=np.int64)
+    remaining = np.arange(len(values))
+    front = 1
+    while len(remaining) and (max_fronts is None or front <= max_fronts):
+        mask = pareto_mask(values[remaining])
+        fronts[remaining[mask]] = front
+        remaining = remaining[~mask]
+        front += 1
+    return fronts
+
+
+def add_pareto_fronts(df: pd.DataFrame, objectives: Sequence[str] = DEFAULT_OBJECTIVES,
+                      max_fronts: Optional[int] = 1) -> pd.DataFrame:
+    """
+    Add a pareto_front column to a metrics DataFrame
+
+    Args:
+        df: Metrics with the PARETO_METRICS columns
+        objectives: Keys of PARETO_METRICS
+        max_fronts: Fronts to compute (None = all)
+
+    Returns:
+        The same DataFrame with pareto_front (1 = non-dominated, 0 = beyond max_fronts)
+    """
+    df['pareto_front'] = pareto_fronts(objective_matrix(df, objectives), max_fronts)
+    return df
+
+
+def front_summary(df: pd.DataFrame) -> Dict[int, int]:
+    """Number of scenarios per front number of a DataFrame with pareto_front"""
+    counts = df['pareto_front'].value_counts()
+    return {int(front): int(count) for front, count in sorted(counts.items()) if front > 0}
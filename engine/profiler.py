@@ -0,0 +1,176 @@
+"""
+Engine Profiler
+Per-stage timing for calculations, OPEX generation and bulk import
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+class StageProfile:
+    """
+    Collects timings per stage name
+
+    Stage names are dotted by component, e.g. 'calculate.npv',
+    'opex.insert', 'import.parse'.
+    """
+
+    def __init__(self, use_cprofile: bool = False):
+        self.stages = {}  # name -> [calls, total, min, max]
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.cprofile = cProfile.Profile() if use_cprofile else None
+        self._lock = threading.Lock()
+
+    def add(self, name: str, duration: float):
+        """Record one execution of a stage"""
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                self.stages[name] = [1, duration, duration, duration]
+            else:
+                entry[0] += 1
+                entry[1] += duration
+                entry[2] = min(entry[2], duration)
+                entry[3] = max(entry[3], duration)
+
+    @property
+    def wall_time(self) -> float:
+        """Wall-clock seconds covered by the profile"""
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def report(self) -> List[Dict]:
+        """
+        Structured report, slowest stage first
+
+        Returns:
+            List of dicts with stage, calls, total_s, avg_ms, min_ms, max_ms, pct_of_wall
+        """
+        wall = self.wall_time or 1.0
+        with self._lock:
+            rows = [{
+                'stage': name,
+                'calls': calls,
+                'total_s': total,
+                'avg_ms': total / calls * 1000,
+                'min_ms': low * 1000,
+                'max_ms': high * 1000,
+                'pct_of_wall': total / wall * 100
+            } for name, (calls, total, low, high) in self.stages.items()]
+        return sorted(rows, key=lambda r: r['total_s'], reverse=True)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Report as a DataFrame"""
+        return pd.DataFrame(self.report())
+
+    def cprofile_text(self, sort_by: str = 'cumulative', limit: int = 30) -> Optional[str]:
+        """cProfile output as text (None if cProfile was not enabled)"""
+        if self.cprofile is None:
+            return None
+        buffer = io.StringIO()
+        pstats.Stats(self.cprofile, stream=buffer).sort_stats(sort_by).print_stats(limit)
+        return buffer.getvalue()
+
+    def dump_cprofile(self, path: str):
+        """Write raw cProfile stats (for snakeviz, pstats, etc.)"""
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(path)
+
+
+class _StageTimer:
+    """Context manager that adds its elapsed time to a profile"""
+
+    __slots__ = ('profile', 'name', 'started_at')
+
+    def __init__(self, profile: StageProfile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.add(self.name, time.perf_counter() - self.started_at)
+        return False
+
+
+_active_profile: ContextVar = ContextVar('engine_profile', default=None)
+_NOOP = nullcontext()
+
+
+def current_profile() -> Optional[StageProfile]:
+    """Get the active profile (None when profiling is disabled)"""
+    return _active_profile.get()
+
+
+def stage(name: str):
+    """
+    Time a block as a named stage
+
+    Returns a shared no-op context manager when profiling is disabled.
+
+    Usage:
+        with stage('calculate.npv'):
+            npv = ...
+    """
+    profile = _active_profile.get()
+    if profile is None:
+        return _NOOP
+    return _StageTimer(profile, name)
+
+
+def profiled(name: str = None):
+    """
+    Decorator that times every call of a function as a stage
+
+    Args:
+        name: Stage name (default: function qualname)
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _active_profile.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            with _StageTimer(profile, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profiling(use_cprofile: bool = False):
+    """
+    Enable stage profiling for this context
+
+    Args:
+        use_cprofile: Also run cProfile (current thread only)
+
+    Usage:
+        with profiling() as profile:
+            importer.import_from_excel(path)
+        print(profile.to_dataframe())
+    """
+    profile = StageProfile(use_cprofile=use_cprofile)
+    token = _active_profile.set(profile)
+    if profile.cprofile is not None:
+        profile.cprofile.enable()
+    try:
+        yield profile
+    finally:
+        if profile.cprofile is not None:
+            profile.cprofile.disable()
+        profile.finished_at = time.perf_counter()
+        _active_profile.reset(token)
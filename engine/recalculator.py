@@ -0,0 +1,138 @@
+"""
+Stale Scenario Recalculation
+Recalculates only the scenarios whose metrics are flagged stale (see database/staleness.py)
+"""
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+
+from database.models import Scenario, ScenarioCapex, ScenarioMetrics, CapexItem, FiscalTerms
+from engine.calculator import FinancialCalculator, save_calculations_batch
+from engine.opex_generator import OpexGenerator
+
+# Stale scenarios recalculated and upserted per statement batch
+BATCH_SIZE = 100
+
+
+class StaleRecalculator:
+    """
+    Recalculates only scenarios whose metrics are flagged stale
+
+    Each stale scenario gets its CAPEX line costs refreshed from the
+    catalog, its OPEX regenerated and its financials recalculated.
+    Recalculation writes fresh metrics rows, which clears the flag.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.opex_generator = OpexGenerator(session)
+
+    def stale_count(self) -> int:
+        """Number of active scenarios with stale metrics"""
+        return self.session.query(func.count(ScenarioMetrics.id)).join(
+            Scenario, Scenario.id == ScenarioMetrics.scenario_id
+        ).filter(
+            ScenarioMetrics.is_stale == True,
+            Scenario.is_active == True
+        ).scalar()
+
+    def stale_ids(self, limit: Optional[int] = None) -> List[int]:
+        """IDs of active scenarios with stale metrics, oldest first"""
+        query = self.session.query(ScenarioMetrics.scenario_id).join(
+            Scenario, Scenario.id == ScenarioMetrics.scenario_id
+        ).filter(
+            ScenarioMetrics.is_stale == True,
+            Scenario.is_active == True
+        ).order_by(ScenarioMetrics.scenario_id)
+        if limit is not None:
+            query = query.limit(limit)
+        return [r[0] for r in query.all()]
+
+    def refresh_capex_costs(self, scenario_ids: List[int]) -> int:
+        """
+        Copy current catalog unit costs into scenario_capex (one UPDATE)
+
+        Returns:
+            Number of CAPEX lines whose cost changed
+        """
+        unit_cost = select(CapexItem.unit_cost).where(
+            CapexItem.id == ScenarioCapex.capex_item_id
+        ).scalar_subquery()
+        statement = update(ScenarioCapex.__table__).where(
+            ScenarioCapex.scenario_id.in_(scenario_ids),
+            ScenarioCapex.unit_cost != unit_cost
+        ).values(unit_cost=unit_cost, total_cost=ScenarioCapex.quantity * unit_cost)
+        return self.session.execute(statement).rowcount
+
+    def _regenerate_opex(self, scenario: Scenario, fiscal_terms: Dict[int, FiscalTerms]):
+        """Regenerate a scenario's OPEX from its CAPEX lines (fiscal terms cached by ID)"""
+        fiscal = fiscal_terms.get(scenario.fiscal_terms_id)
+        if fiscal is None:
+            fiscal = fiscal_terms[scenario.fiscal_terms_id] = self.session.get(FiscalTerms, scenario.fiscal_terms_id)
+        self.opex_generator.save_opex_for_scenario(
+            scenario.id,
+            fiscal.project_start_year,
+            fiscal.project_end_year,
+            escalation_rate=0.02
+        )
+
+    def recalculate_stale(self, limit: Optional[int] = None, batch_size: int = BATCH_SIZE,
+                          progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Recalculate stale scenarios
+
+        Results of each batch are upserted together (save_calculations_batch);
+        if a batch fails, its scenarios are retried one by one so a single
+        bad scenario only fails itself.
+
+        Args:
+            limit: Maximum scenarios to recalculate (None = all stale)
+            batch_size: Scenarios written per statement batch
+            progress_callback: Optional callback(done, total)
+
+        Returns:
+            Dictionary with recalculated (count), errors (list of (scenario_id, message))
+            and remaining (stale scenarios left)
+        """
+        scenario_ids = self.stale_ids(limit)
+        if scenario_ids:
+            self.refresh_capex_costs(scenario_ids)
+            self.session.commit()
+
+        fiscal_terms = {}
+        recalculated, errors = 0, []
+
+        for start in range(0, len(scenario_ids), batch_size):
+            chunk = scenario_ids[start:start + batch_size]
+            scenarios = self.session.query(Scenario).filter(Scenario.id.in_(chunk)).order_by(Scenario.id).all()
+
+            ready = []
+            for scenario in scenarios:
+                try:
+                    self._regenerate_opex(scenario, fiscal_terms)
+                    ready.append(scenario)
+                except Exception as e:
+                    self.session.rollback()
+                    errors.append((scenario.id, str(e)))
+
+            try:
+                save_calculations_batch(self.session, ready)
+                recalculated += len(ready)
+            except Exception:
+                self.session.rollback()
+                for scenario in ready:
+                    try:
+                        FinancialCalculator(scenario, self.session).save_calculations()
+                        recalculated += 1
+                    except Exception as e:
+                        self.session.rollback()
+                        errors.append((scenario.id, str(e)))
+
+            if progress_callback:
+                progress_callback(min(start + batch_size, len(scenario_ids)), len(scenario_ids))
+
+        return {
+            'recalculated': recalculated,
+            'errors': errors,
+            'remaining': self.stale_count(),
+        }
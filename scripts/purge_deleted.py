@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Purge soft-deleted scenarios
+Permanently removes scenarios moved to trash more than N days ago (run from cron)
+"""
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+
+from database.connection import get_db_session
+from database.maintenance import purge_deleted, PURGE_AFTER_DAYS
+from database.models import Scenario
+
+def main():
+    parser = argparse.ArgumentParser(description="Permanently delete soft-deleted scenarios")
+    parser.add_argument('--days', type=int, default=PURGE_AFTER_DAYS,
+                        help=f"Purge scenarios deleted more than this many days ago (default {PURGE_AFTER_DAYS})")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the scenarios that would be purged")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("PURGE SOFT-DELETED SCENARIOS")
+    print("=" * 60)
+    
+    with get_db_session() as session:
+        if args.dry_run:
+            cutoff = datetime.now() - timedelta(days=args.days)
+            count = session.query(Scenario).filter(
+                Scenario.is_active == False,
+                Scenario.deleted_at < cutoff
+            ).count()
+            print(f"🔍 {count} scenarios deleted before {cutoff:%Y-%m-%d %H:%M} would be purged")
+            return
+        
+        purged = purge_deleted(session, older_than_days=args.days)
+        print(f"✅ Purged {purged} scenarios deleted more than {args.days} days ago")
+
+if __name__ == "__main__":
+    main()
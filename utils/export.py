@@ -55,14 +55,8 @@ class ExcelExporter:
     
     def _create_summary_sheet(self, scenario: Scenario) -> pd.DataFrame:
         """Create summary information sheet"""
-        from sqlalchemy import text
         metrics = self.session.query(ScenarioMetrics).filter_by(scenario_id=scenario.id).first()
-        
-        # Get Contractor PTCF
-        ptcf_result = self.session.execute(text(
-            'SELECT SUM(contractor_tax) FROM calculation_results WHERE scenario_id = :sid'
-        ), {'sid': scenario.id}).fetchone()
-        contractor_ptcf = float(ptcf_result[0]) if ptcf_result[0] else 0
+        contractor_ptcf = (metrics.contractor_ptcf or 0) if metrics else 0
         
         data = {
             'Item': [
@@ -189,18 +183,11 @@ class ExcelExporter:
     
     def _create_metrics_sheet(self, scenario_id: int) -> pd.DataFrame:
         """Create metrics summary sheet"""
-        from sqlalchemy import text
         metrics = self.session.query(ScenarioMetrics).filter_by(scenario_id=scenario_id).first()
         
         if not metrics:
             return pd.DataFrame()
         
-        # Get Contractor PTCF
-        ptcf_result = self.session.execute(text(
-            'SELECT SUM(contractor_tax) FROM calculation_results WHERE scenario_id = :sid'
-        ), {'sid': scenario_id}).fetchone()
-        contractor_ptcf = float(ptcf_result[0]) if ptcf_result[0] else 0
-        
         data = {
             'Metric': [
                 'Total CAPEX',
@@ -213,6 +200,10 @@ class ExcelExporter:
                 'Total Government Take',
                 'Contractor PTCF (Total Tax Paid)',
                 'Abandonment Security Reserve (ASR)',
+                'Peak Cash Exposure',
+                'Max Annual Revenue',
+                'Final Cumulative Cash Flow',
+                'Total Depreciation',
                 'Calculated At'
             ],
             'Value': [
@@ -224,8 +215,12 @@ class ExcelExporter:
                 f"{metrics.payback_period_years:.3f} years" if metrics.payback_period_years else 'N/A',
                 metrics.total_contractor_share,
                 metrics.total_government_take,
-                contractor_ptcf,
+                metrics.contractor_ptcf or 0,
                 metrics.asr_amount,
+                metrics.peak_cash_exposure,
+                metrics.max_annual_revenue,
+                metrics.final_cumulative_cash_flow,
+                metrics.total_depreciation,
                 metrics.calculated_at.strftime('%Y-%m-%d %H:%M:%S') if metrics.calculated_at else '-'
             ]
         }
@@ -257,20 +252,18 @@ class ExcelExporter:
     
     def _create_comparison_sheet(self, scenario_ids: List[int]) -> pd.DataFrame:
         """Create comparison summary sheet"""
-        from sqlalchemy import text
-        data = []
+        # Single JOIN query - all aggregates are stored on ScenarioMetrics
+        rows = self.session.query(Scenario, ScenarioMetrics).join(
+            ScenarioMetrics, Scenario.id == ScenarioMetrics.scenario_id
+        ).filter(
+            Scenario.id.in_(scenario_ids)
+        ).all()
+        by_id = {scenario.id: (scenario, metrics) for scenario, metrics in rows}
         
+        data = []
         for scenario_id in scenario_ids:
-            scenario = self.session.query(Scenario).filter_by(id=scenario_id).first()
-            metrics = self.session.query(ScenarioMetrics).filter_by(scenario_id=scenario_id).first()
-            
-            # Get Contractor PTCF
-            ptcf_result = self.session.execute(text(
-                'SELECT SUM(contractor_tax) FROM calculation_results WHERE scenario_id = :sid'
-            ), {'sid': scenario_id}).fetchone()
-            contractor_ptcf = float(ptcf_result[0]) if ptcf_result[0] else 0
-            
-            if scenario and metrics:
+            if scenario_id in by_id:
+                scenario, metrics = by_id[scenario_id]
                 data.append({
                     'Scenario ID': scenario.id,
                     'Scenario Name': scenario.name,
@@ -282,7 +275,8 @@ class ExcelExporter:
                     'Payback Period (years)': metrics.payback_period_years if metrics.payback_period_years else 0,
                     'Contractor Share': metrics.total_contractor_share,
                     'Government Take': metrics.total_government_take,
-                    'Contractor PTCF (Tax)': contractor_ptcf,
+                    'Contractor PTCF (Tax)': metrics.contractor_ptcf or 0,
+                    'Peak Cash Exposure': metrics.peak_cash_exposure,
                     'ASR': metrics.asr_amount
                 })
         